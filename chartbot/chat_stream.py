@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenAI兼容 /chat/completions 接口的流式（SSE）调用
+逐个返回模型生成的文本片段，并记录首字延迟（TTFT）、逐token到达时间和生成速度
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class StreamStats:
+    """一次流式请求的统计"""
+    text: str = ''
+    ttft: float = None                  # 发出请求到收到第一个文本片段的时间（秒）
+    total_time: float = 0.0             # 发出请求到流结束的时间（秒）
+    prompt_tokens: int = None
+    completion_tokens: int = 0
+    token_source: str = 'chunks'        # usage: 服务器返回的用量；chunks: 按流式片段数估算
+    finish_reason: str = None
+    token_times: list = field(default_factory=list)   # 每个文本片段的到达时间（相对请求开始）
+
+    @property
+    def tokens_per_second(self):
+        """生成阶段的速度（不含首字延迟）"""
+        if self.ttft is None or self.completion_tokens <= 1:
+            return 0.0
+        generation_time = self.total_time - self.ttft
+        return (self.completion_tokens - 1) / generation_time if generation_time > 0 else 0.0
+
+    @property
+    def inter_token_latencies(self):
+        """相邻文本片段的间隔（秒）"""
+        return [later - earlier for earlier, later in zip(self.token_times, self.token_times[1:])]
+
+
+def iter_sse_events(response, deadline=None):
+    """
+    解析SSE响应，逐个返回data字段中的JSON对象，遇到 [DONE] 结束
+    deadline为time.monotonic()的截止时间，超过后关闭响应并抛出TimeoutError
+    """
+    # chunk_size=None：数据到达即处理，不等待凑满固定大小的缓冲区，否则会推迟首字的显示
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if deadline is not None and time.monotonic() > deadline:
+            response.close()
+            raise TimeoutError(f"流式响应超过截止时间: {response.url}")
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        yield json.loads(data)
+
+
+def streaming_payload(payload):
+    """在请求参数中开启流式输出，并让vLLM等服务器在最后一个事件中返回token用量"""
+    payload = dict(payload, stream=True)
+    payload.setdefault('stream_options', {'include_usage': True})
+    return payload
+
+
+def read_chat_stream(response, start, on_delta=None, deadline=None):
+    """
+    读取已建立的流式响应直到结束
+    start为发出请求时的time.perf_counter()，用于计算首字延迟；每个文本片段调用一次on_delta(text)
+    deadline为time.monotonic()的截止时间，读取过程中超过时关闭响应并抛出TimeoutError
+    """
+    stats = StreamStats()
+    parts = []
+    response.encoding = 'utf-8'
+    for event in iter_sse_events(response, deadline):
+        usage = event.get('usage')
+        if usage:
+            stats.prompt_tokens = usage.get('prompt_tokens')
+            stats.completion_tokens = usage.get('completion_tokens', stats.completion_tokens)
+            stats.token_source = 'usage'
+
+        for choice in event.get('choices') or []:
+            if choice.get('finish_reason'):
+                stats.finish_reason = choice['finish_reason']
+            text = (choice.get('delta') or {}).get('content')
+            if not text:
+                continue
+            now = time.perf_counter() - start
+            if stats.ttft is None:
+                stats.ttft = now
+            stats.token_times.append(now)
+            parts.append(text)
+            if on_delta:
+                on_delta(text)
+
+    stats.total_time = time.perf_counter() - start
+    stats.text = ''.join(parts)
+    if stats.token_source == 'chunks':
+        # 服务器没有返回用量时，vLLM通常每个流式片段对应一个token
+        stats.completion_tokens = len(stats.token_times)
+    return stats
+
+
+def stream_chat_completion(session, endpoint, payload, timeout=60, on_delta=None):
+    """
+    以stream模式调用 {endpoint}/chat/completions（不重试，需要重试和连接池管理时使用llm_client.LLMClient）
+    每收到一个文本片段调用一次on_delta(text)，返回StreamStats；HTTP错误以requests异常抛出
+    """
+    start = time.perf_counter()
+    with session.post(f"{endpoint}/chat/completions", json=streaming_payload(payload),
+                      stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        return read_chat_stream(response, start, on_delta)
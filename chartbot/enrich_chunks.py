@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用大模型批量补充知识块：改写的问法、简短摘要、难度和知识点标签
+- 流式读取 knowledge/cleaned/ 下的知识块，不一次性加载全部数据
+- 同时保持固定数量的请求在途，让vLLM的连续批处理（continuous batching）保持满载
+- 每完成一个知识块立即追加写入输出文件，输出文件同时作为断点：
+  重新运行时跳过已完成的（chunk_id, content_hash, 提示词版本），中断后可直接续跑
+- 失败的知识块不写入输出，下次运行时自动重试
+
+用法：
+    python chartbot/enrich_chunks.py --concurrency 32
+    python chartbot/enrich_chunks.py --source knowledge/cleaned/javaguide --limit 100
+    # 离线测试：先启动 python chartbot/mock_llm_server.py
+    python chartbot/enrich_chunks.py --endpoint http://127.0.0.1:8000/v1 --model mock-llm
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+
+from llm_client import LLMClient
+
+# 添加script目录到系统路径，以便复用知识块读写和token计数
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'script'))
+
+from chunk_io import ChunkWriter, iter_corpus
+from token_counter import load_token_counter
+
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'knowledge')
+DEFAULT_SOURCE_DIR = os.path.join(KNOWLEDGE_DIR, 'cleaned', 'javaguide')
+DEFAULT_OUTPUT = os.path.join(KNOWLEDGE_DIR, 'enriched', 'javaguide', 'enriched.jsonl')
+
+# 修改提示词或输出格式时递增，已完成的知识块会按新版本重新生成
+PROMPT_VERSION = 1
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+SYSTEM_PROMPT = (
+    "你是Java技术面试题库的编辑。根据给出的面试题和参考答案，只输出一个JSON对象，包含以下字段：\n"
+    "paraphrased_questions: 3个与原问题含义相同、问法不同的中文问题（字符串数组）；\n"
+    "summary: 不超过100字的答案摘要；\n"
+    "difficulty: 难度，取值为 easy、medium 或 hard；\n"
+    "tags: 3到5个知识点标签（字符串数组）。"
+)
+
+
+def chunk_key(chunk):
+    """断点的判断依据：内容变化或提示词升级后需要重新生成"""
+    return chunk.get('chunk_id'), chunk.get('content_hash'), PROMPT_VERSION
+
+
+def load_completed(path):
+    """读取输出文件中已完成的知识块；中断时写了一半的最后一行会被忽略"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            enrichment = record.get('enrichment') or {}
+            completed.add((record.get('chunk_id'), record.get('content_hash'), enrichment.get('prompt_version')))
+    return completed
+
+
+def _ensure_trailing_newline(path):
+    """上次运行中断在一行中间时补一个换行，避免新记录接在残缺的行后面"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+def parse_enrichment(content):
+    """解析并校验模型输出的JSON，格式不符时抛出ValueError"""
+    content = content.strip()
+    if content.startswith('```'):
+        # 个别模型会用代码块包裹JSON
+        content = content.strip('`')
+        content = content[content.find('{'):]
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("输出不是JSON对象")
+
+    questions = data.get('paraphrased_questions')
+    summary = data.get('summary')
+    if not isinstance(questions, list) or not all(isinstance(question, str) for question in questions):
+        raise ValueError("paraphrased_questions 不是字符串数组")
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("缺少summary")
+    difficulty = str(data.get('difficulty', '')).strip().lower()
+    tags = data.get('tags') if isinstance(data.get('tags'), list) else []
+    return {
+        'paraphrased_questions': [question.strip() for question in questions if question.strip()],
+        'summary': summary.strip(),
+        'difficulty': difficulty if difficulty in DIFFICULTIES else None,
+        'tags': [str(tag).strip() for tag in tags if str(tag).strip()],
+    }
+
+
+class ChunkEnricher:
+    """
+    批量补充知识块，同时在途的请求数不超过concurrency
+    """
+
+    def __init__(self, client, concurrency=16, max_input_tokens=3000, max_tokens=512, temperature=0.2,
+                 timeout=300):
+        self.client = client
+        self.concurrency = concurrency
+        self.max_input_tokens = max_input_tokens
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.counter = load_token_counter()
+        self.stats = {'enriched': 0, 'skipped': 0, 'failed': 0}
+        self.errors = {}
+
+    def build_messages(self, chunk):
+        # 过长的答案截断，避免超出上下文窗口
+        answer = self.counter.truncate(chunk.get('answer_markdown') or chunk.get('answer_text') or '',
+                                       self.max_input_tokens)
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"问题：{chunk.get('question', '')}\n\n参考答案：\n{answer}"},
+        ]
+
+    def enrich(self, chunk):
+        """为一个知识块生成补充数据，返回写入输出文件的记录"""
+        result = self.client.chat(
+            self.build_messages(chunk), max_tokens=self.max_tokens, temperature=self.temperature,
+            response_format={"type": "json_object"}, timeout=self.timeout,
+        )
+        enrichment = parse_enrichment(result['choices'][0]['message']['content'] or '')
+        enrichment.update({
+            'model': result.get('model') or self.client.config.model,
+            'prompt_version': PROMPT_VERSION,
+            'enriched_at': datetime.now().isoformat(),
+        })
+        return dict(chunk, enrichment=enrichment)
+
+    def _collect(self, futures, writer):
+        for future in futures:
+            chunk_id = future.chunk_id
+            try:
+                record = future.result()
+            except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+                self.stats['failed'] += 1
+                error = f"{type(e).__name__}: {e}"
+                self.errors[error] = self.errors.get(error, 0) + 1
+                if self.errors[error] == 1:
+                    print(f"❌ {chunk_id}: {error}")
+                continue
+            writer.write(record)
+            self.stats['enriched'] += 1
+
+    def run(self, chunks, output, limit=None, progress_every=50):
+        """处理chunks中未完成的知识块，结果追加写入output，返回统计"""
+        completed = load_completed(output)
+        _ensure_trailing_newline(output)
+        submitted = set()
+        start = time.time()
+
+        # 每条记录写入后立即刷新，中断时最多丢失在途的请求
+        with ChunkWriter(output, append=True, flush_every=1) as writer, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = set()
+            try:
+                for chunk in chunks:
+                    key = chunk_key(chunk)
+                    # 增量清洗时同一知识块可能出现在多个文件中
+                    if key in completed or key in submitted:
+                        self.stats['skipped'] += 1
+                        continue
+                    if limit is not None and len(submitted) >= limit:
+                        break
+                    if len(pending) >= self.concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._collect(done, writer)
+                        self._report(start, progress_every)
+                    future = executor.submit(self.enrich, chunk)
+                    future.chunk_id = chunk.get('chunk_id')
+                    pending.add(future)
+                    submitted.add(key)
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, writer)
+                    self._report(start, progress_every)
+            except KeyboardInterrupt:
+                # 取消尚未开始的请求，已完成的记录都已写入，重新运行即可续跑
+                for future in pending:
+                    future.cancel()
+                print("\n⚠️ 已中断，重新运行将从断点继续")
+                raise
+
+        self.stats['duration_s'] = time.time() - start
+        return self.stats
+
+    def _report(self, start, every):
+        finished = self.stats['enriched'] + self.stats['failed']
+        if every and finished and finished % every == 0:
+            elapsed = time.time() - start
+            print(f"⏳ 已完成 {self.stats['enriched']}，失败 {self.stats['failed']}，"
+                  f"{finished / elapsed:.2f} 个/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用大模型批量补充知识块（改写问法、摘要、难度、标签）')
+    parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help='知识块目录（递归读取）')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='输出JSONL文件（同时作为断点）')
+    parser.add_argument('--endpoint', help='OpenAI兼容接口地址（默认读取LLM_ENDPOINT）')
+    parser.add_argument('--model', help='模型名称（默认读取LLM_MODEL）')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='同时在途的请求数')
+    parser.add_argument('--limit', type=int, help='本次最多处理的知识块数')
+    parser.add_argument('--max-input-tokens', type=int, default=3000, help='答案截断的token数')
+    parser.add_argument('--max-tokens', type=int, default=512)
+    parser.add_argument('--temperature', type=float, default=0.2)
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的截止时间（秒，含重试）')
+    args = parser.parse_args()
+
+    client = LLMClient(endpoint=args.endpoint, model=args.model, pool_size=args.concurrency)
+    enricher = ChunkEnricher(client, args.concurrency, args.max_input_tokens, args.max_tokens,
+                             args.temperature, args.timeout)
+
+    print("🧠 知识块批量补充")
+    print(f"📡 端点: {client.endpoint}")
+    print(f"🤖 模型: {client.config.model}")
+    print(f"📂 输入: {args.source}")
+    print(f"📁 输出: {args.output}")
+    print(f"🔀 并发: {args.concurrency}")
+    print("=" * 60)
+
+    try:
+        stats = enricher.run(iter_corpus(args.source), args.output, limit=args.limit)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        client.close()
+
+    print("=" * 60)
+    print(f"✅ 完成 {stats['enriched']} 个，跳过（已完成）{stats['skipped']} 个，失败 {stats['failed']} 个，"
+          f"耗时 {stats['duration_s']:.1f}秒")
+    for error, count in enricher.errors.items():
+        print(f"    ❌ {count} × {error}")
+    if stats['failed']:
+        print("💡 失败的知识块未写入输出，重新运行即可重试")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM接口并发压测
+以线程池维持N个并发的流式会话，记录首字延迟（TTFT）、token间隔（ITL）、端到端延迟的p50/p95/p99
+和吞吐量（tokens/s），可依次测试多个并发级别并将结果写入JSON，用于评估需要的vLLM副本数
+
+用法：
+    python chartbot/llm_bench.py --concurrency 1,4,8,16 --requests 64 --prompts prompts.txt
+    # 离线测试：先启动 python chartbot/mock_llm_server.py
+    python chartbot/llm_bench.py --endpoint http://127.0.0.1:8000/v1 --model mock-llm
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from llm_client import LLMClient
+
+
+DEFAULT_PROMPTS = [
+    "请简单介绍一下Java中的HashMap是如何工作的。",
+    "解释一下JVM的垃圾回收机制以及常见的垃圾收集器。",
+    "synchronized和ReentrantLock有什么区别？",
+    "MySQL的事务隔离级别有哪些，分别解决了什么问题？",
+    "Redis为什么这么快？",
+    "什么是线程池？核心参数有哪些？",
+    "Spring的IoC和AOP分别是什么？",
+    "TCP三次握手和四次挥手的过程是怎样的？",
+]
+
+
+def load_prompts(path):
+    """
+    读取压测用的提示词
+    .jsonl文件每行一个对象（含messages或prompt字段），其他文件每行一个问题
+    """
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.endswith('.jsonl'):
+                item = json.loads(line)
+                prompts.append(item.get('messages') or [{"role": "user", "content": item['prompt']}])
+            else:
+                prompts.append([{"role": "user", "content": line}])
+    if not prompts:
+        raise ValueError(f"提示词文件为空: {path}")
+    return prompts
+
+
+def percentile(values, q):
+    """线性插值的百分位数，values为空时返回None"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(values, scale=1.0):
+    """p50/p95/p99/平均值，scale用于单位换算（如秒转毫秒）"""
+    if not values:
+        return None
+    return {
+        'p50': percentile(values, 50) * scale,
+        'p95': percentile(values, 95) * scale,
+        'p99': percentile(values, 99) * scale,
+        'mean': sum(values) / len(values) * scale,
+        'count': len(values),
+    }
+
+
+class LoadGenerator:
+    """
+    向同一个端点发起并发的流式请求
+    客户端不重试（失败如实计入统计）也不使用响应缓存，连接池大小与最大并发数一致，连接在各并发级别间复用
+    """
+
+    def __init__(self, client, prompts, max_tokens=256, temperature=0.7, timeout=120):
+        self.client = client
+        self.prompts = prompts
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+
+    def _request(self, index):
+        start = time.perf_counter()
+        try:
+            stats = self.client.stream_chat(
+                self.prompts[index % len(self.prompts)],
+                max_tokens=self.max_tokens, temperature=self.temperature, timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}", 'e2e': time.perf_counter() - start}
+        return {
+            'ok': True,
+            'ttft': stats.ttft,
+            'e2e': stats.total_time,
+            'itl': stats.inter_token_latencies,
+            'completion_tokens': stats.completion_tokens,
+            'tokens_per_second': stats.tokens_per_second,
+        }
+
+    def run_level(self, concurrency, total_requests):
+        """以指定并发数完成total_requests个请求，返回该级别的统计"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(self._request, range(total_requests)))
+        duration = time.perf_counter() - start
+
+        succeeded = [result for result in results if result['ok']]
+        errors = {}
+        for result in results:
+            if not result['ok']:
+                errors[result['error']] = errors.get(result['error'], 0) + 1
+        output_tokens = sum(result['completion_tokens'] for result in succeeded)
+
+        return {
+            'concurrency': concurrency,
+            'requests': total_requests,
+            'succeeded': len(succeeded),
+            'failed': total_requests - len(succeeded),
+            'errors': errors,
+            'duration_s': duration,
+            'requests_per_second': len(succeeded) / duration if duration else 0.0,
+            'output_tokens': output_tokens,
+            'output_tokens_per_second': output_tokens / duration if duration else 0.0,
+            'ttft_ms': summarize([r['ttft'] for r in succeeded if r['ttft'] is not None], 1000),
+            'itl_ms': summarize([latency for r in succeeded for latency in r['itl']], 1000),
+            'e2e_ms': summarize([r['e2e'] for r in succeeded], 1000),
+            'per_request_tokens_per_second': summarize([r['tokens_per_second'] for r in succeeded]),
+        }
+
+
+def _format(summary, key='p50'):
+    return f"{summary[key]:.0f}" if summary else "-"
+
+
+def print_level(level):
+    print(f"  并发 {level['concurrency']:>4} | 成功 {level['succeeded']}/{level['requests']} | "
+          f"{level['requests_per_second']:.2f} req/s | {level['output_tokens_per_second']:.1f} tokens/s | "
+          f"TTFT p50/p95/p99 {_format(level['ttft_ms'])}/{_format(level['ttft_ms'], 'p95')}/"
+          f"{_format(level['ttft_ms'], 'p99')}ms | "
+          f"ITL p50/p95 {_format(level['itl_ms'])}/{_format(level['itl_ms'], 'p95')}ms | "
+          f"E2E p50/p95/p99 {_format(level['e2e_ms'])}/{_format(level['e2e_ms'], 'p95')}/"
+          f"{_format(level['e2e_ms'], 'p99')}ms")
+    for error, count in level['errors'].items():
+        print(f"    ❌ {count} × {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM接口并发压测')
+    parser.add_argument('--endpoint', help='OpenAI兼容接口地址（默认读取LLM_ENDPOINT）')
+    parser.add_argument('--model', help='模型名称（默认读取LLM_MODEL）')
+    parser.add_argument('--prompts', help='提示词文件（每行一个问题，或.jsonl）')
+    parser.add_argument('-c', '--concurrency', default='1,4,8,16', help='并发级别，逗号分隔')
+    parser.add_argument('-n', '--requests', type=int, help='每个并发级别的请求数（默认并发数×4，至少8个）')
+    parser.add_argument('--warmup', type=int, default=2, help='正式测试前的预热请求数')
+    parser.add_argument('--max-tokens', type=int, default=256)
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--timeout', type=float, default=120, help='单个请求的超时时间（秒）')
+    parser.add_argument('-o', '--output', help='结果JSON文件（默认 llm_bench_时间戳.json）')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    prompts = load_prompts(args.prompts) if args.prompts else [
+        [{"role": "user", "content": prompt}] for prompt in DEFAULT_PROMPTS
+    ]
+    client = LLMClient(endpoint=args.endpoint, model=args.model, cache=False, max_retries=0, pool_size=max(levels))
+    generator = LoadGenerator(client, prompts, args.max_tokens, args.temperature, args.timeout)
+
+    print("🚀 LLM并发压测")
+    print(f"📡 端点: {client.endpoint}")
+    print(f"🤖 模型: {client.config.model}")
+    print(f"📝 提示词: {len(prompts)} 条，并发级别: {levels}")
+    print("=" * 60)
+
+    if args.warmup:
+        warmup = generator.run_level(min(args.warmup, max(levels)), args.warmup)
+        if not warmup['succeeded']:
+            print("❌ 预热请求全部失败，请检查端点和模型名称")
+            for error, count in warmup['errors'].items():
+                print(f"    {count} × {error}")
+            return 1
+
+    results = []
+    for concurrency in levels:
+        total = args.requests or max(8, concurrency * 4)
+        level = generator.run_level(concurrency, total)
+        print_level(level)
+        results.append(level)
+
+    output = args.output or f"llm_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'endpoint': client.endpoint,
+        'model': client.config.model,
+        'max_tokens': args.max_tokens,
+        'temperature': args.temperature,
+        'prompt_count': len(prompts),
+        'levels': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print("=" * 60)
+    print(f"📁 结果已保存到: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应的持久化缓存（SQLite）
+以 模型 + 采样参数 + 规范化后的消息列表 的哈希为键保存完整的chat.completion响应，
+重复的问题直接从本地返回；支持过期时间（TTL）、按最近访问淘汰（LRU）、命中统计和按次跳过缓存
+
+环境变量：
+    LLM_CACHE              设为0/false/off时关闭缓存（默认开启）
+    LLM_CACHE_PATH         缓存数据库路径，默认 knowledge/cache/llm_cache.sqlite3
+    LLM_CACHE_TTL          过期时间（秒），默认7天，0表示永不过期
+    LLM_CACHE_MAX_ENTRIES  最多保存的响应数，默认10000
+
+用法：
+    python chartbot/llm_cache.py stats
+    python chartbot/llm_cache.py purge      # 删除过期条目
+    python chartbot/llm_cache.py clear      # 清空缓存
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'knowledge', 'cache', 'llm_cache.sqlite3'
+)
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+# 命中/未命中计数和访问时间先记在内存中，累计到这么多次查询（或写入、统计、关闭时）再批量写入，
+# 读取缓存时不必每次都获取SQLite的写锁
+FLUSH_EVERY = 100
+
+# 不影响生成结果的请求参数，不参与缓存键的计算
+IGNORED_PARAMS = {'stream', 'stream_options', 'user'}
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """统一全角/半角字符（NFKC）、合并空白并去掉首尾空白"""
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def normalize_messages(messages):
+    """规范化消息列表：'Java 语言有哪些特点？' 与 'Java  语言有哪些特点?' 得到相同的结果"""
+    normalized = []
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            content = normalize_text(content)
+        normalized.append({'role': str(message.get('role', '')).lower(), 'content': content})
+    return normalized
+
+
+def cache_key(model, messages, params=None):
+    """计算缓存键：模型、采样参数和规范化后的消息列表共同决定"""
+    params = {key: value for key, value in (params or {}).items() if key not in IGNORED_PARAMS and value is not None}
+    material = json.dumps(
+        {'model': model, 'params': params, 'messages': normalize_messages(messages)},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite缓存，可在多个线程间共享（内部加锁），多个进程可同时使用同一个数据库文件（WAL模式）
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending_access = {}
+        self._pending_counts = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        ''')
+        self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        """按环境变量创建缓存，LLM_CACHE关闭时返回None"""
+        if os.getenv('LLM_CACHE', '1').strip().lower() in ('0', 'false', 'off', 'no'):
+            return None
+        return cls(
+            path=os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH),
+            ttl=float(os.getenv('LLM_CACHE_TTL', DEFAULT_TTL)),
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        )
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._db.commit()
+            self._db.close()
+
+    def _count(self, name):
+        self._pending_counts[name] = self._pending_counts.get(name, 0) + 1
+
+    def _flush(self):
+        """把内存中累计的访问时间、命中次数和计数写入数据库（调用方持有锁并负责提交）"""
+        if self._pending_access:
+            self._db.executemany(
+                'UPDATE responses SET accessed_at = ?, hit_count = hit_count + ? WHERE key = ?',
+                [(accessed_at, hits, key) for key, (accessed_at, hits) in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        if self._pending_counts:
+            self._db.executemany(
+                'INSERT INTO counters(name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                list(self._pending_counts.items())
+            )
+            self._pending_counts.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+            self._db.commit()
+
+    def get(self, key):
+        """返回缓存的响应（dict），未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            # 过期条目按未命中处理，由之后的put覆盖或purge删除
+            if row and self.ttl and now - row[1] > self.ttl:
+                row = None
+            if row is None:
+                self.misses += 1
+                self._count('misses')
+            else:
+                # 记录访问时间，淘汰时按最近访问顺序（LRU）
+                _, hits = self._pending_access.get(key, (now, 0))
+                self._pending_access[key] = (now, hits + 1)
+                self.hits += 1
+                self._count('hits')
+            if sum(self._pending_counts.values()) >= FLUSH_EVERY:
+                self._flush()
+                self._db.commit()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, response, model=None):
+        """保存响应，超过max_entries时淘汰最久未访问的条目"""
+        now = time.time()
+        with self._lock:
+            # 先写入累计的访问时间，保证按最新的访问顺序淘汰
+            self._flush()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses(key, model, response, created_at, accessed_at, hit_count) '
+                'VALUES (?, ?, ?, ?, ?, 0)',
+                (key, model, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            if self.max_entries:
+                self._db.execute(
+                    'DELETE FROM responses WHERE key IN ('
+                    'SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+            self._db.commit()
+
+    def purge_expired(self):
+        """删除所有过期条目，返回删除数量"""
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cursor = self._db.execute('DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._pending_access.clear()
+            self._pending_counts.clear()
+            self._db.execute('DELETE FROM responses')
+            self._db.execute('DELETE FROM counters')
+            self._db.commit()
+
+    def stats(self):
+        """缓存统计：条目数、本进程及累计的命中/未命中次数"""
+        with self._lock:
+            self._flush()
+            self._db.commit()
+            entries, size = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(response)), 0) FROM responses'
+            ).fetchone()
+            counters = dict(self._db.execute('SELECT name, value FROM counters').fetchall())
+        total_hits, total_misses = counters.get('hits', 0), counters.get('misses', 0)
+        lookups = total_hits + total_misses
+        return {
+            'path': self.path,
+            'entries': entries,
+            'response_bytes': size,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'session_hits': self.hits,
+            'session_misses': self.misses,
+            'total_hits': total_hits,
+            'total_misses': total_misses,
+            'hit_rate': total_hits / lookups if lookups else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM响应缓存管理')
+    parser.add_argument('command', choices=['stats', 'purge', 'clear'])
+    parser.add_argument('--path', default=os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH), help='缓存数据库路径')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"ℹ️ 缓存不存在: {args.path}")
+        return 0
+
+    cache = LLMCache(args.path, ttl=float(os.getenv('LLM_CACHE_TTL', DEFAULT_TTL)))
+    if args.command == 'purge':
+        print(f"🧹 已删除 {cache.purge_expired()} 个过期条目")
+    elif args.command == 'clear':
+        cache.clear()
+        print("🧹 已清空缓存")
+    else:
+        stats = cache.stats()
+        print(f"📦 缓存: {stats['path']}")
+        print(f"   条目数: {stats['entries']}/{stats['max_entries']}，响应总大小: {stats['response_bytes'] / 1024:.1f}KB")
+        print(f"   累计命中: {stats['total_hits']}，未命中: {stats['total_misses']}，命中率: {stats['hit_rate']:.1%}")
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享的LLM接口客户端（OpenAI兼容接口，如vLLM）
+- 端点、模型等配置从环境变量或 .env 文件读取
+- 基于requests.Session的长连接池，同一进程内的调用复用已建立的连接
+- 429/5xx和网络错误按带随机抖动的指数退避重试，遵守服务器的Retry-After
+- 每个请求有总截止时间（含重试），超时抛出DeadlineExceeded
+- 同时提供同步和异步（asyncio）接口
+- 相同的问题（模型、采样参数、规范化后的消息都相同）直接返回本地缓存的回答，见llm_cache
+
+环境变量：
+    LLM_ENDPOINT        接口地址，默认 http://10.2.4.153:80/v1
+    LLM_MODEL           模型名称
+    LLM_API_KEY         可选，以Bearer token发送
+    LLM_TIMEOUT         单个请求的截止时间（秒，含重试），默认120
+    LLM_MAX_RETRIES     最大重试次数，默认3
+    LLM_POOL_SIZE       连接池大小，默认16
+    LLM_CONTEXT_WINDOW  模型的上下文长度（vLLM的max_model_len），默认8192，用于计算提示词预算
+    LLM_CACHE*          响应缓存的开关、路径、过期时间和容量，见llm_cache
+"""
+
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from chat_stream import StreamStats, read_chat_stream, streaming_payload
+from llm_cache import LLMCache, cache_key
+
+
+DEFAULT_ENDPOINT = "http://10.2.4.153:80/v1"
+DEFAULT_MODEL = "ibnzterrell/Meta-Llama-3.3-70B-Instruct-AWQ-INT4"
+
+# 可以重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """请求（含重试）超过了截止时间"""
+
+
+def _abort_response(response):
+    """截止时间到时中断流式响应：先shutdown连接，让阻塞在socket上的读取立即返回，再关闭响应"""
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
+
+def _load_dotenv():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    endpoint: str = DEFAULT_ENDPOINT
+    model: str = DEFAULT_MODEL
+    api_key: str = None
+    timeout: float = 120.0          # 单个请求的截止时间（秒），包含所有重试
+    connect_timeout: float = 5.0
+    max_retries: int = 3
+    backoff_base: float = 0.5       # 第n次重试前最多等待 backoff_base * 2^n 秒
+    backoff_max: float = 8.0
+    pool_size: int = 16
+    context_window: int = 8192      # 提示词与回答的token总数上限
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """从环境变量（以及当前目录的 .env 文件）读取配置，overrides中非None的值优先"""
+        _load_dotenv()
+        config = cls(
+            endpoint=os.getenv('LLM_ENDPOINT', DEFAULT_ENDPOINT),
+            model=os.getenv('LLM_MODEL', DEFAULT_MODEL),
+            api_key=os.getenv('LLM_API_KEY') or None,
+            timeout=float(os.getenv('LLM_TIMEOUT', cls.timeout)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', cls.max_retries)),
+            pool_size=int(os.getenv('LLM_POOL_SIZE', cls.pool_size)),
+            context_window=int(os.getenv('LLM_CONTEXT_WINDOW', cls.context_window)),
+        )
+        return replace(config, **{key: value for key, value in overrides.items() if value is not None})
+
+
+class LLMClient:
+    """
+    线程安全的LLM客户端，多个线程可共享同一个实例（连接池大小见pool_size）
+    cache为None时按环境变量创建响应缓存，为False时不使用缓存
+    """
+
+    def __init__(self, config=None, cache=None, **overrides):
+        self.config = config or LLMConfig.from_env(**overrides)
+        self.cache = LLMCache.from_env() if cache is None else (cache or None)
+        self.endpoint = self.config.endpoint.rstrip('/')
+        self.session = requests.Session()
+        # 重试由本类统一处理，连接池本身不重试
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.config.pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        if self.config.api_key:
+            self.session.headers['Authorization'] = f"Bearer {self.config.api_key}"
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _backoff(self, attempt, response=None):
+        """计算第attempt次重试前的等待时间：优先使用Retry-After，否则为全抖动指数退避"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.replace('.', '', 1).isdigit():
+                return min(float(retry_after), self.config.backoff_max)
+        return random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """
+        发送请求，必要时重试，返回状态码为2xx的响应
+        timeout为本次调用（含重试）的截止时间，默认使用配置中的timeout
+        """
+        deadline = time.monotonic() + (timeout or self.config.timeout)
+        url = f"{self.endpoint}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"请求超过截止时间: {url}")
+
+            response = None
+            try:
+                response = self.session.request(
+                    method, url, timeout=(min(self.config.connect_timeout, remaining), remaining), **kwargs
+                )
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.config.max_retries:
+                    response.raise_for_status()
+                    return response
+                error = requests.exceptions.HTTPError(f"{response.status_code} {response.reason}", response=response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.config.max_retries:
+                    raise
+                error = e
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(f"重试等待将超过截止时间: {url}（最近一次错误: {error}）")
+            time.sleep(delay)
+            attempt += 1
+
+    def _payload(self, messages, model, params):
+        payload = {"model": model or self.config.model, "messages": messages}
+        payload.update({key: value for key, value in params.items() if value is not None})
+        return payload
+
+    def _cache_key(self, payload, bypass_cache):
+        if not self.cache or bypass_cache:
+            return None
+        params = {key: value for key, value in payload.items() if key not in ('model', 'messages')}
+        return cache_key(payload['model'], payload['messages'], params)
+
+    def chat(self, messages, model=None, timeout=None, bypass_cache=False, **params):
+        """调用 /chat/completions（非流式），返回完整的响应JSON；bypass_cache为True时不读写缓存"""
+        payload = self._payload(messages, model, params)
+        key = self._cache_key(payload, bypass_cache)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = self.request('POST', 'chat/completions', json=payload, timeout=timeout).json()
+        if key and result.get('choices'):
+            self.cache.put(key, result, model=payload['model'])
+        return result
+
+    def chat_text(self, messages, model=None, timeout=None, bypass_cache=False, **params):
+        """调用 /chat/completions，只返回第一个回答的文本"""
+        result = self.chat(messages, model=model, timeout=timeout, bypass_cache=bypass_cache, **params)
+        return result['choices'][0]['message']['content']
+
+    def stream_chat(self, messages, on_delta=None, model=None, timeout=None, bypass_cache=False, **params):
+        """
+        流式调用 /chat/completions，每个文本片段调用一次on_delta(text)，返回StreamStats
+        只在收到响应之前重试；开始输出后出错直接抛出，避免重复输出
+        timeout为整个调用（含重试和读取流式输出）的截止时间，超过时关闭响应并抛出DeadlineExceeded
+        命中缓存时一次性输出缓存的回答，StreamStats.token_source为'cache'
+        """
+        start = time.perf_counter()
+        payload = self._payload(messages, model, params)
+        key = self._cache_key(payload, bypass_cache)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._replay(cached, start, on_delta)
+
+        timeout = timeout or self.config.timeout
+        deadline = time.monotonic() + timeout
+        with self.request('POST', 'chat/completions', json=streaming_payload(payload), stream=True,
+                          timeout=timeout) as response:
+            # 服务器停止发送数据时读取会一直阻塞，由定时器在截止时间关闭连接
+            watchdog = threading.Timer(max(0.0, deadline - time.monotonic()), _abort_response, (response,))
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                stats = read_chat_stream(response, start, on_delta, deadline=deadline)
+            except (requests.exceptions.RequestException, OSError) as e:
+                # 截止时间之后的读取超时、连接被关闭等错误都是超时造成的
+                if isinstance(e, TimeoutError) or time.monotonic() >= deadline:
+                    raise DeadlineExceeded(f"流式响应超过截止时间: {response.url}") from e
+                raise
+            finally:
+                watchdog.cancel()
+        if key and stats.finish_reason:
+            # 以非流式响应的格式保存，流式和非流式调用共用缓存
+            self.cache.put(key, {
+                "object": "chat.completion", "model": payload['model'],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": stats.text},
+                             "finish_reason": stats.finish_reason}],
+                "usage": {"prompt_tokens": stats.prompt_tokens, "completion_tokens": stats.completion_tokens},
+            }, model=payload['model'])
+        return stats
+
+    @staticmethod
+    def _replay(result, start, on_delta):
+        """把缓存的响应转换为StreamStats"""
+        choice = result['choices'][0]
+        text = choice['message']['content'] or ''
+        if on_delta and text:
+            on_delta(text)
+        elapsed = time.perf_counter() - start
+        usage = result.get('usage') or {}
+        return StreamStats(
+            text=text, ttft=elapsed, total_time=elapsed,
+            prompt_tokens=usage.get('prompt_tokens'), completion_tokens=usage.get('completion_tokens') or 0,
+            token_source='cache', finish_reason=choice.get('finish_reason'), token_times=[elapsed],
+        )
+
+    def models(self, timeout=10):
+        """返回可用模型ID列表"""
+        response = self.request('GET', 'models', timeout=timeout)
+        return [model.get('id') for model in response.json().get('data', [])]
+
+    # 异步接口：在线程池中执行同步调用，共享同一个连接池
+
+    async def achat(self, messages, model=None, timeout=None, bypass_cache=False, **params):
+        return await asyncio.to_thread(self.chat, messages, model, timeout, bypass_cache, **params)
+
+    async def achat_text(self, messages, model=None, timeout=None, bypass_cache=False, **params):
+        return await asyncio.to_thread(self.chat_text, messages, model, timeout, bypass_cache, **params)
+
+    async def astream_chat(self, messages, on_delta=None, model=None, timeout=None, bypass_cache=False, **params):
+        """on_delta在工作线程中调用"""
+        return await asyncio.to_thread(self.stream_chat, messages, on_delta, model, timeout, bypass_cache, **params)
+
+    async def amodels(self, timeout=10):
+        return await asyncio.to_thread(self.models, timeout)
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """返回进程内共享的默认客户端（按环境变量配置），各脚本复用同一个连接池"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+        return _default_client
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟的OpenAI兼容接口，用于离线测试对话和压测脚本
+支持 /v1/models 和 /v1/chat/completions（普通响应与SSE流式响应），
+首字延迟、每个token的间隔和输出长度均可配置
+
+用法：
+    python chartbot/mock_llm_server.py --port 8000 --ttft 0.2 --tpot 0.02
+    python chartbot/llm_bench.py --endpoint http://127.0.0.1:8000/v1 --concurrency 1,4,16
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MOCK_MODEL = "mock-llm"
+
+# 生成回答时循环使用的文本片段，每个片段视为一个token
+MOCK_TOKENS = ["这是", "一个", "来自", "模拟", "服务器", "的", "回答", "，", "用于", "测试",
+               "流式", "输出", "和", "并发", "性能", "。"]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    # 使用HTTP/1.1分块传输，流式响应的每个事件到达客户端时即可处理
+    protocol_version = 'HTTP/1.1'
+    settings = None
+
+    def log_message(self, format, *args):
+        if self.settings.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send_json(200, {"object": "list", "data": [{"id": MOCK_MODEL, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"未知路径: {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {"error": {"message": f"未知路径: {self.path}"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self._send_json(400, {"error": {"message": "请求体不是合法的JSON"}})
+            return
+
+        settings = self.settings
+        if settings.error_rate and random.random() < settings.error_rate:
+            self._send_json(503, {"error": {"message": "模拟的服务端错误"}})
+            return
+
+        max_tokens = request.get('max_tokens') or settings.tokens
+        count = min(settings.tokens, max_tokens)
+        tokens = [MOCK_TOKENS[i % len(MOCK_TOKENS)] for i in range(count)]
+        prompt_tokens = sum(len(str(message.get('content', ''))) for message in request.get('messages', []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": count, "total_tokens": prompt_tokens + count}
+        finish_reason = "length" if count < settings.tokens else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get('model') or MOCK_MODEL
+
+        if (request.get('response_format') or {}).get('type') == 'json_object':
+            # 要求JSON输出时返回一个固定结构的JSON对象（字段与enrich_chunks的输出格式一致）
+            tokens = [json.dumps({
+                "paraphrased_questions": ["模拟的改写问题一？", "模拟的改写问题二？"],
+                "summary": "".join(tokens), "difficulty": "medium", "tags": ["mock"],
+            }, ensure_ascii=False)]
+
+        if not request.get('stream'):
+            time.sleep(settings.ttft + settings.tpot * max(count - 1, 0))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(data):
+            self._write_chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        time.sleep(settings.ttft)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(settings.tpot)
+            event({"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                   "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        event({"id": completion_id, "object": "chat.completion.chunk", "model": model,
+               "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if (request.get('stream_options') or {}).get('include_usage'):
+            event({"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                   "choices": [], "usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 压测客户端超时或提前断开连接属于正常情况，不打印堆栈
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def create_server(host='127.0.0.1', port=8000, ttft=0.2, tpot=0.02, tokens=64, error_rate=0.0, verbose=False):
+    """创建模拟服务器（调用方负责serve_forever/shutdown）"""
+    settings = argparse.Namespace(ttft=ttft, tpot=tpot, tokens=tokens, error_rate=error_rate, verbose=verbose)
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,), {'settings': settings})
+    return MockLLMServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟的OpenAI兼容接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--ttft', type=float, default=0.2, help='首字延迟（秒）')
+    parser.add_argument('--tpot', type=float, default=0.02, help='相邻token的间隔（秒）')
+    parser.add_argument('--tokens', type=int, default=64, help='每个回答的token数（不超过请求的max_tokens）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回503的比例')
+    parser.add_argument('--verbose', action='store_true', help='打印访问日志')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.ttft, args.tpot, args.tokens, args.error_rate, args.verbose)
+    print(f"🧪 模拟LLM服务已启动: http://{args.host}:{args.port}/v1（模型: {MOCK_MODEL}）")
+    print(f"   首字延迟 {args.ttft}s，token间隔 {args.tpot}s，每个回答 {args.tokens} tokens")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
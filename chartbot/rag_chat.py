@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于JavaGuide知识库的检索增强对话
+每轮先用BM25索引检索相关知识块，按token预算（上下文窗口 - 回答长度 - 提示词其余部分）挑选得分最高的放入提示词，
+再以流式方式调用vLLM（OpenAI兼容接口）逐字输出回答，并报告首字延迟和生成速度
+
+用法：
+    python chartbot/rag_chat.py                       # 交互式对话
+    python chartbot/rag_chat.py -q "HashMap的扩容机制是什么？"
+"""
+
+import argparse
+import os
+import sys
+
+import requests
+
+from llm_client import LLMClient, get_client
+
+# 添加script目录到系统路径，以便复用检索索引
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'script'))
+
+from bm25_index import BM25Index, build_index, DEFAULT_INDEX_DIR, DEFAULT_SOURCE_DIR
+from chunk_io import load_unique_chunks
+from context_packer import context_budget, pack_sections
+from token_counter import chunk_token_count, load_token_counter
+
+
+SYSTEM_PROMPT = (
+    "你是一名Java技术面试辅导助手。请优先依据给出的参考资料回答用户的问题，"
+    "引用资料时在句末标注编号，如[1]；参考资料不足以回答时，请说明并给出你的理解。"
+)
+
+
+def open_index(index_dir=DEFAULT_INDEX_DIR, source_dir=DEFAULT_SOURCE_DIR):
+    """打开BM25索引，不存在时从清洗后的知识块构建"""
+    if not os.path.exists(os.path.join(index_dir, 'meta.json')):
+        print("📇 未找到检索索引，正在从清洗后的知识块构建...")
+        meta = build_index(load_unique_chunks(source_dir, skip_duplicates=True), index_dir)
+        print(f"✅ 索引构建完成：{meta['doc_count']} 个知识块")
+    return BM25Index(index_dir)
+
+
+def retrieve(index, question, counter, top_k=4, max_context_tokens=3000):
+    """
+    检索与问题相关的知识块，按得分从高到低放入参考资料，总token数不超过max_context_tokens
+    返回 (参考资料文本, 使用的知识块列表, 参考资料token数)
+    """
+    # 多取一些候选，得分高但过长的资料放不下时由后面较短的资料补上
+    candidates = []
+    for doc_id, _, score in index.search(question, k=top_k * 2):
+        chunk = index.document(doc_id)
+        answer = chunk.get('answer_markdown') or chunk.get('answer_text') or ''
+        body = f"{chunk.get('question', '')}\n{answer}"
+        # 编号前缀"[n] "约占3个token
+        tokens = counter.count(chunk.get('question', '')) + 1 + chunk_token_count(chunk, counter) + 3
+        candidates.append((dict(chunk, score=score), body, tokens))
+
+    packed, total = pack_sections(
+        [(body, tokens) for _, body, tokens in candidates], max_context_tokens, counter, max_sections=top_k
+    )
+    sections = [f"[{number}] {body}" for number, (_, body, _) in enumerate(packed, 1)]
+    used = [candidates[position][0] for position, _, _ in packed]
+    return '\n\n'.join(sections), used, total
+
+
+def build_messages(question, context, history):
+    """组装发给模型的消息：系统提示 + 历史对话 + 附带参考资料的本轮问题"""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages.extend(history)
+    if context:
+        content = f"参考资料：\n{context}\n\n问题：{question}"
+    else:
+        content = question
+    messages.append({"role": "user", "content": content})
+    return messages
+
+
+class RagChat:
+    """检索增强对话会话，保留最近若干轮对话作为上下文"""
+
+    def __init__(self, client=None, index=None, top_k=4, max_context_tokens=3000, max_history_turns=3,
+                 max_tokens=1024, temperature=0.3, timeout=120, token_counter=None):
+        self.client = client or get_client()
+        self.index = index or open_index()
+        self.counter = token_counter or load_token_counter()
+        self.top_k = top_k
+        self.max_context_tokens = max_context_tokens
+        self.max_history_turns = max_history_turns
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.history = []
+        self.last_sources = []
+        self.last_context_tokens = 0
+
+    def _context_budget(self, question):
+        """
+        计算参考资料可用的token数；历史对话使预算不足四分之一时，从最早的一轮开始丢弃
+        """
+        window = self.client.config.context_window
+        while True:
+            # 不含参考资料的提示词，加上"参考资料：/问题："的包装文字
+            prompt_tokens = self.counter.count_messages(build_messages(question, '', self.history)) + 8
+            budget = context_budget(self.counter, window, self.max_tokens, prompt_tokens, self.max_context_tokens)
+            if not self.history or budget >= min(self.max_context_tokens, window // 4):
+                return budget
+            self.history = self.history[2:]
+
+    def ask(self, question, on_delta=None):
+        """回答一个问题，流式输出通过on_delta回调，返回StreamStats"""
+        budget = self._context_budget(question)
+        context, self.last_sources, self.last_context_tokens = retrieve(
+            self.index, question, self.counter, self.top_k, budget
+        )
+        stats = self.client.stream_chat(
+            build_messages(question, context, self.history), on_delta=on_delta,
+            max_tokens=self.max_tokens, temperature=self.temperature, timeout=self.timeout,
+        )
+
+        # 历史中只保留问题原文和回答，参考资料每轮重新检索
+        self.history.extend([
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": stats.text},
+        ])
+        self.history = self.history[-2 * self.max_history_turns:]
+        return stats
+
+    def clear(self):
+        self.history = []
+
+
+def print_turn_stats(stats, sources, context_tokens=None):
+    """打印本轮的检索来源、首字延迟和生成速度"""
+    ttft = f"{stats.ttft * 1000:.0f}ms" if stats.ttft is not None else "N/A"
+    if stats.token_source == 'cache':
+        print(f"\n⚡ 命中缓存 | 耗时: {stats.total_time * 1000:.1f}ms | 输出tokens: {stats.completion_tokens}")
+    else:
+        estimated = "" if stats.token_source == 'usage' else "（估算）"
+        print(f"\n⏱️  首字延迟: {ttft} | 总耗时: {stats.total_time:.2f}s | "
+              f"输出tokens: {stats.completion_tokens}{estimated} | 速度: {stats.tokens_per_second:.1f} tokens/s")
+    if sources:
+        size = f"（约{context_tokens} tokens）" if context_tokens else ""
+        print(f"📚 参考资料{size}: " + "；".join(
+            f"[{i}] {source.get('question', '')}" for i, source in enumerate(sources, 1)
+        ))
+
+
+def chat_once(chat, question):
+    print(f"👤 {question}")
+    print("🤖 ", end='', flush=True)
+    try:
+        stats = chat.ask(question, on_delta=lambda text: print(text, end='', flush=True))
+    except requests.exceptions.Timeout:
+        print("\n❌ 请求超时")
+        return False
+    except requests.exceptions.ConnectionError:
+        print("\n❌ 连接错误")
+        print("💡 提示: 请检查网络连接和端点地址是否正确")
+        return False
+    except requests.exceptions.HTTPError as e:
+        print(f"\n❌ 请求失败: {e}")
+        return False
+    print_turn_stats(stats, chat.last_sources, chat.last_context_tokens)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基于JavaGuide知识库的检索增强对话')
+    parser.add_argument('-q', '--question', help='只回答一个问题后退出')
+    parser.add_argument('--endpoint', help='OpenAI兼容接口地址（默认读取LLM_ENDPOINT）')
+    parser.add_argument('--model', help='模型名称（默认读取LLM_MODEL）')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='BM25索引目录')
+    parser.add_argument('-k', '--top-k', type=int, default=4, help='每轮检索的知识块数量')
+    parser.add_argument('--max-context-tokens', type=int, default=3000, help='参考资料的最大token数')
+    parser.add_argument('--context-window', type=int, help='模型的上下文长度（默认读取LLM_CONTEXT_WINDOW）')
+    parser.add_argument('--tokenizer', help='统计token的分词器（默认读取TOKENIZER，未设置时为近似估算）')
+    parser.add_argument('--max-tokens', type=int, default=1024, help='回答的最大token数')
+    parser.add_argument('--temperature', type=float, default=0.3)
+    parser.add_argument('--no-cache', action='store_true', help='不读写响应缓存')
+    args = parser.parse_args()
+
+    client = LLMClient(endpoint=args.endpoint, model=args.model, context_window=args.context_window,
+                       cache=False if args.no_cache else None)
+    chat = RagChat(
+        client=client, index=open_index(args.index_dir),
+        top_k=args.top_k, max_context_tokens=args.max_context_tokens,
+        max_tokens=args.max_tokens, temperature=args.temperature,
+        token_counter=load_token_counter(args.tokenizer),
+    )
+
+    if args.question:
+        return 0 if chat_once(chat, args.question) else 1
+
+    print("💬 JavaGuide知识库问答（输入 /clear 清空对话历史，/exit 退出）")
+    print(f"📡 端点: {client.endpoint}")
+    print(f"🤖 模型: {client.config.model}")
+    print("=" * 60)
+    while True:
+        try:
+            question = input("\n> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        if not question:
+            continue
+        if question in ('/exit', '/quit'):
+            break
+        if question == '/clear':
+            chat.clear()
+            print("🧹 已清空对话历史")
+            continue
+        chat_once(chat, question)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
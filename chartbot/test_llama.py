@@ -2,26 +2,28 @@
 # -*- coding: utf-8 -*-
 """
 测试vLLM Meta Llama 3.3 70B模型
+端点和模型通过环境变量或 .env 文件配置（LLM_ENDPOINT / LLM_MODEL），见llm_client
+重复的问题默认从本地缓存返回（见llm_cache），加 --no-cache 参数时每次都请求模型
 """
 
+import os
+import sys
+
 import requests
-import json
 import time
 
+from llm_client import get_client
+
 def test_vllm_model():
     """
     测试vLLM模型API
     """
-    # 模型配置
-    config = {
-        "endpoint": "http://10.2.4.153:80/v1",
-        "model": "ibnzterrell/Meta-Llama-3.3-70B-Instruct-AWQ-INT4"
-    }
+    client = get_client()
     
     print("🚀 开始测试vLLM Meta Llama 3.3 70B模型")
     print("=" * 60)
-    print(f"📡 端点: {config['endpoint']}")
-    print(f"🤖 模型: {config['model']}")
+    print(f"📡 端点: {client.endpoint}")
+    print(f"🤖 模型: {client.config.model}")
     print("=" * 60)
     
     # 测试消息
@@ -32,15 +34,6 @@ def test_vllm_model():
         }
     ]
     
-    # 构造请求数据
-    request_data = {
-        "model": config["model"],
-        "messages": test_messages,
-        "max_tokens": 512,
-        "temperature": 0.7,
-        "stream": False
-    }
-    
     try:
         print("📤 发送请求...")
         print(f"💬 用户消息: {test_messages[0]['content']}")
@@ -48,53 +41,43 @@ def test_vllm_model():
         # 记录开始时间
         start_time = time.time()
         
-        # 发送POST请求
-        response = requests.post(
-            f"{config['endpoint']}/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-            },
-            json=request_data,
-            timeout=60
-        )
+        # 发送请求（429/5xx自动重试，整体截止时间60秒）
+        result = client.chat(test_messages, max_tokens=512, temperature=0.7, timeout=60)
         
         # 记录响应时间
         response_time = time.time() - start_time
         
         print(f"⏱️  响应时间: {response_time:.2f}秒")
-        print(f"📊 状态码: {response.status_code}")
         
-        if response.status_code == 200:
-            result = response.json()
+        # 提取模型回复
+        if "choices" in result and len(result["choices"]) > 0:
+            assistant_message = result["choices"][0]["message"]["content"]
             
-            # 提取模型回复
-            if "choices" in result and len(result["choices"]) > 0:
-                assistant_message = result["choices"][0]["message"]["content"]
-                
-                print("✅ 模型响应成功!")
-                print("-" * 40)
-                print("🤖 Llama 3.3回复:")
-                print(f"📝 {assistant_message}")
-                print("-" * 40)
-                
-                # 显示一些统计信息
-                if "usage" in result:
-                    usage = result["usage"]
-                    print("📈 使用统计:")
-                    print(f"   输入tokens: {usage.get('prompt_tokens', 'N/A')}")
-                    print(f"   输出tokens: {usage.get('completion_tokens', 'N/A')}")
-                    print(f"   总计tokens: {usage.get('total_tokens', 'N/A')}")
-                
-                return True
-            else:
-                print("❌ 响应格式错误: 没有找到choices")
-                return False
-                
+            print("✅ 模型响应成功!")
+            print("-" * 40)
+            print("🤖 Llama 3.3回复:")
+            print(f"📝 {assistant_message}")
+            print("-" * 40)
+            
+            # 显示一些统计信息
+            if "usage" in result:
+                usage = result["usage"]
+                print("📈 使用统计:")
+                print(f"   输入tokens: {usage.get('prompt_tokens', 'N/A')}")
+                print(f"   输出tokens: {usage.get('completion_tokens', 'N/A')}")
+                print(f"   总计tokens: {usage.get('total_tokens', 'N/A')}")
+            
+            return True
         else:
-            print(f"❌ 请求失败: {response.status_code}")
-            print(f"错误信息: {response.text}")
+            print("❌ 响应格式错误: 没有找到choices")
             return False
             
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ 请求失败: {e}")
+        if e.response is not None:
+            print(f"错误信息: {e.response.text}")
+        return False
+        
     except requests.exceptions.Timeout:
         print("❌ 请求超时")
         print("💡 提示: 模型可能需要更多时间加载或推理")
@@ -114,22 +97,18 @@ def test_model_info():
     """
     获取模型信息
     """
-    endpoint = "http://10.2.4.153:80/v1"
+    client = get_client()
     
     try:
         print("\n🔍 获取模型信息...")
-        response = requests.get(f"{endpoint}/models", timeout=10)
+        models = client.models(timeout=10)
         
-        if response.status_code == 200:
-            models = response.json()
-            print("📋 可用模型列表:")
-            if "data" in models:
-                for model in models["data"]:
-                    print(f"   • {model.get('id', 'Unknown')}")
-            else:
-                print("   (无法获取模型列表)")
+        print("📋 可用模型列表:")
+        if models:
+            for model in models:
+                print(f"   • {model or 'Unknown'}")
         else:
-            print(f"❌ 无法获取模型信息: {response.status_code}")
+            print("   (无法获取模型列表)")
             
     except Exception as e:
         print(f"❌ 获取模型信息时出错: {e}")
@@ -139,10 +118,7 @@ def test_advanced_conversation():
     """
     测试更复杂的对话
     """
-    config = {
-        "endpoint": "http://10.2.4.153:80/v1",
-        "model": "ibnzterrell/Meta-Llama-3.3-70B-Instruct-AWQ-INT4"
-    }
+    client = get_client()
     
     print("\n🧠 测试高级对话能力...")
     
@@ -156,39 +132,44 @@ def test_advanced_conversation():
     for i, question in enumerate(test_questions, 1):
         print(f"\n📝 测试问题 {i}: {question}")
         
-        request_data = {
-            "model": config["model"],
-            "messages": [{"role": "user", "content": question}],
-            "max_tokens": 300,
-            "temperature": 0.7
-        }
-        
         try:
             start_time = time.time()
-            response = requests.post(
-                f"{config['endpoint']}/chat/completions",
-                headers={"Content-Type": "application/json"},
-                json=request_data,
-                timeout=30
+            result = client.chat(
+                [{"role": "user", "content": question}],
+                max_tokens=300, temperature=0.7, timeout=30
             )
             response_time = time.time() - start_time
             
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    answer = result["choices"][0]["message"]["content"]
-                    print(f"✅ 回答 ({response_time:.2f}s):")
-                    print(f"🤖 {answer[:200]}{'...' if len(answer) > 200 else ''}")
-                else:
-                    print("❌ 响应格式错误")
+            if "choices" in result and len(result["choices"]) > 0:
+                answer = result["choices"][0]["message"]["content"]
+                print(f"✅ 回答 ({response_time:.2f}s):")
+                print(f"🤖 {answer[:200]}{'...' if len(answer) > 200 else ''}")
             else:
-                print(f"❌ 请求失败: {response.status_code}")
+                print("❌ 响应格式错误")
                 
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ 请求失败: {e}")
         except Exception as e:
             print(f"❌ 错误: {e}")
 
 
+def print_cache_stats():
+    """
+    打印本次运行的缓存命中情况
+    """
+    cache = get_client().cache
+    if cache is None:
+        print("📦 响应缓存: 未启用")
+        return
+    stats = cache.stats()
+    print(f"📦 响应缓存: 本次命中 {stats['session_hits']} 次，未命中 {stats['session_misses']} 次，"
+          f"共 {stats['entries']} 条（{stats['path']}）")
+
+
 if __name__ == "__main__":
+    if '--no-cache' in sys.argv[1:]:
+        os.environ['LLM_CACHE'] = '0'
+
     print("🔬 vLLM Meta Llama 3.3 70B 模型测试")
     print("=" * 60)
     
@@ -202,6 +183,7 @@ if __name__ == "__main__":
         # 高级对话测试
         test_advanced_conversation()
         
+        print_cache_stats()
         print("\n🎉 测试完成!")
     else:
         print("\n❌ 基础测试失败，跳过后续测试")
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+清洗流程基准测试
+对一组固定的JavaGuide页面计时 JavaGuideCleaner.clean_html_content（端到端）以及各阶段：
+HTML解析、_find_main_content、章节结构解析（_build_section_tree）、markdownify、
+_clean_markdown_content、_markdown_to_text、_extract_keywords、token计数，
+输出 页面/秒、知识块/秒 和峰值内存（RSS），并可与基线比较，性能回退超过阈值时以非0状态退出
+
+页面：
+- fixtures.py生成的合成页面（small / typical / long-answers / huge，内容确定、可复现，huge为超大页面）
+- --pages 目录下保存的真实页面（*.html，例如 web_crawler.py --formats html 或 warc_archive.py show 保存的页面）
+
+每个页面在单独的子进程中测试，峰值RSS互不影响
+
+用法：
+    python script/benchmarks/bench_cleaning.py                     # 测试并与基线比较（基线不存在时只输出结果）
+    python script/benchmarks/bench_cleaning.py --save-baseline     # 测试并保存为新基线
+    python script/benchmarks/bench_cleaning.py --pages saved_pages/ --threshold 0.15
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+from pathlib import Path
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SCRIPT_DIR)
+
+from fixtures import make_javaguide_page
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaning_baseline.json')
+
+# 合成页面：名称 -> make_javaguide_page参数
+SYNTHETIC_PAGES = {
+    'small': dict(sections=3, questions_per_section=3, paragraphs=2, nav_links=50),
+    'typical': dict(sections=6, questions_per_section=5, paragraphs=4, nav_links=200),
+    'long-answers': dict(sections=4, questions_per_section=4, paragraphs=16, nav_links=200),
+    'huge': dict(sections=60, questions_per_section=20, paragraphs=4, nav_links=2000),
+}
+
+STAGES = ('parse', 'find_main_content', 'section_tree', 'markdownify', 'clean_markdown',
+          'markdown_to_text', 'keywords', 'token_count')
+# 表头中的简称
+STAGE_LABELS = {'parse': 'HTML解析', 'find_main_content': '主内容', 'section_tree': '章节结构',
+                'markdownify': 'markdownify', 'clean_markdown': 'MD清洗', 'markdown_to_text': '转纯文本',
+                'keywords': '关键词', 'token_count': 'token计数', 'other': '其他'}
+
+# 耗时低于此值（毫秒）的阶段不参与比较，避免计时噪声误报
+NOISE_FLOOR_MS = 5.0
+
+
+def load_pages(pages_dir=None):
+    """返回 {页面名称: HTML}，合成页面在前，按规模从小到大"""
+    pages = {name: make_javaguide_page(**params) for name, params in SYNTHETIC_PAGES.items()}
+    if pages_dir:
+        for path in sorted(Path(pages_dir).glob('*.htm*')):
+            pages[path.stem] = path.read_text(encoding='utf-8', errors='replace')
+    return pages
+
+
+class StageTimer:
+    """把被测函数替换为计时包装，按阶段累计耗时和调用次数"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+                self.calls[stage] += 1
+        return timed
+
+    def reset(self):
+        for stage in STAGES:
+            self.seconds[stage] = 0.0
+            self.calls[stage] = 0
+
+
+class _TimedCounter:
+    """token计数器的代理，只对count计时"""
+
+    def __init__(self, counter, timer):
+        self._counter = counter
+        self.count = timer.wrap('token_count', counter.count)
+
+    def __getattr__(self, name):
+        return getattr(self._counter, name)
+
+
+def instrument(cleaner, module, timer):
+    """为清洗器实例和所在模块安装阶段计时；各阶段互不嵌套，其余耗时计为other"""
+    module.BeautifulSoup = timer.wrap('parse', module.BeautifulSoup)
+    module.md = timer.wrap('markdownify', module.md)
+    cleaner._find_main_content = timer.wrap('find_main_content', cleaner._find_main_content)
+    cleaner._build_section_tree = timer.wrap('section_tree', cleaner._build_section_tree)
+    cleaner._clean_markdown_content = timer.wrap('clean_markdown', cleaner._clean_markdown_content)
+    cleaner._markdown_to_text = timer.wrap('markdown_to_text', cleaner._markdown_to_text)
+    cleaner._extract_keywords = timer.wrap('keywords', cleaner._extract_keywords)
+    cleaner.token_counter = _TimedCounter(cleaner.token_counter, timer)
+
+
+def run_page(html, repeat):
+    """
+    在当前进程中测试一个页面，返回结果字典
+    先不计阶段地重复测试端到端耗时，再安装阶段计时另外重复测试，两者均取中位数
+    """
+    from cleaners import javaguide_cleaner
+
+    cleaner = javaguide_cleaner.JavaGuideCleaner(use_cache=False)
+    url = 'https://javaguide.cn/benchmark.html'
+
+    chunks = cleaner.clean_html_content(html, url)  # 预热（规则编译、词表加载等一次性开销）
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cleaner.clean_html_content(html, url)
+        durations.append(time.perf_counter() - start)
+
+    timer = StageTimer()
+    instrument(cleaner, javaguide_cleaner, timer)
+    rounds = []
+    for _ in range(repeat):
+        timer.reset()
+        start = time.perf_counter()
+        cleaner.clean_html_content(html, url)
+        instrumented = time.perf_counter() - start
+        stage_ms = {stage: timer.seconds[stage] * 1000 for stage in STAGES}
+        stage_ms['other'] = max(instrumented * 1000 - sum(stage_ms.values()), 0.0)
+        rounds.append(stage_ms)
+    stages = {stage: statistics.median(stage_ms[stage] for stage_ms in rounds) for stage in rounds[0]}
+
+    seconds = statistics.median(durations)
+    return {
+        'bytes': len(html.encode('utf-8')),
+        'chunks': len(chunks),
+        'total_ms': seconds * 1000,
+        'min_ms': min(durations) * 1000,
+        'pages_per_s': 1 / seconds,
+        'chunks_per_s': len(chunks) / seconds,
+        'stages_ms': stages,
+        # Linux上ru_maxrss的单位为KB
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_isolated(name, html, repeat):
+    """在子进程中测试一个页面（峰值RSS只反映该页面）"""
+    digest = hashlib.sha1(html.encode('utf-8')).hexdigest()
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', str(repeat)],
+        input=html, capture_output=True, text=True, encoding='utf-8'
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} 测试失败:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['digest'] = digest[:12]
+    return result
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def print_results(results):
+    print(f"{'页面':<16}{'大小KB':>8}{'知识块':>8}{'耗时ms':>10}{'最短ms':>10}{'页面/秒':>10}{'知识块/秒':>11}"
+          f"{'峰值RSS MB':>12}")
+    print("=" * 85)
+    for name, result in results.items():
+        print(f"{name:<16}{result['bytes'] / 1024:>8.0f}{result['chunks']:>8}{result['total_ms']:>10.1f}"
+              f"{result['min_ms']:>10.1f}{result['pages_per_s']:>10.2f}{result['chunks_per_s']:>11.0f}{result['peak_rss_mb']:>12.1f}")
+
+    print()
+    columns = list(STAGES) + ['other']
+    print("各阶段耗时（ms，安装阶段计时后另外测试）")
+    print(f"{'页面':<16}" + ''.join(f"{STAGE_LABELS[stage]:>12}" for stage in columns))
+    print("-" * (16 + 12 * len(columns)))
+    for name, result in results.items():
+        print(f"{name:<16}" + ''.join(f"{result['stages_ms'][stage]:>12.1f}" for stage in columns))
+
+
+def _changes(checks, threshold):
+    return [(metric, old, new, (new - old) / old) for metric, old, new in checks
+            if old > 0 and (new - old) / old > threshold]
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较，返回 (回退项, 提示项)，每项为 (页面, 指标, 基线值, 当前值, 变化比例)
+    端到端耗时（取最短一次，受机器负载影响最小）和峰值RSS超过阈值为回退；
+    单个阶段的计时波动较大，超过阈值只作为定位问题的提示
+    """
+    regressions, warnings = [], []
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        if base.get('digest') != result['digest']:
+            print(f"⚠️ {name}: 页面内容与基线不同，跳过比较")
+            continue
+        gated = [('min_ms', base['min_ms'], result['min_ms']),
+                 ('peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb'])]
+        stages = [(f"stage:{stage}", base['stages_ms'].get(stage, 0.0), value)
+                  for stage, value in result['stages_ms'].items()
+                  if max(value, base['stages_ms'].get(stage, 0.0)) >= NOISE_FLOOR_MS]
+        regressions.extend((name, *change) for change in _changes(gated, threshold))
+        warnings.extend((name, *change) for change in _changes(stages, threshold))
+    return regressions, warnings
+
+
+def worker_main(repeat):
+    """子进程入口：从标准输入读取页面，结果以JSON输出到最后一行"""
+    # 清洗器的进度输出与结果分开
+    html = sys.stdin.read()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    try:
+        result = run_page(html, repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='清洗流程基准测试')
+    parser.add_argument('--pages', help='额外测试的已保存页面目录（*.html）')
+    parser.add_argument('--only', action='append', help='只测试指定的页面（可多次指定）')
+    parser.add_argument('--repeat', type=int, default=5, help='计时的重复次数（默认5）')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                       help='判定为性能回退的变化比例（默认0.2，即慢20%%或内存多20%%）')
+    parser.add_argument('--json', help='同时将结果写入此JSON文件')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args.worker)
+        return 0
+
+    pages = load_pages(args.pages)
+    if args.only:
+        pages = {name: html for name, html in pages.items() if name in args.only}
+    if not pages:
+        print("❌ 没有可测试的页面")
+        return 1
+
+    print(f"⏱️ 清洗基准测试：{len(pages)} 个页面，重复 {args.repeat} 次")
+    results = {}
+    for name, html in pages.items():
+        print(f"  ▶ {name} ...", flush=True)
+        results[name] = run_isolated(name, html, args.repeat)
+    print()
+    print_results(results)
+
+    report = {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+              'repeat': args.repeat, 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 已保存基线: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️ 没有基线文件（{args.baseline}），使用 --save-baseline 保存本次结果作为基线")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n📐 与基线比较（{baseline.get('created_at')}，阈值 {args.threshold:.0%}）")
+    if baseline.get('environment') != environment():
+        print("⚠️ 基线来自不同的运行环境，结果仅供参考")
+    regressions, warnings = compare(results, baseline, args.threshold)
+    for name, metric, old, new, change in warnings:
+        print(f"   ⚠️ {name} {metric}: {old:.1f} -> {new:.1f}（{change:+.0%}）")
+    if regressions:
+        print("=" * 85)
+        print(f"❌ 性能回退：{len(regressions)} 项超过阈值")
+        for name, metric, old, new, change in regressions:
+            print(f"   ❌ {name} {metric}: {old:.1f} -> {new:.1f}（{change:+.0%}）")
+        print("=" * 85)
+        return 1
+    print("✅ 没有超过阈值的性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebCrawler格式转换基准测试
+对比旧实现（html2text + html.parser各自解析一次）与单次lxml解析、按需生成格式的实现，
+输出每个页面的CPU耗时
+
+用法: python script/benchmarks/bench_crawler_formats.py [--repeat 5] [--html-file page.html]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from fixtures import make_javaguide_page
+from web_crawler import WebCrawler
+
+
+def legacy_convert(content):
+    """旧实现：html2text和BeautifulSoup(html.parser)分别解析整页"""
+    import html2text
+
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.ignore_images = False
+    h.ignore_tables = False
+    h.body_width = 0
+    h.unicode_snob = True
+    h.escape_snob = True
+    markdown_content = h.handle(content)
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+
+    return markdown_content, text
+
+
+def single_parse_convert(crawler, content):
+    """新实现：一次lxml解析，按crawler.formats生成需要的格式"""
+    outputs = {}
+    if 'html' in crawler.formats:
+        outputs['html'] = content
+    if crawler._needs_document():
+        document = crawler._parse(content)
+        if 'markdown' in crawler.formats:
+            outputs['markdown'] = crawler._convert_to_markdown(document)
+        if 'text' in crawler.formats:
+            outputs['text'] = crawler._extract_text(document)
+    return outputs
+
+
+def measure(func, repeat):
+    """返回每次调用的平均CPU耗时（毫秒）"""
+    func()  # 预热
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebCrawler格式转换基准测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每种方案重复次数（默认5）')
+    parser.add_argument('--sections', type=int, default=8, help='合成页面的二级标题数量（默认8）')
+    parser.add_argument('--questions', type=int, default=6, help='每个二级标题下的问题数量（默认6）')
+    parser.add_argument('--html-file', help='使用本地HTML文件代替合成页面')
+    args = parser.parse_args()
+
+    if args.html_file:
+        with open(args.html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+    else:
+        content = make_javaguide_page(sections=args.sections, questions_per_section=args.questions)
+
+    print(f"页面大小: {len(content) / 1024:.1f}KB，重复 {args.repeat} 次")
+    print("=" * 60)
+
+    baseline = measure(lambda: legacy_convert(content), args.repeat)
+    print(f"{'旧实现 (html2text + html.parser)':<40}{baseline:>10.1f} ms/页")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for formats in [('html', 'markdown', 'text'), ('markdown', 'text'), ('text',), ('html',)]:
+            crawler = WebCrawler(use_cache=False, formats=formats, output_dir=tmp_dir)
+            cost = measure(lambda: single_parse_convert(crawler, content), args.repeat)
+            saving = (1 - cost / baseline) * 100 if baseline else 0
+            label = f"单次lxml解析 formats={','.join(formats)}"
+            print(f"{label:<40}{cost:>10.1f} ms/页  (节省 {saving:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
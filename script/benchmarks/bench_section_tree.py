@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+章节结构解析基准测试
+对比旧实现（每个h2向后遍历兄弟节点收集h3，每个h3再遍历一次取正文）与单次遍历构建标题树的实现，
+只计时结构解析部分（不含Markdown转换），并校验两者得到的章节划分完全一致
+
+用法: python script/benchmarks/bench_section_tree.py [--sizes 10x10,40x25,80x50]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cleaners'))
+
+from bs4 import BeautifulSoup
+
+from fixtures import make_javaguide_page
+from javaguide_cleaner import JavaGuideCleaner
+
+
+def legacy_section_content(header_element):
+    """旧实现的 _get_section_content"""
+    content_elements = []
+    current = header_element.find_next_sibling()
+    header_level = int(header_element.name[1])
+    while current:
+        if current.name and current.name.startswith('h'):
+            if int(current.name[1]) <= header_level:
+                break
+        if current.name:
+            content_elements.append(current)
+        current = current.find_next_sibling()
+    return content_elements
+
+
+def legacy_sections(content):
+    """旧实现的 _parse_content_structure（只保留章节划分部分）"""
+    sections = []
+    for h2 in content.find_all('h2'):
+        h3_elements = []
+        current = h2.find_next_sibling()
+        while current:
+            if current.name == 'h2':
+                break
+            if current.name == 'h3':
+                h3_elements.append(current)
+            current = current.find_next_sibling()
+
+        if not h3_elements:
+            sections.append((h2.get_text(strip=True), legacy_section_content(h2)))
+            continue
+        for h3 in h3_elements:
+            sections.append((h3.get_text(strip=True), legacy_section_content(h3)))
+    return sections
+
+
+def tree_sections(cleaner, content):
+    """新实现：单次遍历构建标题树"""
+    sections = []
+    h2_sections, _ = cleaner._build_section_tree(content)
+    for h2 in h2_sections:
+        questions = h2.questions()
+        if not questions:
+            sections.append((h2.title, h2.content_elements()))
+            continue
+        for h3 in questions:
+            sections.append((h3.title, h3.content_elements()))
+    return sections
+
+
+def measure(func, repeat):
+    func()  # 预热
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='章节结构解析基准测试')
+    parser.add_argument('--sizes', default='10x10,40x25,80x50',
+                       help='页面规模列表，格式为 h2数量x每个h2下的h3数量（默认10x10,40x25,80x50）')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（默认3）')
+    args = parser.parse_args()
+
+    cleaner = JavaGuideCleaner(use_cache=False)
+
+    print(f"{'页面规模':<12}{'元素数':>8}{'旧实现(ms)':>14}{'标题树(ms)':>14}{'加速比':>10}")
+    print("=" * 58)
+    for size in args.sizes.split(','):
+        sections, questions = (int(value) for value in size.split('x'))
+        html = make_javaguide_page(sections=sections, questions_per_section=questions, paragraphs=4)
+        soup = BeautifulSoup(html, 'lxml')
+        content = cleaner._find_main_content(soup)
+
+        legacy = legacy_sections(content)
+        tree = tree_sections(cleaner, content)
+        if [(title, [id(e) for e in elements]) for title, elements in legacy] != \
+                [(title, [id(e) for e in elements]) for title, elements in tree]:
+            print(f"❌ {size}: 两种实现的章节划分不一致")
+            sys.exit(1)
+
+        element_count = len(content.find_all(True))
+        legacy_ms = measure(lambda: legacy_sections(content), args.repeat)
+        tree_ms = measure(lambda: tree_sections(cleaner, content), args.repeat)
+        print(f"{size:<12}{element_count:>8}{legacy_ms:>14.1f}{tree_ms:>14.1f}{legacy_ms / tree_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的JavaGuide风格HTML页面生成器
+生成结构与javaguide.cn文章页一致的合成页面（导航、侧边栏、h2/h3问答结构、代码块、列表、广告块），
+内容确定且可复现，便于在不联网的情况下比较不同实现的性能
+"""
+
+import html
+import random
+
+
+PARAGRAPH_SENTENCES = [
+    "Java 虚拟机（JVM）是运行 Java 字节码的虚拟机，针对不同系统有特定的实现。",
+    "字节码和不同系统的 JVM 实现是 Java 语言“一次编译，随处可以运行”的关键所在。",
+    "HashMap 在 JDK1.8 之后使用数组加链表加红黑树的结构来解决哈希冲突。",
+    "线程池通过复用线程降低资源消耗，提高响应速度，并便于统一管理线程。",
+    "Spring 的 IoC 容器负责对象的创建与依赖注入，AOP 则用于横切关注点的抽取。",
+    "MySQL 的 InnoDB 存储引擎支持事务、行级锁和外键，默认隔离级别为可重复读。",
+    "Redis 是基于内存的键值数据库，常用作缓存、分布式锁和消息队列。",
+    "TCP 通过三次握手建立连接，通过四次挥手释放连接，保证数据可靠传输。",
+    "volatile 关键字保证变量的可见性并禁止指令重排序，但不保证原子性。",
+    "在高并发场景下，可以通过限流、降级和熔断来保护系统的稳定性。",
+]
+
+CODE_SNIPPET = """public class Main {
+    public static void main(String[] args) {
+        Map<String, Integer> counts = new HashMap<>();
+        for (String word : args) {
+            counts.merge(word, 1, Integer::sum);
+        }
+        System.out.println(counts);
+    }
+}"""
+
+AD_BLOCK = "这是一则或许对你有用的小广告：👉 面试专版：准备 Java 面试的小伙伴可以考虑面试专版。"
+
+
+def _paragraph(rng, sentences=3):
+    return "<p>" + "".join(rng.choice(PARAGRAPH_SENTENCES) for _ in range(sentences)) + "</p>"
+
+
+def _heading(level, text, anchor):
+    return (f'<h{level} id="{anchor}" tabindex="-1">'
+            f'<a class="header-anchor" href="#{anchor}"><span>{text}</span></a></h{level}>')
+
+
+def _answer(rng, paragraphs):
+    parts = []
+    for index in range(paragraphs):
+        parts.append(_paragraph(rng))
+        if index % 3 == 1:
+            items = "".join(f"<li>{rng.choice(PARAGRAPH_SENTENCES)}</li>" for _ in range(4))
+            parts.append(f"<ul>{items}</ul>")
+        if index % 4 == 2:
+            parts.append(f'<div class="language-java" data-ext="java"><pre class="language-java">'
+                         f'<code>{html.escape(CODE_SNIPPET)}</code></pre></div>')
+    return "".join(parts)
+
+
+def make_javaguide_page(sections=6, questions_per_section=5, paragraphs=4, nav_links=200, seed=0):
+    """
+    生成一个JavaGuide风格的文章页面
+
+    sections              二级标题（分类）数量
+    questions_per_section 每个分类下的三级标题（问题）数量
+    paragraphs            每个问题下的段落数
+    nav_links             侧边栏中的站内链接数量
+    """
+    rng = random.Random(seed)
+
+    sidebar = "".join(
+        f'<li><a class="vp-sidebar-link" href="/java/basis/article-{i}.html">文章 {i}</a></li>'
+        for i in range(nav_links)
+    )
+
+    body = [f'<h1 id="title">Java基础常见面试题总结(合成{sections}x{questions_per_section})</h1>',
+            f'<div class="hint-container tip"><p>{AD_BLOCK}</p></div>']
+    for s_index in range(sections):
+        body.append(_heading(2, f"分类 {s_index}：基础概念与常识", f"section-{s_index}"))
+        body.append(_paragraph(rng, 2))
+        for q_index in range(questions_per_section):
+            anchor = f"q-{s_index}-{q_index}"
+            body.append(_heading(3, f"问题 {s_index}.{q_index}：Java 语言有哪些特点?", anchor))
+            body.append(_answer(rng, paragraphs))
+            if q_index % 2 == 0:
+                body.append(_heading(4, f"补充 {s_index}.{q_index}", anchor + "-extra"))
+                body.append(_paragraph(rng))
+        body.append(f'<p>推荐阅读：<a href="#section-{s_index}">相关文章</a></p>')
+
+    return f"""<!doctype html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>Java基础常见面试题总结 | JavaGuide</title>
+<script>window.__VUEPRESS__ = {{ "ssr": true }};</script>
+<style>.vp-sidebar {{ width: 18rem; }}</style>
+</head>
+<body>
+<div id="app">
+<header class="vp-navbar"><a class="vp-brand" href="/">JavaGuide</a></header>
+<aside class="vp-sidebar"><ul>{sidebar}</ul></aside>
+<main id="main-content" class="vp-page">
+<div class="theme-hope-content" vp-content>
+{''.join(body)}
+</div>
+</main>
+<footer class="vp-footer">Copyright © JavaGuide</footer>
+</div>
+<script type="module" src="/assets/app.js"></script>
+</body>
+</html>
+"""
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识块BM25倒排索引
+对清洗后知识块的 question / keywords / answer_text 建立倒排索引，分词使用中文bigram + 英文单词（text_tokens），
+词表、倒排列表和文档长度以紧凑的NumPy数组保存，查询时内存映射打开
+
+索引目录结构（knowledge/index/bm25）：
+    meta.json           文档数、平均文档长度、BM25参数
+    terms.npy           按字节序排序的词项（二分查找定位词项编号）
+    term_offsets.npy    每个词项在倒排数组中的起止位置（长度 = 词项数 + 1）
+    postings_docs.npy   倒排列表中的文档编号（uint32）
+    postings_tf.npy     对应的词频（uint16）
+    doc_lengths.npy     文档长度（词项数）
+    ids.npy             文档编号对应的chunk_id
+    docs.jsonl / doc_offsets.npy   知识块原文及其在文件中的偏移，按需读取单个文档
+
+用法：
+    python script/bm25_index.py build
+    python script/bm25_index.py query "HashMap 扩容" -k 5
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from chunk_io import load_unique_chunks
+from text_tokens import tokenize
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOURCE_DIR = os.path.join(BASE_DIR, 'knowledge', 'cleaned')
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, 'knowledge', 'index', 'bm25')
+
+# 各字段重复计入的次数，相当于简化的BM25F字段权重
+FIELD_WEIGHTS = {'question': 3, 'keywords': 2, 'answer_text': 1}
+
+INDEX_FILES = ('meta.json', 'terms.npy', 'term_offsets.npy', 'postings_docs.npy', 'postings_tf.npy',
+               'doc_lengths.npy', 'ids.npy', 'docs.jsonl', 'doc_offsets.npy')
+
+
+def document_tokens(chunk):
+    """知识块的加权词项列表"""
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = chunk.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        tokens.extend(tokenize(value) * weight)
+    return tokens
+
+
+def build_index(chunks, index_dir=DEFAULT_INDEX_DIR, k1=1.2, b=0.75):
+    """
+    为知识块建立BM25索引并写入index_dir
+    chunks为 {chunk_id: 知识块}，文档编号按chunks的顺序分配
+    """
+    chunk_ids = list(chunks)
+    if not chunk_ids:
+        raise ValueError("没有可用于建立索引的知识块")
+    os.makedirs(index_dir, exist_ok=True)
+    for name in INDEX_FILES:
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    postings = defaultdict(list)
+    doc_lengths = np.zeros(len(chunk_ids), dtype=np.uint32)
+    doc_offsets = np.zeros(len(chunk_ids), dtype=np.int64)
+
+    with open(os.path.join(index_dir, 'docs.jsonl'), 'wb') as docs_file:
+        for doc_id, chunk_id in enumerate(chunk_ids):
+            chunk = chunks[chunk_id]
+            counts = Counter(document_tokens(chunk))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term].append((doc_id, min(tf, 65535)))
+
+            doc_offsets[doc_id] = docs_file.tell()
+            docs_file.write(json.dumps(chunk, ensure_ascii=False).encode('utf-8'))
+            docs_file.write(b'\n')
+
+    # 词项按UTF-8字节序排序，与NumPy字节串数组的比较顺序一致，便于searchsorted
+    terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    postings_docs = np.empty(offsets[-1], dtype=np.uint32)
+    postings_tf = np.empty(offsets[-1], dtype=np.uint16)
+    for index, term in enumerate(terms):
+        entries = np.asarray(postings[term], dtype=np.uint32)
+        postings_docs[offsets[index]:offsets[index + 1]] = entries[:, 0]
+        postings_tf[offsets[index]:offsets[index + 1]] = entries[:, 1]
+
+    np.save(os.path.join(index_dir, 'terms.npy'), np.array([term.encode('utf-8') for term in terms]))
+    np.save(os.path.join(index_dir, 'term_offsets.npy'), offsets)
+    np.save(os.path.join(index_dir, 'postings_docs.npy'), postings_docs)
+    np.save(os.path.join(index_dir, 'postings_tf.npy'), postings_tf)
+    np.save(os.path.join(index_dir, 'doc_lengths.npy'), doc_lengths)
+    np.save(os.path.join(index_dir, 'doc_offsets.npy'), doc_offsets)
+    np.save(os.path.join(index_dir, 'ids.npy'), np.array([chunk_id.encode('utf-8') for chunk_id in chunk_ids]))
+
+    meta = {
+        'created_at': datetime.now().isoformat(),
+        'doc_count': len(chunk_ids),
+        'term_count': len(terms),
+        'posting_count': int(offsets[-1]),
+        'avg_doc_length': float(doc_lengths.mean()),
+        'k1': k1,
+        'b': b,
+        'field_weights': FIELD_WEIGHTS,
+    }
+    # meta.json最后写入，作为索引完整可用的标志
+    with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+class BM25Index:
+    """只读的BM25索引，各数组以内存映射方式打开"""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        meta_path = os.path.join(index_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"BM25索引不存在，请先运行 bm25_index.py build: {index_dir}")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode='r')
+
+        self.terms = load('terms.npy')
+        self.term_offsets = load('term_offsets.npy')
+        self.postings_docs = load('postings_docs.npy')
+        self.postings_tf = load('postings_tf.npy')
+        self.ids = load('ids.npy')
+        self.doc_offsets = load('doc_offsets.npy')
+
+        # 文档长度归一化项只与文档有关，打开索引时计算一次
+        k1, b = self.meta['k1'], self.meta['b']
+        doc_lengths = np.load(os.path.join(index_dir, 'doc_lengths.npy')).astype(np.float32)
+        self._doc_norms = k1 * (1 - b + b * doc_lengths / max(self.meta['avg_doc_length'], 1e-9))
+        self._docs_file = None
+
+    def __len__(self):
+        return self.meta['doc_count']
+
+    def _term_id(self, term):
+        key = term.encode('utf-8')
+        position = int(np.searchsorted(self.terms, key))
+        if position < len(self.terms) and self.terms[position] == key:
+            return position
+        return None
+
+    def idf(self, df):
+        n = self.meta['doc_count']
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query):
+        """返回所有文档对查询的BM25得分数组（未命中的文档为0）"""
+        scores = np.zeros(len(self), dtype=np.float32)
+        k1 = self.meta['k1']
+        for term, query_tf in Counter(tokenize(query)).items():
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+            start, stop = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.postings_docs[start:stop]
+            tf = self.postings_tf[start:stop].astype(np.float32)
+            # 每个倒排列表中的文档编号互不相同，可以直接按下标累加
+            scores[docs] += query_tf * self.idf(stop - start) * tf * (k1 + 1) / (tf + self._doc_norms[docs])
+        return scores
+
+    def search(self, query, k=10):
+        """检索得分最高的k个知识块，返回 [(文档编号, chunk_id, 得分), ...]"""
+        if k <= 0:
+            return []
+        scores = self.score(query)
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(doc_id), self.ids[doc_id].decode('utf-8'), float(scores[doc_id])) for doc_id in matched]
+
+    def document(self, doc_id):
+        """按文档编号读取知识块原文"""
+        if self._docs_file is None:
+            self._docs_file = open(os.path.join(self.index_dir, 'docs.jsonl'), 'rb')
+        self._docs_file.seek(int(self.doc_offsets[doc_id]))
+        return json.loads(self._docs_file.readline())
+
+    def close(self):
+        if self._docs_file is not None:
+            self._docs_file.close()
+            self._docs_file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='知识块BM25索引')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='索引目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='从清洗后的知识块构建索引')
+    build_parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help='知识块目录（递归读取）')
+    build_parser.add_argument('--k1', type=float, default=1.2)
+    build_parser.add_argument('--b', type=float, default=0.75)
+
+    query_parser = subparsers.add_parser('query', help='检索知识块')
+    query_parser.add_argument('text', nargs='+', help='查询文本（可以有多个）')
+    query_parser.add_argument('-k', '--top-k', type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        chunks = load_unique_chunks(args.source, skip_duplicates=True)
+        print(f"📚 读取到 {len(chunks)} 个知识块")
+        meta = build_index(chunks, args.index_dir, k1=args.k1, b=args.b)
+        print(f"✅ 索引构建完成：{meta['doc_count']} 个文档，{meta['term_count']} 个词项，"
+              f"{meta['posting_count']} 条倒排记录，耗时 {time.perf_counter() - start:.2f}秒")
+        print(f"📁 保存到: {args.index_dir}")
+        return 0
+
+    index = BM25Index(args.index_dir)
+    for text in args.text:
+        start = time.perf_counter()
+        hits = index.search(text, k=args.top_k)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔍 {text}（{elapsed:.3f}ms）")
+        for rank, (doc_id, chunk_id, score) in enumerate(hits, 1):
+            print(f"  {rank}. {score:.3f}  {index.document(doc_id).get('question', '')}  [{chunk_id}]")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
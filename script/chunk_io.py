@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识块的流式读写
+以JSONL格式（每行一个知识块）逐块追加写入，支持gzip/zstd压缩；
+读取端以生成器逐块返回，内存占用与文件大小无关
+"""
+
+import gzip
+import io
+import json
+import os
+from pathlib import Path
+
+
+# 支持的输出格式（文件后缀）
+OUTPUT_FORMATS = ('json', 'jsonl', 'jsonl.gz', 'jsonl.zst')
+
+# 可被读取的知识块文件后缀
+CHUNK_FILE_SUFFIXES = ('.json', '.jsonl', '.jsonl.gz', '.jsonl.zst')
+
+
+def _compression_of(path):
+    path = str(path).lower()
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise ImportError("zstd压缩需要安装zstandard: pip install zstandard")
+
+
+class ChunkWriter:
+    """
+    JSONL知识块写入器，按文件后缀自动选择压缩方式（.gz / .zst）
+
+    默认以追加模式打开：对已有文件继续写入会追加新的压缩帧（gzip member / zstd frame），
+    标准解压工具和iter_chunks都能连续读取
+    """
+
+    def __init__(self, path, append=True, flush_every=100):
+        self.path = str(path)
+        self.compression = _compression_of(self.path)
+        self.flush_every = flush_every
+        self.count = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 打开前已有文件的大小，None表示文件由本写入器创建（或被覆盖），用于discard恢复原状
+        self.initial_size = os.path.getsize(self.path) if append and os.path.exists(self.path) else None
+        mode = 'ab' if append else 'wb'
+        if self.compression == 'gzip':
+            self._raw = None
+            self._binary = gzip.open(self.path, mode)
+        elif self.compression == 'zstd':
+            zstandard = _import_zstandard()
+            self._raw = open(self.path, mode)
+            self._binary = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._raw = None
+            self._binary = open(self.path, mode)
+        self._stream = io.TextIOWrapper(self._binary, encoding='utf-8', newline='\n')
+
+    def write(self, chunk):
+        """写入一个知识块（一行JSON）"""
+        self._stream.write(json.dumps(chunk, ensure_ascii=False))
+        self._stream.write('\n')
+        self.count += 1
+        # 定期刷新，让下游在写入过程中就能读取到已产生的知识块
+        if self.flush_every and self.count % self.flush_every == 0:
+            self.flush()
+
+    def write_many(self, chunks):
+        """写入多个知识块，返回写入数量"""
+        written = 0
+        for chunk in chunks:
+            self.write(chunk)
+            written += 1
+        return written
+
+    def flush(self):
+        self._stream.flush()
+        if self.compression == 'zstd':
+            zstandard = _import_zstandard()
+            self._binary.flush(zstandard.FLUSH_BLOCK)
+
+    def close(self):
+        if self._stream.closed:
+            return
+        self._stream.close()
+        if self._raw is not None:
+            self._raw.close()
+
+    def discard(self):
+        """关闭并撤销本次写入：文件由本写入器创建时删除，追加到已有文件时截断回原来的大小"""
+        self.close()
+        if self.initial_size is None:
+            os.remove(self.path)
+        else:
+            os.truncate(self.path, self.initial_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _open_text(path):
+    compression = _compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        zstandard = _import_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_chunks(path):
+    """
+    逐个读取文件中的知识块
+    支持 .jsonl / .jsonl.gz / .jsonl.zst，以及旧版整体写入的 .json 数组文件
+    （.json文件需要整体加载，只为兼容已有数据）
+    """
+    path = str(path)
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+        return
+
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def list_chunk_files(directory):
+    """
+    列出目录（递归）下所有知识块文件，按路径排序
+    以'.'或'_'开头的文件和目录（如 _meta/ 下的清单、统计文件）不属于知识块，会被跳过
+    """
+    directory = Path(directory)
+    files = []
+    for path in directory.rglob('*'):
+        relative_parts = path.relative_to(directory).parts
+        if any(part.startswith(('.', '_')) for part in relative_parts):
+            continue
+        if path.is_file() and path.name.lower().endswith(CHUNK_FILE_SUFFIXES):
+            files.append(str(path))
+    return sorted(files)
+
+
+# SQLite知识库文件后缀（见knowledge_store）
+STORE_SUFFIXES = ('.sqlite3', '.sqlite', '.db')
+
+
+def iter_corpus(directory):
+    """
+    依次读取目录下所有知识块文件中的知识块
+    directory也可以是SQLite知识库文件，此时按chunk_id顺序读取其中的全部知识块
+    """
+    if str(directory).lower().endswith(STORE_SUFFIXES) and os.path.isfile(directory):
+        from knowledge_store import KnowledgeStore
+        with KnowledgeStore(directory) as store:
+            yield from store.iter_chunks(include_text=True)
+        return
+    for path in list_chunk_files(directory):
+        yield from iter_chunks(path)
+
+
+def load_unique_chunks(directory, skip_duplicates=False):
+    """
+    读取目录下所有知识块，按chunk_id去重，返回 {chunk_id: 知识块}
+    文件按路径排序读取，同一知识块出现在多个文件中（增量清洗）时以最后读到的为准
+    skip_duplicates为True时不返回被标注为近似重复（duplicate_of，见dedupe）的知识块
+    """
+    chunks = {}
+    for chunk in iter_corpus(directory):
+        chunk_id = chunk.get('chunk_id')
+        if chunk_id:
+            chunks[chunk_id] = chunk
+    if skip_duplicates:
+        chunks = {chunk_id: chunk for chunk_id, chunk in chunks.items() if not chunk.get('duplicate_of')}
+    return chunks
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识块清单（manifest）
+记录每个来源页面产生的知识块ID及其内容哈希，用于增量清洗：
+再次清洗时可判断知识块是新增、修改、删除还是未变化，未变化的知识块无需重新生成
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+
+class ChunkManifest:
+    """
+    清单文件格式：
+    {
+      "updated_at": "...",
+      "pages": {
+        "<source_url>": {"<chunk_id>": "<content_hash>", ...}
+      }
+    }
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.pages = {}
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.pages = json.load(f).get('pages', {})
+
+    def save(self):
+        """原子写入清单文件"""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        data = {'updated_at': datetime.now().isoformat(), 'pages': self.pages}
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_hash(self, source_url, chunk_id):
+        """返回清单中记录的内容哈希，不存在时返回None"""
+        return self.pages.get(source_url, {}).get(chunk_id)
+
+    def diff_page(self, source_url, entries):
+        """
+        对比页面本次清洗得到的 {chunk_id: content_hash} 与清单中的记录
+        返回包含 added / changed / removed / unchanged 四个ID列表的报告
+        """
+        previous = self.pages.get(source_url, {})
+        report = {
+            'url': source_url,
+            'entries': dict(entries),
+            'added': [],
+            'changed': [],
+            'removed': [chunk_id for chunk_id in previous if chunk_id not in entries],
+            'unchanged': [],
+        }
+        for chunk_id, content_hash in entries.items():
+            if chunk_id not in previous:
+                report['added'].append(chunk_id)
+            elif previous[chunk_id] != content_hash:
+                report['changed'].append(chunk_id)
+            else:
+                report['unchanged'].append(chunk_id)
+        return report
+
+    def apply(self, report):
+        """把diff_page得到的报告写入清单（需要调用save持久化）"""
+        self.pages[report['url']] = dict(report['entries'])
+
+
+def summarize_reports(reports):
+    """汇总多个页面的变更报告"""
+    summary = {'pages': len(reports), 'added': [], 'changed': [], 'removed': [], 'unchanged': []}
+    for report in reports:
+        for key in ('added', 'changed', 'removed', 'unchanged'):
+            summary[key].extend(report[key])
+    return summary
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识块大小规整
+按标题结构切出的知识块大小悬殊：整页正文可能成为一个知识块，有的h3回答只有一行。
+清洗后按token数规整：
+- 超过max_tokens的知识块在段落、代码块、列表项边界处切分，相邻两段重叠overlap_tokens，
+  切出的子块记录 parent_chunk_id / part_index / part_count，按part_index排列可还原原回答的顺序
+- 同一页面、同一sub_category下连续的过小知识块（少于min_tokens）合并为一个，
+  合并后的知识块记录 merged_chunk_ids 和各自的问题 questions
+"""
+
+import hashlib
+import re
+
+from token_counter import load_token_counter
+
+
+# 围栏代码块的起止行，允许位于引用块中（> ```java）
+FENCE = re.compile(r'^\s*(?:>\s*)*(```|~~~)')
+LIST_ITEM = re.compile(r'^(?:[*+-]|\d+[.)])\s')
+QUOTE = re.compile(r'^\s*>')
+# 句子边界：中英文句末标点或换行之后
+SENTENCE_END = re.compile(r'(?<=[。！？；!?;\n])')
+
+
+def split_blocks(markdown):
+    """
+    将Markdown按空行切分为块；围栏代码块内部的空行不切分，代码块始终是一个完整的块
+    """
+    blocks, current, fence = [], [], None
+    for line in markdown.split('\n'):
+        match = FENCE.match(line)
+        if fence:
+            current.append(line)
+            if match and match.group(1) == fence:
+                fence = None
+            continue
+        if match:
+            fence = match.group(1)
+            current.append(line)
+        elif line.strip():
+            current.append(line)
+        elif current:
+            blocks.append('\n'.join(current))
+            current = []
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def _content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+class ChunkSizer:
+    """
+    知识块大小规整，process以一个页面的知识块列表（清洗输出的顺序）为单位
+    to_text为Markdown转纯文本的函数，与清洗器保持一致（JavaGuideCleaner._markdown_to_text）
+    """
+
+    def __init__(self, to_text, max_tokens=512, min_tokens=64, overlap_tokens=64, counter=None):
+        if overlap_tokens * 2 > max_tokens:
+            raise ValueError("overlap_tokens不能超过max_tokens的一半")
+        self.to_text = to_text
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.overlap_tokens = overlap_tokens
+        self.counter = counter or load_token_counter()
+        self.split_count = 0
+        self.merged_count = 0
+
+    def _tokens(self, chunk):
+        if chunk.get('tokenizer') == self.counter.name and 'token_count' in chunk:
+            return chunk['token_count']
+        return self.counter.count(chunk.get('answer_markdown') or '')
+
+    def process(self, chunks):
+        """规整一个页面的知识块，返回新的知识块列表"""
+        sized = []
+        for chunk in self._merge_small(chunks):
+            if self._tokens(chunk) > self.max_tokens:
+                sized.extend(self._split(chunk))
+            else:
+                sized.append(chunk)
+        return sized
+
+    def summary(self):
+        return f"📏 知识块规整: 切分 {self.split_count} 个过大的知识块，合并 {self.merged_count} 个过小的知识块"
+
+    # 切分
+
+    def _pack(self, units, limit, joiner):
+        """把较小的单元依次拼接成不超过limit的片段"""
+        pieces, current = [], []
+        for unit in units:
+            # 按拼接后的实际文本计数，拼接符同样占用token
+            if current and self.counter.count(joiner.join(current + [unit])) > limit:
+                pieces.append(joiner.join(current))
+                current = []
+            current.append(unit)
+        if current:
+            pieces.append(joiner.join(current))
+        return pieces
+
+    def _units(self, block):
+        """
+        块的组成单元：代码块按行、列表按列表项、引用块按段落（引用中的代码块保持完整）、段落按句子
+        返回 (单元列表, 拼接符, 代码块的起止围栏或None)
+        """
+        lines = block.split('\n')
+        match = FENCE.match(lines[0])
+        if match:
+            # 结束围栏与开始围栏使用相同的引用前缀（> ```）
+            opening, closing = lines[0].strip(), lines[0][:match.end()].strip()
+            body = lines[1:-1] if len(lines) > 1 and FENCE.match(lines[-1]) else lines[1:]
+            return body, '\n', (opening, closing)
+        if LIST_ITEM.match(lines[0]):
+            items = []
+            for line in lines:
+                if LIST_ITEM.match(line) or not items:
+                    items.append(line)
+                else:
+                    items[-1] += '\n' + line
+            return items, '\n', None
+        if all(QUOTE.match(line) for line in lines):
+            return self._quote_units(lines), '\n', None
+        return [sentence for sentence in SENTENCE_END.split(block) if sentence], '', None
+
+    @staticmethod
+    def _quote_units(lines):
+        """引用块在空引用行（>）之后切分，引用中的围栏代码块单独作为一个单元"""
+        units, current, fence = [], [], None
+        for line in lines:
+            match = FENCE.match(line)
+            if match and fence is None:
+                if current:
+                    units.append('\n'.join(current))
+                current, fence = [line], match.group(1)
+                continue
+            current.append(line)
+            if match and match.group(1) == fence:
+                fence = None
+                units.append('\n'.join(current))
+                current = []
+            elif fence is None and not line.strip(' \t>'):
+                units.append('\n'.join(current))
+                current = []
+        if current:
+            units.append('\n'.join(current))
+        return units
+
+    def _split_block(self, block, limit):
+        """把超过limit的单个块切成不超过limit的片段"""
+        units, joiner, fence = self._units(block)
+        if fence:
+            opening, closing = fence
+            wrapper_tokens = self.counter.count(f"{opening}\n{closing}")
+            return [f"{opening}\n{piece}\n{closing}"
+                    for piece in self._pack(units, max(limit - wrapper_tokens, 1), joiner)]
+
+        pieces = []
+        for piece in self._pack(units, limit, joiner):
+            if FENCE.match(piece) and self.counter.count(piece) > limit:
+                # 引用块中过长的代码块按行切分，每段保留起止围栏
+                pieces.extend(self._split_block(piece, limit))
+                continue
+            # 单个句子（或列表项）仍然过长时按token数硬切
+            while self.counter.count(piece) > limit:
+                head = self.counter.truncate(piece, limit) or piece[:1]
+                pieces.append(head)
+                piece = piece[len(head):]
+            if piece.strip():
+                pieces.append(piece)
+        return pieces
+
+    def _tail(self, block, budget):
+        """块末尾不超过budget个token的完整单元（句子、行或列表项），用作下一段开头的重叠部分"""
+        units, joiner, fence = self._units(block)
+        if fence:
+            budget -= self.counter.count(f"{fence[0]}\n{fence[1]}")
+        tail, used = [], 0
+        for unit in reversed(units):
+            tokens = self.counter.count(unit)
+            if used + tokens > budget:
+                break
+            tail.insert(0, unit)
+            used += tokens
+        if not tail or len(tail) == len(units):
+            return None
+        text = joiner.join(tail).strip('\n')
+        return f"{fence[0]}\n{text}\n{fence[1]}" if fence else text
+
+    def _part_tokens(self, part):
+        """一段（若干块以空行拼接）的实际token数"""
+        return self.counter.count('\n\n'.join(block for block, _ in part))
+
+    def _split(self, chunk):
+        limit = self.max_tokens
+        blocks = []
+        for block in split_blocks(chunk.get('answer_markdown') or ''):
+            tokens = self.counter.count(block)
+            if tokens > limit - self.overlap_tokens:
+                blocks.extend((piece, self.counter.count(piece))
+                              for piece in self._split_block(block, limit - self.overlap_tokens))
+            else:
+                blocks.append((block, tokens))
+
+        parts, current = [], []
+        for block, tokens in blocks:
+            if current and self._part_tokens(current + [(block, tokens)]) > limit:
+                parts.append(current)
+                # 新的一段以上一段末尾不超过overlap_tokens的内容开头：先取完整的块，
+                # 剩余的重叠额度再从前一个块的末尾取完整的句子、行或列表项
+                carry, carried = [], 0
+                for previous in reversed(current):
+                    if carried + previous[1] > self.overlap_tokens:
+                        tail = self._tail(previous[0], self.overlap_tokens - carried)
+                        if tail:
+                            tail_tokens = self.counter.count(tail)
+                            carry.insert(0, (tail, tail_tokens))
+                            carried += tail_tokens
+                        break
+                    carry.insert(0, previous)
+                    carried += previous[1]
+                # 重叠部分加上新的块仍超过max_tokens时，从最前面开始去掉重叠的内容
+                while carry and self._part_tokens(carry + [(block, tokens)]) > limit:
+                    carry.pop(0)
+                current = carry
+            current.append((block, tokens))
+        if current:
+            parts.append(current)
+        if len(parts) <= 1:
+            return [chunk]
+
+        self.split_count += 1
+        children = []
+        for index, part in enumerate(parts, 1):
+            markdown = '\n\n'.join(block for block, _ in part)
+            children.append(self._derive(
+                chunk, f"{chunk['chunk_id']}-part{index}", chunk['question'], markdown,
+                parent_chunk_id=chunk['chunk_id'], part_index=index, part_count=len(parts),
+            ))
+        return children
+
+    # 合并
+
+    def _merge_small(self, chunks):
+        merged, run = [], []
+
+        def flush():
+            if len(run) > 1:
+                merged.append(self._merge(run))
+            else:
+                merged.extend(run)
+            run.clear()
+
+        run_tokens = 0
+        for chunk in chunks:
+            tokens = self._tokens(chunk)
+            small = tokens < self.min_tokens and chunk.get('sub_category')
+            if run and (not small or chunk.get('sub_category') != run[0].get('sub_category')
+                        or run_tokens + tokens > self.max_tokens):
+                flush()
+                run_tokens = 0
+            if small:
+                run.append(chunk)
+                run_tokens += tokens
+            else:
+                merged.append(chunk)
+        flush()
+        return merged
+
+    def _merge(self, run):
+        self.merged_count += len(run)
+        questions = [chunk['question'] for chunk in run]
+        markdown = '\n\n'.join(f"#### {chunk['question']}\n\n{chunk.get('answer_markdown', '')}" for chunk in run)
+        keywords = []
+        for chunk in run:
+            keywords.extend(keyword for keyword in chunk.get('keywords', []) if keyword not in keywords)
+        return self._derive(
+            run[0], run[0]['chunk_id'], '；'.join(questions), markdown,
+            questions=questions, merged_chunk_ids=[chunk['chunk_id'] for chunk in run], keywords=keywords[:10],
+        )
+
+    def _derive(self, base, chunk_id, question, markdown, **fields):
+        """以base为模板生成新的知识块，重新计算文本、哈希和大小"""
+        answer_text = self.to_text(markdown)
+        chunk = dict(base)
+        chunk.update({
+            'chunk_id': chunk_id,
+            'content_hash': _content_hash(markdown),
+            'question': question,
+            'answer_markdown': markdown,
+            'answer_text': answer_text,
+            'content_for_embedding': f"问题: {question}\n回答: {answer_text}",
+            'token_count': self.counter.count(markdown),
+            'tokenizer': self.counter.name,
+            'character_count': len(markdown),
+        })
+        chunk.update(fields)
+        return chunk
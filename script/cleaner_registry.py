@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+清洗器注册表
+清洗器模块为 script/cleaners/ 下的 *_cleaner.py，在模块顶层以字面量声明：
+    CLEANER_NAME = 'javaguide'                      # 清洗器名称（--cleaner 的取值）
+    CLEANER_CLASS = 'JavaGuideCleaner'              # 清洗器类名
+    DESCRIPTION = 'JavaGuide面试题文章'
+    URL_PATTERNS = [r'^https?://javaguide\\.cn/']    # 负责的URL（正则，re.search）
+注册表用ast读取这些常量而不执行模块，列出清洗器、按URL选择清洗器时不会导入bs4/lxml/markdownify，
+清洗器模块只在真正使用时通过 cleaners 包导入
+
+清洗器类的约定：
+    __init__(use_cache=True, incremental=False)
+    clean_document(soup, source_url) -> 知识块列表     # soup为共用的解析结果，不得修改
+    last_report / commit_manifest(reports) / open_chunk_writer / save_cleaned_data
+"""
+
+import ast
+import importlib
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from metrics import metrics
+
+
+CLEANERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaners')
+
+REGISTRY_FIELDS = ('CLEANER_NAME', 'CLEANER_CLASS', 'DESCRIPTION', 'URL_PATTERNS')
+
+
+@dataclass
+class CleanerSpec:
+    """一个已注册的清洗器（尚未导入）"""
+    name: str
+    module: str                     # cleaners包内的模块名，如 javaguide_cleaner
+    class_name: str
+    description: str = ''
+    url_patterns: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self._patterns = [re.compile(pattern) for pattern in self.url_patterns]
+
+    def matches(self, url):
+        return any(pattern.search(url) for pattern in self._patterns)
+
+    def load(self):
+        """导入清洗器模块，返回清洗器类"""
+        module = importlib.import_module(f"cleaners.{self.module}")
+        return getattr(module, self.class_name)
+
+    def create(self, **kwargs):
+        return self.load()(**kwargs)
+
+
+def _read_declarations(path):
+    """读取模块顶层的注册常量（只解析，不执行）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    values = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name in REGISTRY_FIELDS:
+                values[name] = ast.literal_eval(node.value)
+    return values
+
+
+@lru_cache(maxsize=None)
+def discover_cleaners(directory=CLEANERS_DIR):
+    """
+    扫描清洗器目录，返回 {名称: CleanerSpec}（按名称排序）
+    未声明CLEANER_CLASS的模块不是可注册的清洗器，跳过
+    """
+    specs = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('_cleaner.py'):
+            continue
+        declarations = _read_declarations(os.path.join(directory, filename))
+        if 'CLEANER_CLASS' not in declarations:
+            continue
+        module = filename[:-len('.py')]
+        name = declarations.get('CLEANER_NAME') or module[:-len('_cleaner')]
+        specs[name] = CleanerSpec(
+            name=name,
+            module=module,
+            class_name=declarations['CLEANER_CLASS'],
+            description=declarations.get('DESCRIPTION', ''),
+            url_patterns=list(declarations.get('URL_PATTERNS', [])),
+        )
+    return dict(sorted(specs.items()))
+
+
+def select_cleaners(source_url=None, names=None):
+    """
+    选择清洗某个来源的清洗器名称列表
+    names指定时直接使用（未知名称抛出ValueError）；否则按URL_PATTERNS匹配source_url，
+    没有URL的来源（本地文件）交给所有清洗器，找不到内容区域的清洗器会返回空结果
+    """
+    specs = discover_cleaners()
+    if names:
+        unknown = [name for name in names if name not in specs]
+        if unknown:
+            raise ValueError(f"未知的清洗器: {', '.join(unknown)}（可用: {', '.join(specs)}）")
+        return list(dict.fromkeys(names))
+    if not source_url or not source_url.startswith(('http://', 'https://')):
+        return list(specs)
+    return [name for name, spec in specs.items() if spec.matches(source_url)]
+
+
+def parse_document(html_content):
+    """解析HTML为清洗器共用的文档（BeautifulSoup，lxml解析器）"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html_content, 'lxml')
+
+
+def clean_page(cleaners, html_content, source_url):
+    """
+    同一页面交给多个清洗器：只解析一次，各清洗器共用解析结果
+    cleaners为 {名称: 清洗器实例}，返回 {名称: 知识块列表}
+    """
+    if not cleaners:
+        return {}
+    with metrics.stage('parse', source_url):
+        soup = parse_document(html_content)
+    return {name: cleaner.clean_document(soup, source_url) for name, cleaner in cleaners.items()}
@@ -12,35 +12,142 @@ from bs4 import BeautifulSoup
 from markdownify import markdownify as md
 import re
 import json
+import hashlib
 from datetime import datetime
+from pathlib import Path
 from urllib.parse import urlparse
 
+# 添加script目录到系统路径，以便复用公共模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HttpCache
+from chunk_io import ChunkWriter, OUTPUT_FORMATS
+from chunk_manifest import ChunkManifest, summarize_reports
+from knowledge_store import KnowledgeStore, DEFAULT_STORE_PATH
+from keyword_extractor import KeywordExtractor
+from markdown_rules import load_rule_engine
+from metrics import metrics
+from token_counter import load_token_counter
+
+
+# 清洗器注册信息：cleaner_registry直接读取这些常量（不导入本模块），按URL分派时据此选择清洗器
+CLEANER_NAME = 'javaguide'
+CLEANER_CLASS = 'JavaGuideCleaner'
+DESCRIPTION = 'JavaGuide面试题文章（javaguide.cn）'
+URL_PATTERNS = [r'^https?://(www\.)?javaguide\.cn/']
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# Markdown转纯文本时去掉的标记符号
+MARKDOWN_SYMBOLS = re.compile(r'[#*`_\[\]()!]')
+NEWLINES = re.compile(r'\n+')
+
+
+class _Section:
+    """标题层级树中的一个节点：标题元素、其直接正文以及下级标题"""
+    
+    __slots__ = ('heading', 'level', 'order', 'body', 'children', 'adopted')
+    
+    def __init__(self, heading, order):
+        self.heading = heading
+        self.level = int(heading.name[1])
+        self.order = order
+        self.body = []
+        self.children = []
+        self.adopted = []
+    
+    @property
+    def title(self):
+        return self.heading.get_text(strip=True)
+    
+    def questions(self):
+        """该节点下作为问题的h3节点"""
+        return [child for child in self.children if child.level == 3] + self.adopted
+    
+    def content_elements(self):
+        """标题之后直到下一个同级或更高级标题之间的全部元素（含下级标题本身）"""
+        elements = list(self.body)
+        for child in self.children:
+            elements.append(child.heading)
+            elements.extend(child.content_elements())
+        return elements
+
 
 class JavaGuideCleaner:
-    def __init__(self):
+    def __init__(self, use_cache=True, incremental=False):
         self.base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'knowledge')
         self.raw_dir = os.path.join(self.base_dir, 'raw')
         self.cleaned_dir = os.path.join(self.base_dir, 'cleaned', 'javaguide')
+        # 清单、变更记录等元数据（以_开头的目录不会被当作清洗结果读取）
+        self.meta_dir = os.path.join(self.cleaned_dir, '_meta')
         
         # 创建输出目录
         os.makedirs(self.cleaned_dir, exist_ok=True)
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        })
+        # 条件请求缓存，页面未变化时可跳过清洗
+        self.cache = HttpCache() if use_cache else None
+        # 最近一次clean_from_url的抓取结果，调用方可据此判断页面是否未变化
+        self.last_fetch = None
+        
+        # 知识块清单：记录每个页面的知识块ID和内容哈希
+        self.manifest = ChunkManifest(os.path.join(self.meta_dir, 'manifest.json'))
+        # 增量模式：知识块与清单记录完全一致的页面不再重新生成；页面有任何变化（新增/修改/删除）时
+        # 输出该页面的全部知识块，按页面进行的大小规整和知识库对账都需要完整的页面
+        self.incremental = incremental
+        # 只计算内容哈希、不生成知识块（增量模式下与清单对比时使用）
+        self._hash_only = False
+        # 最近一次clean_html_content的变更报告（新增/修改/删除/未变化）
+        self.last_report = None
+        self._page_entries = {}
+        
+        # 关键词提取器：词表见script/resources/tech_vocabulary.txt，
+        # DF统计由 keyword_extractor.py fit 根据已清洗的知识块生成
+        self.keyword_extractor = KeywordExtractor(
+            stats_path=os.path.join(self.meta_dir, 'keyword_stats.json')
+        )
+        # Markdown清洗规则（script/resources/javaguide_markdown_rules.json），每个进程只编译一次
+        self.markdown_rules = load_rule_engine()
+        # token计数器（环境变量TOKENIZER指定，默认离线近似估算），用于预估提示词长度
+        self.token_counter = load_token_counter()
     
-    def clean_from_url(self, url):
+    def clean_from_url(self, url, skip_unchanged=False):
         """
         直接从URL获取内容并清洗
+        skip_unchanged=True时，若页面自上次抓取以来未变化(304)则不清洗，返回空列表，
+        可通过 self.last_fetch.not_modified 区分“未变化”和“失败”
         """
+        self.last_fetch = None
         try:
-            print(f"正在获取网页内容: {url}")
-            response = requests.get(url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding or 'utf-8'
+            metrics.debug('fetch_start', f"正在获取网页内容: {url}", url=url)
+            with metrics.stage('fetch', url) as span:
+                if self.cache:
+                    self.last_fetch = self.cache.fetch(self.session, url, timeout=30)
+                    html_content = self.last_fetch.text
+                    bytes_received = self.last_fetch.bytes_received
+                else:
+                    response = self.session.get(url, timeout=30)
+                    response.raise_for_status()
+                    response.encoding = response.apparent_encoding or 'utf-8'
+                    html_content = response.text
+                    bytes_received = len(response.content)
+                span['bytes'] = bytes_received
+            metrics.count('pages_fetched')
+            metrics.count('bytes_fetched', bytes_received)
+            if self.last_fetch and self.last_fetch.not_modified:
+                metrics.count('pages_not_modified')
+                metrics.debug('not_modified', "页面未变化(304)，使用本地缓存", url=url)
+                if skip_unchanged:
+                    return []
             
-            return self.clean_html_content(response.text, url)
+            return self.clean_html_content(html_content, url)
             
         except requests.RequestException as e:
-            print(f"请求失败: {e}")
+            metrics.count('fetch_errors')
+            metrics.warning('fetch_failed', f"请求失败: {e}", url=url, error=str(e))
             return []
     
     def clean_from_file(self, html_file_path, source_url=None):
@@ -52,36 +159,73 @@ class JavaGuideCleaner:
                 html_content = f.read()
             
             if not source_url:
-                # 尝试从文件名推断URL
-                filename = os.path.basename(html_file_path)
-                source_url = f"本地文件: {filename}"
+                # 以绝对路径的file:// URI作为来源URL，不同目录中的同名文件不会共用清单记录和知识块ID
+                source_url = Path(html_file_path).resolve().as_uri()
             
             return self.clean_html_content(html_content, source_url)
             
         except Exception as e:
-            print(f"读取文件失败: {e}")
+            metrics.warning('read_failed', f"读取文件失败: {e}", path=html_file_path, error=str(e))
             return []
     
     def clean_html_content(self, html_content, source_url):
         """
-        清洗HTML内容的核心方法
+        清洗HTML内容
+        """
+        with metrics.stage('parse', source_url):
+            soup = BeautifulSoup(html_content, 'lxml')
+        return self.clean_document(soup, source_url)
+    
+    def clean_document(self, soup, source_url):
+        """
+        清洗已解析文档（BeautifulSoup，lxml解析器）的核心方法
+        只读取文档、不修改文档，同一页面的多个清洗器可共用一次解析结果（见cleaner_registry.clean_page）
         """
-        soup = BeautifulSoup(html_content, 'lxml')
+        self.last_report = None
+        self._page_entries = {}
         
         # 查找主要内容区域
         main_content = self._find_main_content(soup)
         if not main_content:
-            print("未找到主要内容区域")
+            metrics.info('no_main_content', "未找到主要内容区域", url=source_url)
             return []
         
         # 提取文章元数据
         article_title = self._extract_title(main_content)
-        print(f"文章标题: {article_title}")
+        metrics.debug('article', f"文章标题: {article_title}", url=source_url, title=article_title)
         
-        # 结构化解析内容
-        knowledge_chunks = self._parse_content_structure(main_content, article_title, source_url)
-        
-        print(f"成功提取 {len(knowledge_chunks)} 个知识块")
+        if self.incremental:
+            # 先只计算各知识块的内容哈希（不做Markdown转换）与清单对比，页面有变化时再完整生成整个页面
+            self._hash_only = True
+            try:
+                self._parse_content_structure(main_content, article_title, source_url)
+            finally:
+                self._hash_only = False
+            self.last_report = self.manifest.diff_page(source_url, self._page_entries)
+            report = self.last_report
+            knowledge_chunks = []
+            if report['added'] or report['changed'] or report['removed']:
+                self._page_entries = {}
+                knowledge_chunks = self._parse_content_structure(main_content, article_title, source_url)
+        else:
+            # 结构化解析内容
+            knowledge_chunks = self._parse_content_structure(main_content, article_title, source_url)
+            
+            # 与清单对比，得到本页面的变更情况
+            self.last_report = self.manifest.diff_page(source_url, self._page_entries)
+        
+        metrics.count('pages_cleaned')
+        metrics.count('chunks_extracted', len(knowledge_chunks))
+        if self.incremental:
+            report = self.last_report
+            metrics.debug('page_cleaned', f"成功提取 {len(knowledge_chunks)} 个知识块（新增 {len(report['added'])}，"
+                          f"修改 {len(report['changed'])}，删除 {len(report['removed'])}，未变化 {len(report['unchanged'])}）",
+                          url=source_url, chunks=len(knowledge_chunks), added=len(report['added']),
+                          changed=len(report['changed']), removed=len(report['removed']),
+                          unchanged=len(report['unchanged']))
+        else:
+            metrics.debug('page_cleaned', f"成功提取 {len(knowledge_chunks)} 个知识块",
+                          url=source_url, chunks=len(knowledge_chunks))
         return knowledge_chunks
     
     def _find_main_content(self, soup):
@@ -121,66 +265,108 @@ class JavaGuideCleaner:
         
         return "未知标题"
     
+    def _build_section_tree(self, content):
+        """
+        单次遍历构建标题层级树（h1~h6）
+        
+        标题按所在父元素分组，每组只顺序扫描一遍直接子元素，用栈维护当前打开的标题：
+        遇到同级或更高级标题时出栈，其余元素归入栈顶标题的正文。
+        不在任何h2之下的h3（如位于h1之后）会挂到同一父元素中上一个h2下（adopted），
+        与按兄弟节点查找h3的行为一致。
+        
+        返回按文档顺序排列的 (h2节点列表, h3节点列表)
+        """
+        headings = content.find_all(HEADING_TAGS)
+        order = {id(heading): index for index, heading in enumerate(headings)}
+        
+        containers = {}
+        for heading in headings:
+            containers.setdefault(id(heading.parent), heading.parent)
+        
+        h2_sections, h3_sections = [], []
+        for container in containers.values():
+            stack = []
+            last_h2 = None
+            for element in container.children:
+                if not getattr(element, 'name', None):
+                    continue  # 忽略纯文本节点
+                
+                if id(element) in order:
+                    section = _Section(element, order[id(element)])
+                    while stack and stack[-1].level >= section.level:
+                        stack.pop()
+                    parent = stack[-1] if stack else None
+                    if section.level == 3 and last_h2 is not None and (parent is None or parent.level < 2):
+                        last_h2.adopted.append(section)
+                    elif parent is not None:
+                        parent.children.append(section)
+                    
+                    if section.level == 2:
+                        last_h2 = section
+                        h2_sections.append(section)
+                    elif section.level == 3:
+                        h3_sections.append(section)
+                    stack.append(section)
+                elif stack:
+                    stack[-1].body.append(element)
+        
+        h2_sections.sort(key=lambda section: section.order)
+        h3_sections.sort(key=lambda section: section.order)
+        return h2_sections, h3_sections
+    
     def _parse_content_structure(self, content, article_title, source_url):
         """
         解析内容结构，提取Q&A对
         """
         knowledge_chunks = []
         
-        # 查找所有的二级标题作为分类
-        h2_elements = content.find_all('h2')
+        with metrics.stage('section_split', source_url):
+            h2_sections, h3_sections = self._build_section_tree(content)
         
-        if not h2_elements:
+        if not h2_sections:
             # 如果没有h2，尝试h3
-            return self._parse_simple_structure(content, article_title, source_url)
+            return self._parse_simple_structure(content, h3_sections, article_title, source_url)
         
-        for h2 in h2_elements:
-            sub_category = h2.get_text(strip=True)
-            
-            # 查找当前h2下的所有h3
-            h3_elements = []
-            current = h2.find_next_sibling()
+        for h2 in h2_sections:
+            sub_category = h2.title
             
-            while current:
-                if current.name == 'h2':
-                    break
-                if current.name == 'h3':
-                    h3_elements.append(current)
-                current = current.find_next_sibling()
+            # 当前h2下的所有h3
+            h3_sections = h2.questions()
             
             # 如果没有h3，将整个h2section作为一个知识块
-            if not h3_elements:
-                content_elements = self._get_section_content(h2)
+            if not h3_sections:
+                content_elements = h2.content_elements()
                 if content_elements:
                     chunk = self._create_knowledge_chunk(
                         sub_category, "", content_elements, 
                         article_title, sub_category, source_url
                     )
-                    knowledge_chunks.append(chunk)
+                    if chunk:
+                        knowledge_chunks.append(chunk)
                 continue
             
             # 处理每个h3
-            for h3 in h3_elements:
-                question = h3.get_text(strip=True)
-                content_elements = self._get_section_content(h3)
+            for h3 in h3_sections:
+                question = h3.title
+                content_elements = h3.content_elements()
                 
                 if content_elements:
                     chunk = self._create_knowledge_chunk(
                         question, sub_category, content_elements,
                         article_title, sub_category, source_url
                     )
-                    knowledge_chunks.append(chunk)
+                    if chunk:
+                        knowledge_chunks.append(chunk)
         
         return knowledge_chunks
     
-    def _parse_simple_structure(self, content, article_title, source_url):
+    def _parse_simple_structure(self, content, h3_sections, article_title, source_url):
         """
         解析简单结构（只有h3或更简单的结构）
         """
         knowledge_chunks = []
-        h3_elements = content.find_all('h3')
         
-        if not h3_elements:
+        if not h3_sections:
             # 没有明确的标题结构，将整个内容作为一个块
             all_text = content.get_text(strip=True)
             if all_text:
@@ -188,62 +374,59 @@ class JavaGuideCleaner:
                     article_title, "", [content],
                     article_title, "通用", source_url
                 )
-                knowledge_chunks.append(chunk)
+                if chunk:
+                    knowledge_chunks.append(chunk)
             return knowledge_chunks
         
-        for h3 in h3_elements:
-            question = h3.get_text(strip=True)
-            content_elements = self._get_section_content(h3)
+        for h3 in h3_sections:
+            question = h3.title
+            content_elements = h3.content_elements()
             
             if content_elements:
                 chunk = self._create_knowledge_chunk(
                     question, "", content_elements,
                     article_title, "通用", source_url
                 )
-                knowledge_chunks.append(chunk)
+                if chunk:
+                    knowledge_chunks.append(chunk)
         
         return knowledge_chunks
     
-    def _get_section_content(self, header_element):
-        """
-        获取标题元素后面的内容，直到下一个同级或更高级标题
-        """
-        content_elements = []
-        current = header_element.find_next_sibling()
-        header_level = int(header_element.name[1]) if header_element.name.startswith('h') else 999
-        
-        while current:
-            if current.name and current.name.startswith('h'):
-                current_level = int(current.name[1])
-                if current_level <= header_level:
-                    break
-            
-            if current.name:  # 忽略纯文本节点
-                content_elements.append(current)
-            current = current.find_next_sibling()
-        
-        return content_elements
-    
     def _create_knowledge_chunk(self, question, sub_category, content_elements, 
                                article_title, category, source_url):
         """
         创建知识块JSON对象
+        只计算内容哈希时（增量模式与清单对比）记录ID和哈希后返回None
         """
         # 将内容元素转换为HTML字符串
         answer_html = "".join(str(elem) for elem in content_elements)
         
-        # 转换为Markdown格式
-        answer_md = md(answer_html, heading_style="ATX")
+        # 由来源URL和标题路径生成稳定ID，由原始HTML计算内容哈希
+        heading_path = [article_title] + ([sub_category] if sub_category else []) + [question]
+        chunk_id = self._generate_chunk_id(source_url, heading_path)
+        content_hash = self._content_hash(answer_html)
+        self._page_entries[chunk_id] = content_hash
+        
+        if self._hash_only:
+            return None
         
-        # 清洗内容
-        answer_md = self._clean_markdown_content(answer_md)
+        with metrics.stage('markdown', source_url, emit=False):
+            # 转换为Markdown格式
+            answer_md = md(answer_html, heading_style="ATX")
+            
+            # 清洗内容，纯文本只生成一次
+            answer_md = self._clean_markdown_content(answer_md)
+            answer_text = self._markdown_to_text(answer_md)
         
-        # 生成唯一ID
-        chunk_id = self._generate_chunk_id(article_title, question)
+        # 补充关键词和token数
+        with metrics.stage('enrich', source_url, emit=False):
+            keywords = self._extract_keywords(question + " " + answer_md)
+            token_count = self.token_counter.count(answer_md.strip())
         
         # 创建知识块
         chunk = {
             "chunk_id": chunk_id,
+            "content_hash": content_hash,
             "source_info": {
                 "name": "JavaGuide",
                 "url": source_url,
@@ -254,10 +437,11 @@ class JavaGuideCleaner:
             "sub_category": sub_category,
             "question": question,
             "answer_markdown": answer_md.strip(),
-            "answer_text": self._markdown_to_text(answer_md),
-            "content_for_embedding": f"问题: {question}\n回答: {self._markdown_to_text(answer_md)}",
-            "keywords": self._extract_keywords(question + " " + answer_md),
-            "word_count": len(answer_md.split()),
+            "answer_text": answer_text,
+            "content_for_embedding": f"问题: {question}\n回答: {answer_text}",
+            "keywords": keywords,
+            "token_count": token_count,
+            "tokenizer": self.token_counter.name,
             "character_count": len(answer_md)
         }
         
@@ -266,88 +450,128 @@ class JavaGuideCleaner:
     def _clean_markdown_content(self, markdown_text):
         """
         清洗Markdown内容
+        移除广告、推荐阅读、锚点链接等不需要的内容并清理多余的空行，规则见markdown_rules
         """
-        # 移除广告等不需要的内容
-        patterns_to_remove = [
-            r'这是一则或许对你有用的小广告.*',
-            r'推荐阅读.*',
-            r'相关推荐.*',
-            r'点击关注.*',
-            r'扫码关注.*',
-            r'关注公众号.*',
-            r'\[.*?\]\(#.*?\)',  # 移除锚点链接
-        ]
-        
-        for pattern in patterns_to_remove:
-            markdown_text = re.sub(pattern, '', markdown_text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # 清理多余的空行
-        markdown_text = re.sub(r'\n\s*\n\s*\n', '\n\n', markdown_text)
-        
-        return markdown_text.strip()
+        return self.markdown_rules.apply(markdown_text).strip()
     
     def _markdown_to_text(self, markdown_text):
         """
         将Markdown转换为纯文本
         """
         # 移除Markdown标记
-        text = re.sub(r'[#*`_\[\]()!]', '', markdown_text)
-        text = re.sub(r'\n+', ' ', text)
+        text = MARKDOWN_SYMBOLS.sub('', markdown_text)
+        text = NEWLINES.sub(' ', text)
         return text.strip()
     
+    def rule_stats(self):
+        """返回Markdown清洗规则的命中次数"""
+        return self.markdown_rules.stats()
+    
     def _extract_keywords(self, text):
         """
-        提取关键词（简单实现）
+        提取关键词，按TF-IDF × 词条权重排序
         """
-        # 这里可以使用更复杂的NLP技术，现在先简单实现
-        tech_keywords = [
-            'Java', 'Spring', 'Maven', 'Gradle', 'JVM', 'MySQL', 'Redis',
-            'Docker', 'Kubernetes', 'Git', 'Linux', 'HTTP', 'TCP', 'IP',
-            '算法', '数据结构', '设计模式', '微服务', '分布式', '高并发'
-        ]
-        
-        found_keywords = []
-        text_lower = text.lower()
-        
-        for keyword in tech_keywords:
-            if keyword.lower() in text_lower:
-                found_keywords.append(keyword)
-        
-        return found_keywords[:10]  # 最多返回10个关键词
+        return self.keyword_extractor.extract(text, top_k=10)  # 最多返回10个关键词
     
-    def _generate_chunk_id(self, article_title, question):
+    def _generate_chunk_id(self, source_url, heading_path):
         """
-        生成唯一的chunk ID
+        生成稳定的chunk ID
+        由来源URL和标题路径（文章标题/分类/问题）决定，同一内容每次清洗得到相同的ID；
+        可读前缀仅便于人工查看，唯一性由完整路径的哈希保证
         """
-        base_id = f"javaguide-{article_title}-{question}"
-        # 清理特殊字符并截断
-        clean_id = re.sub(r'[^\w\-]', '_', base_id)[:100]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"{clean_id}_{timestamp}"
+        readable = re.sub(r'[^\w\-]', '_', heading_path[-1])[:40]
+        digest = hashlib.sha1(
+            "\x1f".join([source_url] + heading_path).encode('utf-8')
+        ).hexdigest()[:16]
+        chunk_id = f"javaguide-{readable}-{digest}"
+        
+        # 同一页面出现完全相同的标题路径时按出现顺序编号
+        candidate, index = chunk_id, 2
+        while candidate in self._page_entries:
+            candidate = f"{chunk_id}-{index}"
+            index += 1
+        return candidate
+    
+    def _content_hash(self, answer_html):
+        """计算知识块原始内容的哈希"""
+        return hashlib.sha256(answer_html.encode('utf-8')).hexdigest()[:32]
     
-    def save_cleaned_data(self, knowledge_chunks, filename=None):
+    def commit_manifest(self, reports):
         """
-        保存清洗后的数据
+        将页面变更报告写入清单并保存，同时在_meta目录下记录本次变更明细
+        应在清洗结果成功保存之后调用；返回变更明细文件路径
         """
-        if not knowledge_chunks:
-            print("没有数据需要保存")
+        reports = [report for report in reports if report]
+        if not reports:
             return None
         
+        for report in reports:
+            self.manifest.apply(report)
+        self.manifest.save()
+        
+        summary = summarize_reports(reports)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        changes_path = os.path.join(self.meta_dir, f"changes_{timestamp}.json")
+        with open(changes_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        
+        metrics.info('manifest_committed',
+                     f"📋 变更统计: 新增 {len(summary['added'])}，修改 {len(summary['changed'])}，"
+                     f"删除 {len(summary['removed'])}，未变化 {len(summary['unchanged'])}（明细: {changes_path}）",
+                     added=len(summary['added']), changed=len(summary['changed']),
+                     removed=len(summary['removed']), unchanged=len(summary['unchanged']), path=changes_path)
+        return changes_path
+    
+    def _output_path(self, filename, output_format):
+        """生成输出文件路径，未指定文件名时使用带时间戳的默认文件名"""
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"javaguide_cleaned_{timestamp}.json"
-        
-        output_path = os.path.join(self.cleaned_dir, filename)
+            filename = f"javaguide_cleaned_{timestamp}.{output_format}"
+        return os.path.join(self.cleaned_dir, filename)
+    
+    def open_chunk_writer(self, filename=None, output_format='jsonl'):
+        """
+        打开流式写入器，知识块产生后即可逐个追加写入（JSONL，可选gzip/zstd压缩）
+        压缩方式由output_format（jsonl / jsonl.gz / jsonl.zst）或文件名后缀决定；
+        output_format为sqlite时按chunk_id写入SQLite知识库（默认 knowledge/knowledge.sqlite3，
+        相对路径相对于knowledge目录）
+        """
+        if output_format == 'json':
+            raise ValueError("JSON数组格式不支持流式写入，请使用jsonl格式")
+        if output_format == 'sqlite':
+            return KnowledgeStore(os.path.join(self.base_dir, filename) if filename else DEFAULT_STORE_PATH)
+        return ChunkWriter(self._output_path(filename, output_format))
+    
+    def save_cleaned_data(self, knowledge_chunks, filename=None, output_format='json'):
+        """
+        保存清洗后的数据
+        output_format为json时整体写入一个JSON数组，为jsonl/jsonl.gz/jsonl.zst时逐行写入，
+        为sqlite时插入或更新SQLite知识库中的知识块
+        """
+        if not knowledge_chunks:
+            metrics.info('nothing_to_save', "没有数据需要保存")
+            return None
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(knowledge_chunks, f, indent=2, ensure_ascii=False)
+            with metrics.stage('save', chunks=len(knowledge_chunks), format=output_format):
+                if output_format != 'json':
+                    with self.open_chunk_writer(filename, output_format) as writer:
+                        writer.write_many(knowledge_chunks)
+                    output_path = writer.path
+                else:
+                    output_path = self._output_path(filename, output_format)
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        json.dump(knowledge_chunks, f, indent=2, ensure_ascii=False)
             
-            print(f"✅ 成功保存 {len(knowledge_chunks)} 个知识块到: {output_path}")
+            metrics.count('chunks_saved', len(knowledge_chunks))
+            metrics.info('saved', f"✅ 成功保存 {len(knowledge_chunks)} 个知识块到: {output_path}",
+                         chunks=len(knowledge_chunks), path=output_path)
             return output_path
             
         except Exception as e:
-            print(f"❌ 保存文件失败: {e}")
+            metrics.error('save_failed', f"❌ 保存文件失败: {e}", error=str(e))
             return None
 
 
@@ -368,8 +592,9 @@ def main():
             # 文件模式
             cleaned_data = cleaner.clean_from_file(input_path)
         
-        if cleaned_data:
-            cleaner.save_cleaned_data(cleaned_data)
+        if cleaned_data and cleaner.save_cleaned_data(cleaned_data):
+            cleaner.commit_manifest([cleaner.last_report])
+        metrics.report()
     else:
         # 交互模式
         print("JavaGuide内容清洗器")
@@ -399,6 +624,7 @@ def main():
                 if cleaned_data:
                     saved_path = cleaner.save_cleaned_data(cleaned_data)
                     if saved_path:
+                        cleaner.commit_manifest([cleaner.last_report])
                         print(f"\n数据已保存，可以查看第一个知识块示例：")
                         print(json.dumps(cleaned_data[0], indent=2, ensure_ascii=False)[:500] + "...")
                 else:
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按token预算组装提示词中的参考资料
+候选资料按得分从高到低依次放入，放不下的跳过并继续尝试后面较短的资料；
+得分最高的资料本身超过预算时截断放入，保证至少有一条参考资料
+"""
+
+
+def pack_sections(sections, budget, counter, separator='\n\n', max_sections=None):
+    """
+    sections为按优先级排列的 (文本, token数) 列表，token数为None时现场统计，最多选出max_sections条
+    返回 (选中的 (原序号, 文本, token数) 列表, 使用的总token数)，总数包含分隔符
+    """
+    separator_tokens = counter.count(separator)
+    packed, used = [], 0
+    for position, (text, tokens) in enumerate(sections):
+        if max_sections is not None and len(packed) >= max_sections:
+            break
+        if tokens is None:
+            tokens = counter.count(text)
+        cost = tokens + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append((position, text, tokens))
+            used += cost
+        elif not packed and position == 0:
+            # 调用方给出的token数可能包含编号等额外开销，截断时一并扣除
+            overhead = max(tokens - counter.count(text), 0)
+            text = counter.truncate(text, budget - overhead)
+            if text:
+                tokens = counter.count(text) + overhead
+                packed.append((position, text, tokens))
+                used += tokens
+    return packed, used
+
+
+def context_budget(counter, context_window, max_tokens, prompt_tokens, limit=None):
+    """
+    参考资料可用的token数：上下文窗口扣除估算余量、回答的max_tokens和提示词其余部分
+    limit为参考资料的上限，结果小于0时返回0
+    """
+    available = int(context_window * (1 - counter.margin)) - max_tokens - prompt_tokens
+    if limit is not None:
+        available = min(available, limit)
+    return max(available, 0)
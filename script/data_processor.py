@@ -3,99 +3,614 @@
 """
 数据处理主脚本
 统一管理不同网站的数据爬取和清洗工作
+清洗器由cleaner_registry按URL自动选择（或通过 --cleaner 指定），只有用到的清洗器才会被导入
 """
 
 import os
 import sys
+import glob
+import time
 import argparse
+from collections import Counter
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-# 添加cleaners目录到系统路径
-cleaners_dir = os.path.join(os.path.dirname(__file__), 'cleaners')
-sys.path.append(cleaners_dir)
+from cleaner_registry import clean_page, discover_cleaners, select_cleaners
+from metrics import metrics, add_arguments as add_metrics_arguments, configure_from_args, finish_run
+from warc_archive import DEFAULT_WARC_DIR
 
 
-def get_available_cleaners():
+def expand_input_sources(input_source):
     """
-    获取可用的清洗器列表
+    将输入展开为待清洗的来源列表（URL或HTML文件路径），顺序固定
+    
+    支持：单个URL、单个HTML文件、目录（递归查找.html/.htm）、
+    glob通配符（如 'pages/*.html'）、以及每行一个URL或路径的列表文件（.txt/.list）
+    """
+    if input_source.startswith(('http://', 'https://')):
+        return [input_source]
+    
+    if os.path.isdir(input_source):
+        files = [
+            str(path) for path in Path(input_source).rglob('*')
+            if path.is_file() and path.suffix.lower() in ('.html', '.htm')
+        ]
+        return sorted(files)
+    
+    if glob.has_magic(input_source):
+        return sorted(path for path in glob.glob(input_source, recursive=True) if os.path.isfile(path))
+    
+    if os.path.isfile(input_source) and input_source.lower().endswith(('.txt', '.list')):
+        with open(input_source, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    
+    return [input_source]
+
+
+class ChunkOutput:
+    """
+    清洗结果的输出目标
+    JSONL格式（jsonl / jsonl.gz / jsonl.zst）在知识块产生时逐页追加写入，内存占用与批次大小无关；
+    JSON格式需要在结束时整体写入一个数组
+    写入前依次经过大小规整（sizer，按页面）和近似去重（deduplicator，跨页面），两者均可省略
     """
-    cleaners = {}
-    cleaners_path = Path(__file__).parent / 'cleaners'
     
-    for file in cleaners_path.glob('*_cleaner.py'):
-        cleaner_name = file.stem.replace('_cleaner', '')
-        cleaners[cleaner_name] = file
+    def __init__(self, cleaner, output_format='json', output=None, deduplicator=None, sizer=None):
+        self.cleaner = cleaner
+        self.output_format = output_format
+        self.output = output
+        self.deduplicator = deduplicator
+        self.sizer = sizer
+        self.count = 0
+        self._buffer = []
+        self._writer = None
+        if output_format != 'json':
+            self._writer = cleaner.open_chunk_writer(output, output_format)
     
-    return cleaners
+    def add(self, chunks, source_url=None):
+        """
+        添加一个页面的知识块
+        source_url不为None表示chunks是该页面当前产生的全部知识块：写入SQLite知识库时，
+        该页面不再产生的知识块（如规整参数变化后过时的切分/合并结果）同时从知识库中删除
+        """
+        if self.sizer and chunks:
+            with metrics.stage('chunk_sizing', emit=False):
+                chunks = self.sizer.process(chunks)
+        if self.deduplicator and chunks:
+            with metrics.stage('dedupe', emit=False):
+                chunks = self.deduplicator.process(chunks)
+        if source_url is not None and hasattr(self._writer, 'write_page'):
+            with metrics.stage('save', emit=False):
+                self._writer.write_page(source_url, chunks or [])
+            self.count += len(chunks or [])
+            metrics.count('chunks_saved', len(chunks or []))
+            return
+        if not chunks:
+            return
+        self.count += len(chunks)
+        if self._writer:
+            with metrics.stage('save', emit=False):
+                self._writer.write_many(chunks)
+            metrics.count('chunks_saved', len(chunks))
+        else:
+            self._buffer.extend(chunks)
+    
+    def close(self, reports=None):
+        """
+        结束输出，返回保存路径；没有任何知识块时返回None
+        写入SQLite知识库时，reports中记录为已删除的知识块同时从知识库中删除
+        """
+        if self.sizer:
+            metrics.info('chunk_sizing', self.sizer.summary())
+        if self.deduplicator:
+            metrics.info('dedupe', self.deduplicator.summary())
+        if self.output_format == 'sqlite':
+            from chunk_manifest import summarize_reports
+            removed = summarize_reports([report for report in reports or [] if report])['removed']
+            deleted = self._writer.delete(removed) if removed else 0
+            stats = dict(self._writer.stats)
+            deleted += stats.pop('removed')
+            self._writer.close()
+            metrics.info('store_updated', f"✅ 知识库已更新: 新增 {stats['inserted']}，更新 {stats['updated']}，"
+                         f"未变化 {stats['unchanged']}，删除 {deleted}（{self._writer.path}）",
+                         deleted=deleted, path=self._writer.path, **stats)
+            return self._writer.path if self.count or deleted else None
+        if self._writer:
+            if not self.count:
+                # 追加写入已有文件时保留原有数据，只删除本次新建的空文件
+                self._writer.discard()
+                metrics.info('nothing_to_save', "没有数据需要保存")
+                return None
+            self._writer.close()
+            metrics.info('saved', f"✅ 成功保存 {self.count} 个知识块到: {self._writer.path}",
+                         chunks=self.count, path=self._writer.path)
+            return self._writer.path
+        return self.cleaner.save_cleaned_data(self._buffer, self.output, self.output_format)
+
+
+def create_deduplicator(dedupe=None, threshold=0.8):
+    """按命令行参数创建近似去重阶段，dedupe为None或'off'时不去重"""
+    if not dedupe or dedupe == 'off':
+        return None
+    from dedupe import ChunkDeduplicator
+    return ChunkDeduplicator(dedupe, threshold)
+
+
+def create_chunk_sizer(cleaner, max_tokens=None, min_tokens=64, overlap_tokens=64):
+    """按命令行参数创建知识块大小规整阶段，max_tokens为None或0时不规整（默认）"""
+    if not max_tokens:
+        return None
+    from chunk_sizer import ChunkSizer
+    return ChunkSizer(cleaner._markdown_to_text, max_tokens, min_tokens, overlap_tokens, cleaner.token_counter)
+
+
+def _rule_hits(cleaners):
+    """
+    清洗器的Markdown规则命中计数（没有规则引擎的清洗器为空）
+    规则引擎按规则文件缓存，进程内的清洗器实例共用同一个引擎和计数，同一引擎只计一次
+    """
+    engines = {}
+    for cleaner in cleaners:
+        rules = getattr(cleaner, 'markdown_rules', None)
+        if rules:
+            engines[id(rules)] = rules
+    hits = Counter()
+    for rules in engines.values():
+        hits.update(rules.hits)
+    return hits
+
+
+def _clean_page_with_hits(cleaners, html_content, url):
+    """
+    clean_page，同时返回本页面新增的规则命中计数
+    规则引擎的计数在进程内累计，各页面只取增量，由CleaningRun.rule_hits统一汇总
+    """
+    hits_before = _rule_hits(cleaners.values())
+    results = clean_page(cleaners, html_content, url)
+    return results, _rule_hits(cleaners.values()) - hits_before
+
+
+def _print_rule_hits(rule_hits):
+    """打印Markdown清洗规则的命中次数"""
+    if rule_hits:
+        from markdown_rules import format_rule_hits
+        metrics.info('rule_hits', f"🧽 清洗规则命中: {format_rule_hits(rule_hits)}", hits=dict(rule_hits))
+
+
+class CleaningRun:
+    """
+    一次清洗任务在主进程中的状态
+    每个用到的清洗器一个实例和一个输出目标（各自的清洗结果目录、清单、大小规整和去重），
+    并收集各页面的变更报告；清洗器在第一次用到时才导入和创建
+    """
+    
+    def __init__(self, output_format='json', output=None, incremental=False, dedupe=None,
+                 dedupe_threshold=0.8, chunk_sizing=None):
+        if incremental and dedupe and dedupe != 'off':
+            # 去重索引每次运行从空开始，增量清洗时只有变化的页面互相比较，
+            # drop模式下丢弃的知识块还会记入清单，之后不再重新判断
+            raise ValueError("近似去重不能与增量清洗同时使用")
+        self.output_format = output_format
+        self.output = output
+        self.incremental = incremental
+        self.dedupe = dedupe
+        self.dedupe_threshold = dedupe_threshold
+        self.chunk_sizing = chunk_sizing or {}
+        self.cleaners = {}
+        self.outputs = {}
+        self.reports = {}
+        self.rule_hits = Counter()
+    
+    def cleaner(self, name):
+        """获取清洗器实例，第一次用到时创建"""
+        if name not in self.cleaners:
+            cleaner = discover_cleaners()[name].create(incremental=self.incremental)
+            self.outputs[name] = ChunkOutput(
+                cleaner, self.output_format, self.output,
+                create_deduplicator(self.dedupe, self.dedupe_threshold),
+                create_chunk_sizer(cleaner, **self.chunk_sizing)
+            )
+            self.reports[name] = []
+            self.cleaners[name] = cleaner
+        return self.cleaners[name]
+    
+    def add(self, name, chunks, report):
+        """
+        添加某个清洗器对一个页面的清洗结果
+        非增量模式、或增量模式下页面有变化时，chunks是该页面的全部知识块，知识库按页面对账
+        """
+        self.cleaner(name)
+        complete = report is not None and (
+            not self.incremental or report['added'] or report['changed'] or report['removed']
+        )
+        self.outputs[name].add(chunks, report['url'] if complete else None)
+        self.reports[name].append(report)
+    
+    @property
+    def count(self):
+        return sum(output.count for output in self.outputs.values())
+    
+    def close(self):
+        """结束各清洗器的输出并提交清单，返回保存路径列表"""
+        _print_rule_hits(self.rule_hits)
+        
+        saved_paths = []
+        for name, chunk_output in self.outputs.items():
+            if len(self.outputs) > 1:
+                metrics.info('cleaner_output', f"🧹 [{name}]", cleaner=name)
+            saved_path = chunk_output.close(self.reports[name])
+            if saved_path or self.incremental:
+                self.cleaners[name].commit_manifest(self.reports[name])
+            if saved_path:
+                saved_paths.append(saved_path)
+        return saved_paths
+
+
+# 工作进程内复用的清洗器实例和HTTP会话（每个进程创建一次）
+_worker_cleaners = {}
+_worker_session = None
+_worker_cache = None
+
+
+def _get_worker_cleaner(name, incremental):
+    if name not in _worker_cleaners:
+        _worker_cleaners[name] = discover_cleaners()[name].create(incremental=incremental)
+    return _worker_cleaners[name]
+
+
+def _fetch_url(url):
+    """通过条件请求缓存获取网页，返回http_cache.FetchResult"""
+    global _worker_session, _worker_cache
+    if _worker_session is None:
+        import requests
+        from http_cache import HttpCache
+        _worker_session = requests.Session()
+        _worker_session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        })
+        _worker_cache = HttpCache()
+    with metrics.stage('fetch', url) as span:
+        fetched = _worker_cache.fetch(_worker_session, url, timeout=30)
+        span['bytes'] = fetched.bytes_received
+    metrics.count('pages_fetched')
+    metrics.count('bytes_fetched', fetched.bytes_received)
+    if fetched.not_modified:
+        metrics.count('pages_not_modified')
+    return fetched
+
+
+def source_url(input_source):
+    """来源对应的URL：WARC索引项和URL为其本身的URL，本地文件为None"""
+    if isinstance(input_source, dict):
+        return input_source['url']
+    if input_source.startswith(('http://', 'https://')):
+        return input_source
+    return None
+
+
+def local_source_url(path):
+    """本地HTML文件的来源URL（绝对路径的file:// URI）"""
+    return Path(path).resolve().as_uri()
 
 
-def run_javaguide_cleaner(input_source):
+def _read_source(input_source, skip_unchanged=False):
     """
-    运行JavaGuide清洗器
+    读取来源的网页内容，返回 (清洗时使用的来源URL, HTML)
+    页面未变化(304)且skip_unchanged时HTML为None
+    """
+    if isinstance(input_source, dict):
+        # 从存档读取时直接按偏移量解压单条记录，不访问网络
+        from warc_archive import read_html
+        with metrics.stage('read', input_source['url']):
+            return input_source['url'], read_html(input_source)
+    if input_source.startswith(('http://', 'https://')):
+        fetched = _fetch_url(input_source)
+        if fetched.not_modified and skip_unchanged:
+            return input_source, None
+        return input_source, fetched.text
+    # 本地文件以绝对路径的file:// URI作为来源URL（清单的页面键和知识块ID由其决定），
+    # 递归展开目录时不同子目录中的同名文件不会相互覆盖
+    url = local_source_url(input_source)
+    with metrics.stage('read', url), open(input_source, 'r', encoding='utf-8') as f:
+        return url, f.read()
+
+
+def _clean_source(input_source, cleaner_names, skip_unchanged=False, incremental=False):
+    """
+    清洗单个来源（URL、HTML文件路径或WARC存档的索引项，见warc_archive.latest_entries）
+    页面只读取和解析一次，解析结果交给cleaner_names中的每个清洗器
+    任何异常都在此捕获并作为结果返回，单个页面出错不会中断整个批次
+    清单的更新由主进程统一完成，这里只返回各清洗器的知识块和变更报告，
+    以及本页面的阶段耗时和计数（metrics.snapshot，由主进程合并）
+    """
+    result = {'source': source_url(input_source) or input_source, 'cleaners': {}, 'error': None,
+              'unchanged': False, 'rule_hits': {}, 'elapsed': 0.0, 'metrics': None}
+    start = time.perf_counter()
+    
+    try:
+        url, html_content = _read_source(input_source, skip_unchanged)
+        if html_content is None:
+            result['unchanged'] = True
+        else:
+            cleaners = {name: _get_worker_cleaner(name, incremental) for name in cleaner_names}
+            page_results, page_hits = _clean_page_with_hits(cleaners, html_content, url)
+            for name, chunks in page_results.items():
+                result['cleaners'][name] = {'chunks': chunks, 'report': cleaners[name].last_report}
+            result['rule_hits'] = dict(page_hits)
+            if not any(item['chunks'] or item['report'] for item in result['cleaners'].values()):
+                result['error'] = '未提取到任何知识块'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    
+    result['elapsed'] = time.perf_counter() - start
+    result['metrics'] = metrics.snapshot(reset=True)
+    return result
+
+
+def _init_worker():
+    """工作进程启动时清空从主进程继承的指标，避免合并时重复计入"""
+    metrics.reset()
+
+
+def _collect_results(run, results, total):
+    """按输入顺序合并清洗结果，返回 (失败的结果列表, 未变化的页面数)"""
+    failures = []
+    unchanged = 0
+    for index, result in enumerate(results, 1):
+        run.rule_hits.update(result['rule_hits'])
+        metrics.merge(result['metrics'])
+        chunk_count = 0
+        for name, item in result['cleaners'].items():
+            run.add(name, item['chunks'], item['report'])
+            chunk_count += len(item['chunks'])
+        if result['unchanged']:
+            unchanged += 1
+            status = "♻️"
+        elif result['error']:
+            failures.append(result)
+            status = "❌"
+        else:
+            status = "✅"
+        cleaners = '+'.join(result['cleaners'])
+        metrics.log('warning' if result['error'] else 'info', 'source_done',
+                    f"  {status} [{index}/{total}] {result['source']} "
+                    f"({chunk_count} 个知识块{', ' + cleaners if cleaners else ''}, {result['elapsed']:.2f}s)"
+                    + (f" - {result['error']}" if result['error'] else ""),
+                    source=result['source'], chunks=chunk_count, cleaners=list(result['cleaners']),
+                    unchanged=result['unchanged'], elapsed_s=round(result['elapsed'], 3), error=result['error'])
+    return failures, unchanged
+
+
+def run_batch_cleaner(sources, cleaner_names=None, workers=None, skip_unchanged=False,
+                      output_format='json', output=None, incremental=False, dedupe=None,
+                      dedupe_threshold=0.8, chunk_sizing=None):
+    """
+    清洗多个来源：每个来源按URL选择清洗器（cleaner_names指定时使用指定的清洗器），
+    同一页面的多个清洗器共用一次读取和解析
+    多个工作进程时使用进程池并行清洗；结果按输入顺序合并，保证输出确定；失败的页面记录后跳过
+    返回保存路径列表
+    """
+    assignments = []
+    for source in sources:
+        names = select_cleaners(source_url(source), cleaner_names)
+        if names:
+            assignments.append((source, names))
+        else:
+            metrics.warning('no_cleaner', f"⚠️ 没有清洗器匹配，跳过: {source_url(source) or source}",
+                            source=source_url(source) or source)
+    if not assignments:
+        return []
+    
+    run = CleaningRun(output_format, output, incremental, dedupe, dedupe_threshold, chunk_sizing)
+    try:
+        for name in dict.fromkeys(name for _, names in assignments for name in names):
+            run.cleaner(name)
+    except ImportError as e:
+        metrics.error('import_failed', f"❌ 清洗器导入失败（{e}），请检查依赖包是否安装", error=str(e))
+        return []
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(assignments)))
+    metrics.info('batch_start', f"📦 清洗 {len(assignments)} 个来源，清洗器: {', '.join(run.cleaners)}，工作进程数: {workers}",
+                 sources=len(assignments), cleaners=list(run.cleaners), workers=workers)
+    batch_start = time.perf_counter()
+    
+    arguments = (
+        [source for source, _ in assignments], [names for _, names in assignments],
+        [skip_unchanged] * len(assignments), [incremental] * len(assignments),
+    )
+    if workers == 1:
+        # 单个工作进程时直接在当前进程中清洗，省去进程启动和结果传输
+        failures, unchanged = _collect_results(run, map(_clean_source, *arguments), len(assignments))
+    else:
+        # 每个任务相对较小，分批派发以减少进程间通信开销
+        chunksize = max(1, len(assignments) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            failures, unchanged = _collect_results(
+                run, executor.map(_clean_source, *arguments, chunksize=chunksize), len(assignments)
+            )
+    
+    elapsed = time.perf_counter() - batch_start
+    succeeded = len(assignments) - len(failures) - unchanged
+    metrics.divider()
+    metrics.info('batch_done', f"清洗完成：成功 {succeeded}，未变化 {unchanged}，"
+                 f"失败 {len(failures)}，共 {run.count} 个知识块，耗时 {elapsed:.2f}秒",
+                 succeeded=succeeded, unchanged=unchanged, failed=len(failures), chunks=run.count,
+                 elapsed_s=round(elapsed, 3))
+    return run.close()
+
+
+def run_site_cleaner(seed_url=None, sitemap=None, cleaner_names=None, max_depth=3, max_pages=None,
+                     path_prefixes=None, concurrency=8, skip_unchanged=False,
+                     output_format='json', output=None, incremental=False, dedupe=None,
+                     dedupe_threshold=0.8, chunk_sizing=None, warc_dir=None):
+    """
+    全站模式：从种子URL或sitemap出发抓取整站并逐页清洗，每个页面按URL选择清洗器
+    指定warc_dir时同时把抓取的页面写入WARC存档，之后可用 --replay 离线重新清洗
+    返回保存路径列表
     """
     try:
-        from javaguide_cleaner import JavaGuideCleaner
+        from web_crawler import WebCrawler
         
-        cleaner = JavaGuideCleaner()
+        run = CleaningRun(output_format, output, incremental, dedupe, dedupe_threshold, chunk_sizing)
+        crawler = WebCrawler(concurrency=concurrency, skip_unchanged=skip_unchanged, warc_dir=warc_dir)
         
-        if input_source.startswith(('http://', 'https://')):
-            print(f"🌐 从URL清洗JavaGuide内容: {input_source}")
-            cleaned_data = cleaner.clean_from_url(input_source)
-        else:
-            print(f"📁 从文件清洗JavaGuide内容: {input_source}")
-            cleaned_data = cleaner.clean_from_file(input_source)
+        def clean_site_page(url, html_content):
+            names = select_cleaners(url, cleaner_names)
+            cleaners = {name: run.cleaner(name) for name in names}
+            page_results, page_hits = _clean_page_with_hits(cleaners, html_content, url)
+            run.rule_hits.update(page_hits)
+            for name, chunks in page_results.items():
+                run.add(name, chunks, cleaners[name].last_report)
         
-        if cleaned_data:
-            saved_path = cleaner.save_cleaned_data(cleaned_data)
-            return saved_path
-        else:
-            print("❌ 清洗失败")
-            return None
-            
-    except ImportError:
-        print("❌ JavaGuide清洗器导入失败，请检查依赖包是否安装")
-        return None
+        metrics.info('site_start', f"🌐 全站清洗: {seed_url or sitemap}", url=seed_url, sitemap=sitemap)
+        crawler.crawl_site(
+            [seed_url] if seed_url else [], sitemap=sitemap,
+            max_depth=max_depth, max_pages=max_pages, path_prefixes=path_prefixes,
+            save_outputs=False, on_page=clean_site_page
+        )
+        crawler.close()
+        return run.close()
+    
+    except ImportError as e:
+        metrics.error('import_failed', f"❌ 清洗器导入失败（{e}），请检查依赖包是否安装", error=str(e))
+        return []
     except Exception as e:
-        print(f"❌ 清洗过程出错: {e}")
-        return None
+        metrics.error('clean_failed', f"❌ 清洗过程出错: {e}", error=str(e))
+        return []
+
+
+def _print_saved(saved_paths, quiet_empty=False):
+    """打印处理结果；quiet_empty为True时没有新内容不视为失败（增量清洗、跳过未变化的页面）"""
+    if saved_paths:
+        for path in saved_paths:
+            metrics.info('done', f"✅ 处理完成，结果保存至: {path}", path=path)
+    elif quiet_empty:
+        metrics.info('done', "ℹ️ 处理完成，没有需要保存的新内容")
+    else:
+        metrics.error('done', "❌ 处理失败")
 
 
 def main():
     """
     主函数
     """
+    cleaners = discover_cleaners()
     parser = argparse.ArgumentParser(description='数据处理工具')
     parser.add_argument('--cleaner', '-c', 
-                       choices=['javaguide'], 
-                       default='javaguide',
-                       help='选择清洗器类型')
+                       action='append', choices=list(cleaners),
+                       help='使用的清洗器（可多次指定，同一页面只读取和解析一次）；默认按URL自动选择')
     parser.add_argument('--input', '-i', 
-                       required=True,
-                       help='输入源（URL或文件路径）')
+                       help='输入源（URL、HTML文件、目录、glob通配符或URL列表文件）')
+    parser.add_argument('--workers', '-w', 
+                       type=int,
+                       help='批量清洗的工作进程数（默认为CPU核数）')
     parser.add_argument('--list', '-l', 
                        action='store_true',
                        help='列出可用的清洗器')
+    parser.add_argument('--output-format', '-f', 
+                       choices=['json', 'jsonl', 'jsonl.gz', 'jsonl.zst', 'sqlite'],
+                       default='json',
+                       help='输出格式：json为整体数组，jsonl系列为逐行流式写入，'
+                            'sqlite为按chunk_id写入SQLite知识库 knowledge/knowledge.sqlite3（默认json）')
+    parser.add_argument('--output', '-o', 
+                       help='输出文件名（相对于各清洗器的清洗结果目录，也可为绝对路径）；JSONL格式下追加写入已有文件')
+    parser.add_argument('--incremental', 
+                       action='store_true',
+                       help='增量清洗：只输出有变化（新增/修改/删除知识块）的页面，并报告各知识块的变更')
+    parser.add_argument('--skip-unchanged', 
+                       action='store_true',
+                       help='页面自上次抓取以来未变化(304)时跳过清洗')
+    parser.add_argument('--site', 
+                       action='store_true',
+                       help='全站模式：以输入URL为种子，沿页面链接抓取并清洗整站')
+    parser.add_argument('--sitemap', 
+                       help='全站模式使用的sitemap.xml地址')
+    parser.add_argument('--max-depth', 
+                       type=int, default=3,
+                       help='全站模式的最大链接深度（默认3）')
+    parser.add_argument('--max-pages', 
+                       type=int,
+                       help='全站模式的最大页面数')
+    parser.add_argument('--path-prefix', 
+                       action='append',
+                       help='全站模式只抓取以此路径开头的页面（可多次指定）')
+    parser.add_argument('--warc', 
+                       nargs='?', const=DEFAULT_WARC_DIR,
+                       help='全站模式同时将抓取的页面写入WARC存档（不指定目录时为knowledge/raw/warc）')
+    parser.add_argument('--replay', 
+                       nargs='?', const=DEFAULT_WARC_DIR,
+                       help='从WARC存档重新清洗（不访问网络，不指定目录时为knowledge/raw/warc），'
+                            '可配合 --path-prefix 只清洗部分页面')
+    parser.add_argument('--dedupe', 
+                       choices=['off', 'drop', 'cluster'], default='off',
+                       help='近似重复的知识块：drop丢弃，cluster标注duplicate_of后保留，off不去重（默认）；'
+                            '去重只在本次清洗的知识块之间进行，不能与 --incremental 同时使用')
+    parser.add_argument('--dedupe-threshold', 
+                       type=float, default=0.8,
+                       help='判定为近似重复的相似度阈值（默认0.8）')
+    parser.add_argument('--max-chunk-tokens', 
+                       type=int, default=0,
+                       help='超过此token数的知识块在段落/代码块/列表边界处切分，同时合并过小的知识块（如512；默认0，不规整大小）')
+    parser.add_argument('--min-chunk-tokens', 
+                       type=int, default=64,
+                       help='同一sub_category下连续的、少于此token数的知识块合并（默认64）')
+    parser.add_argument('--chunk-overlap', 
+                       type=int, default=64,
+                       help='切分时相邻两段重叠的token数（默认64）')
+    add_metrics_arguments(parser)
     
     args = parser.parse_args()
+    configure_from_args(args)
+    
+    if not args.list and not args.input and not args.sitemap and not args.replay:
+        parser.error('需要指定 --input（或全站模式下的 --sitemap，或从存档重新清洗的 --replay）')
+    if args.incremental and args.dedupe != 'off':
+        parser.error('--dedupe 不能与 --incremental 同时使用：增量清洗时未变化的页面不参与比较')
     
     if args.list:
         print("可用的清洗器:")
-        cleaners = get_available_cleaners()
-        for name in cleaners:
-            print(f"  - {name}")
+        for name, spec in cleaners.items():
+            print(f"  - {name}: {spec.description}")
+            for pattern in spec.url_patterns:
+                print(f"      {pattern}")
         return
     
-    print("🚀 数据处理工具启动")
-    print("=" * 50)
+    metrics.info('start', "🚀 数据处理工具启动")
+    metrics.divider('=')
+    options = {
+        'output_format': args.output_format, 'output': args.output, 'incremental': args.incremental,
+        'dedupe': args.dedupe, 'dedupe_threshold': args.dedupe_threshold,
+        'chunk_sizing': {'max_tokens': args.max_chunk_tokens, 'min_tokens': args.min_chunk_tokens,
+                         'overlap_tokens': args.chunk_overlap},
+    }
     
-    if args.cleaner == 'javaguide':
-        result = run_javaguide_cleaner(args.input)
-        if result:
-            print(f"✅ 处理完成，结果保存至: {result}")
-        else:
-            print("❌ 处理失败")
+    if args.replay:
+        from warc_archive import latest_entries
+        entries = latest_entries(args.replay, args.path_prefix)
+        if not entries:
+            metrics.error('replay_empty', f"❌ 存档中没有匹配的页面: {args.replay}", directory=args.replay)
+            return
+        metrics.info('replay', f"🗃️ 从WARC存档重新清洗: {args.replay}", directory=args.replay, pages=len(entries))
+        saved_paths = run_batch_cleaner(entries, args.cleaner, workers=args.workers, **options)
+        _print_saved(saved_paths, args.incremental)
+    elif args.site or args.sitemap:
+        saved_paths = run_site_cleaner(
+            args.input, sitemap=args.sitemap, cleaner_names=args.cleaner, max_depth=args.max_depth,
+            max_pages=args.max_pages, path_prefixes=args.path_prefix,
+            skip_unchanged=args.skip_unchanged, warc_dir=args.warc, **options
+        )
+        _print_saved(saved_paths, args.incremental or args.skip_unchanged)
     else:
-        print(f"❌ 不支持的清洗器类型: {args.cleaner}")
+        sources = expand_input_sources(args.input)
+        if not sources:
+            metrics.error('no_input', f"❌ 没有找到匹配的输入: {args.input}", input=args.input)
+            return
+        saved_paths = run_batch_cleaner(
+            sources, args.cleaner, workers=args.workers, skip_unchanged=args.skip_unchanged, **options
+        )
+        _print_saved(saved_paths, args.incremental or args.skip_unchanged)
+    
+    finish_run(args, job='data_processor')
 
 
 if __name__ == "__main__":
@@ -104,10 +619,10 @@ if __name__ == "__main__":
         print("数据处理工具 - 交互模式")
         print("=" * 50)
         
-        cleaners = get_available_cleaners()
+        cleaners = discover_cleaners()
         print("可用的清洗器:")
-        for i, name in enumerate(cleaners, 1):
-            print(f"  {i}. {name}")
+        for i, (name, spec) in enumerate(cleaners.items(), 1):
+            print(f"  {i}. {name} - {spec.description}")
         
         while True:
             try:
@@ -138,13 +653,8 @@ if __name__ == "__main__":
                     print("❌ 输入不能为空")
                     continue
                 
-                if selected_cleaner == 'javaguide':
-                    result = run_javaguide_cleaner(input_source)
-                    if result:
-                        print(f"✅ 处理完成，结果保存至: {result}")
-                    else:
-                        print("❌ 处理失败")
-                        
+                _print_saved(run_batch_cleaner([input_source], [selected_cleaner]))
+            
             except KeyboardInterrupt:
                 print("\n\n程序被中断，再见！")
                 break
@@ -152,4 +662,4 @@ if __name__ == "__main__":
                 print(f"\n❌ 发生错误: {e}")
     else:
         # 命令行模式
-        main() 
\ No newline at end of file
+        main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识块近似去重（MinHash + LSH分桶）
+对answer_text的词项（中文bigram + 英文单词，见text_tokens）取连续3个词项作为片段（shingle），
+计算MinHash签名后按band分桶，只有落入同一个桶的知识块才比较签名，整体复杂度接近线性
+
+两种处理方式：
+    drop     丢弃重复的知识块，只保留最先出现的一个
+    cluster  保留所有知识块，重复的知识块标注 duplicate_of（所属簇中最先出现的知识块ID）
+             和 duplicate_similarity（估计的Jaccard相似度），建立检索索引时会跳过
+
+用法：
+    python script/dedupe.py                                  # 报告现有知识块中的近似重复
+    python script/dedupe.py --threshold 0.7 --mode drop -o deduped.jsonl
+"""
+
+import argparse
+import os
+import sys
+import zlib
+
+import numpy as np
+
+from chunk_io import ChunkWriter, load_unique_chunks
+from text_tokens import tokenize
+
+
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge', 'cleaned', 'javaguide')
+
+DEDUPE_MODES = ('drop', 'cluster')
+
+
+def lsh_params(threshold, num_perm):
+    """
+    选择band数和每个band的行数（bands * rows == num_perm），
+    使两条签名落入同一个桶的概率曲线的拐点 (1/bands)^(1/rows) 最接近阈值
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """
+    MinHash签名：对每个片段的32位哈希做num_perm次 multiply-shift 哈希，各取最小值
+    随机参数由seed固定，不同进程、不同次运行得到的签名一致
+    """
+
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # 乘数取奇数，保证 multiply-shift 哈希的均匀性
+        self._a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """文本的去重片段哈希（uint32数组）"""
+        tokens = tokenize(text)
+        size = self.shingle_size
+        if len(tokens) < size:
+            grams = [' '.join(tokens)] if tokens else []
+        else:
+            grams = [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+        return np.unique(np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams)
+        ))
+
+    def signature(self, shingles):
+        """片段哈希 -> 长度为num_perm的签名（uint32）"""
+        # uint64乘法按2^64取模，取高32位作为哈希值
+        hashed = (shingles[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    增量的LSH索引：逐个加入知识块，加入前先查询与已有知识块的近似重复关系
+    重复的知识块也会加入索引，通过它们相连的知识块归入同一个簇（簇的代表为最先加入的知识块）
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, min_shingles=8):
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        self._canonical = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def add(self, chunk_id, text):
+        """
+        加入一个知识块，返回 (代表知识块ID, 相似度)；不与任何已有知识块重复时返回 (None, 0.0)
+        片段太少（很短的回答）的知识块不参与去重
+        """
+        if chunk_id in self._signatures:
+            # 同一知识块再次出现（增量清洗），沿用之前的判断
+            return self._canonical.get(chunk_id), 1.0 if chunk_id in self._canonical else 0.0
+        shingles = self.hasher.shingles(text)
+        if len(shingles) < self.min_shingles:
+            return None, 0.0
+
+        signature = self.hasher.signature(shingles)
+        keys = self._band_keys(signature)
+        candidates = set()
+        for buckets, key in zip(self._buckets, keys):
+            candidates.update(buckets.get(key, ()))
+
+        best_id, best_similarity = None, 0.0
+        for candidate in candidates:
+            # 签名中相同位置取值相同的比例即Jaccard相似度的估计
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best_id, best_similarity = candidate, similarity
+
+        self._signatures[chunk_id] = signature
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, []).append(chunk_id)
+
+        if best_id is None:
+            return None, 0.0
+        canonical = self._canonical.get(best_id, best_id)
+        self._canonical[chunk_id] = canonical
+        return canonical, best_similarity
+
+
+class ChunkDeduplicator:
+    """
+    清洗流程中的去重阶段：依次处理各页面的知识块，按mode丢弃或标注近似重复
+    """
+
+    def __init__(self, mode='cluster', threshold=0.8, num_perm=128):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"不支持的去重方式: {mode}")
+        self.mode = mode
+        self.index = NearDuplicateIndex(threshold, num_perm)
+        self.checked = 0
+        self.duplicates = 0
+
+    def process(self, chunks):
+        """处理一批知识块，返回保留的知识块（cluster模式下为全部知识块）"""
+        kept = []
+        for chunk in chunks:
+            self.checked += 1
+            canonical, similarity = self.index.add(chunk['chunk_id'], chunk.get('answer_text') or '')
+            if canonical is None:
+                kept.append(chunk)
+                continue
+            self.duplicates += 1
+            if self.mode == 'cluster':
+                kept.append(dict(chunk, duplicate_of=canonical, duplicate_similarity=round(similarity, 3)))
+        return kept
+
+    def summary(self):
+        action = '丢弃' if self.mode == 'drop' else '标注'
+        return f"🧬 近似去重: 检查 {self.checked} 个知识块，{action} {self.duplicates} 个重复"
+
+
+def find_clusters(chunks, threshold=0.8, num_perm=128):
+    """返回 {代表知识块ID: [(重复知识块ID, 相似度), ...]}"""
+    index = NearDuplicateIndex(threshold, num_perm)
+    clusters = {}
+    for chunk_id, chunk in chunks.items():
+        canonical, similarity = index.add(chunk_id, chunk.get('answer_text') or '')
+        if canonical is not None:
+            clusters.setdefault(canonical, []).append((chunk_id, similarity))
+    return clusters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='知识块近似去重（MinHash + LSH）')
+    parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help='知识块目录（递归读取）')
+    parser.add_argument('--threshold', type=float, default=0.8, help='判定为重复的Jaccard相似度阈值')
+    parser.add_argument('--num-perm', type=int, default=128, help='MinHash签名长度')
+    parser.add_argument('--mode', choices=DEDUPE_MODES, default='cluster', help='写入输出文件时的处理方式')
+    parser.add_argument('-o', '--output', help='输出JSONL文件（不指定时只报告重复情况）')
+    parser.add_argument('--show', type=int, default=10, help='报告中显示的簇数量')
+    args = parser.parse_args()
+
+    chunks = load_unique_chunks(args.source)
+    if not chunks:
+        print(f"❌ 没有找到知识块: {args.source}")
+        return 1
+
+    clusters = find_clusters(chunks, args.threshold, args.num_perm)
+    duplicates = sum(len(members) for members in clusters.values())
+    print(f"🧬 {len(chunks)} 个知识块中有 {duplicates} 个近似重复，归入 {len(clusters)} 个簇"
+          f"（阈值 {args.threshold}）")
+    for canonical, members in sorted(clusters.items(), key=lambda item: -len(item[1]))[:args.show]:
+        print(f"  📌 {chunks[canonical].get('question', canonical)}")
+        for chunk_id, similarity in members:
+            print(f"     ≈ {similarity:.2f} {chunks[chunk_id].get('question', chunk_id)}")
+
+    if args.output:
+        deduplicator = ChunkDeduplicator(args.mode, args.threshold, args.num_perm)
+        with ChunkWriter(args.output, append=False) as writer:
+            written = writer.write_many(deduplicator.process(chunks.values()))
+        print(deduplicator.summary())
+        print(f"✅ 已写入 {written} 个知识块到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全站爬取的URL队列（frontier）
+负责URL规范化、页面链接提取、sitemap解析，以及基于布隆过滤器的去重
+"""
+
+import hashlib
+import math
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode, quote, unquote
+
+import lxml.html
+from bs4 import BeautifulSoup
+
+
+# 不会包含页面内容的资源后缀
+SKIPPED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico', '.bmp',
+    '.css', '.js', '.map', '.json', '.xml', '.txt',
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.jar',
+    '.mp3', '.mp4', '.avi', '.mov', '.woff', '.woff2', '.ttf', '.eot',
+}
+
+# 常见的跟踪参数，不影响页面内容
+TRACKING_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'spm', 'from'}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+SITEMAP_NS = re.compile(r'^\{[^}]*\}')
+
+
+def normalize_url(url, base_url=None):
+    """
+    规范化URL，使同一页面的不同写法得到相同的结果
+
+    - 相对链接按base_url解析
+    - 协议和主机名小写，去掉默认端口
+    - 去掉fragment（#锚点）
+    - 解析路径中的 . 和 ..，统一百分号编码，去掉末尾斜杠（根路径除外）
+    - 查询参数排序并去掉跟踪参数
+
+    非http(s)链接（mailto:、javascript:等）返回None
+    """
+    if base_url:
+        url = urljoin(base_url, url)
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return None
+
+    host = (parts.hostname or '').lower()
+    if not host:
+        return None
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    had_trailing_slash = path.endswith('/')
+    path = posixpath.normpath(unquote(path))
+    if had_trailing_slash and path != '/':
+        path += '/'
+    path = quote(path, safe="/:@!$&'()*+,;=-._~")
+    if path != '/':
+        path = path.rstrip('/')
+
+    query_pairs = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def is_page_url(url):
+    """判断URL是否可能是网页（排除图片、样式、压缩包等资源）"""
+    path = urlsplit(url).path.lower()
+    extension = posixpath.splitext(path)[1]
+    return extension not in SKIPPED_EXTENSIONS
+
+
+def extract_links(document, base_url):
+    """
+    提取页面中的所有链接并规范化
+    document可以是HTML字符串、已解析的lxml文档树或BeautifulSoup对象
+    """
+    if isinstance(document, BeautifulSoup):
+        base_tag = document.find('base', href=True)
+        base_href = base_tag['href'] if base_tag else None
+        anchors = ((a['href'], a.get('rel') or []) for a in document.find_all('a', href=True))
+    else:
+        if isinstance(document, str):
+            document = lxml.html.document_fromstring(document)
+        base_hrefs = document.xpath('//base/@href')
+        base_href = base_hrefs[0] if base_hrefs else None
+        anchors = ((a.get('href'), (a.get('rel') or '').split()) for a in document.iter('a') if a.get('href'))
+
+    # 页面声明了<base href>时以它为准
+    if base_href:
+        base_url = urljoin(base_url, base_href)
+
+    links = []
+    for href, rel in anchors:
+        href = href.strip()
+        if not href or href.startswith('#'):
+            continue
+        if 'nofollow' in rel:
+            continue
+        link = normalize_url(href, base_url)
+        if link:
+            links.append(link)
+    return links
+
+
+def parse_sitemap(xml_content):
+    """
+    解析sitemap.xml
+    返回 (页面URL列表, 子sitemap URL列表)，子sitemap来自sitemapindex
+    """
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf-8')
+
+    root = ET.fromstring(xml_content)
+    page_urls, child_sitemaps = [], []
+    root_tag = SITEMAP_NS.sub('', root.tag)
+
+    for element in root:
+        tag = SITEMAP_NS.sub('', element.tag)
+        if tag not in ('url', 'sitemap'):
+            continue
+        for child in element:
+            if SITEMAP_NS.sub('', child.tag) == 'loc' and child.text:
+                if root_tag == 'sitemapindex':
+                    child_sitemaps.append(child.text.strip())
+                else:
+                    page_urls.append(child.text.strip())
+
+    return page_urls, child_sitemaps
+
+
+class BloomFilter:
+    """
+    布隆过滤器，用于记录已见过的URL
+    以固定内存换取极低的误判率：误判只会导致少抓一个页面，不会重复抓取
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # 双重哈希：用一次blake2b摘要派生出k个位置
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        """添加元素，返回元素此前是否（可能）已存在"""
+        present = True
+        for position in self._positions(item):
+            byte_index, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte_index] & mask:
+                present = False
+                self.bits[byte_index] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class CrawlFrontier:
+    """
+    广度优先的待抓取URL队列
+    限制抓取深度、域名和路径前缀，并用布隆过滤器保证每个URL只入队一次
+    """
+
+    def __init__(self, seeds=(), max_depth=3, max_pages=None,
+                 allowed_domains=None, path_prefixes=None, expected_urls=100000):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allowed_domains = {domain.lower() for domain in allowed_domains or ()}
+        self.path_prefixes = list(path_prefixes or ())
+        self.seen = BloomFilter(capacity=expected_urls)
+        self.queue = deque()
+        self.dispatched = 0
+
+        for seed in seeds:
+            self.add(seed, depth=0)
+
+    def _allowed(self, url):
+        parts = urlsplit(url)
+        if self.allowed_domains:
+            host = parts.hostname or ''
+            if not any(host == domain or host.endswith('.' + domain) for domain in self.allowed_domains):
+                return False
+        if self.path_prefixes and not any(parts.path.startswith(prefix) for prefix in self.path_prefixes):
+            return False
+        return is_page_url(url)
+
+    def add(self, url, depth=0, base_url=None):
+        """规范化并尝试入队，返回是否成功入队"""
+        url = normalize_url(url, base_url)
+        if not url or depth > self.max_depth:
+            return False
+        # 没有显式指定域名时，以第一个种子所在的域名为限
+        if not self.allowed_domains:
+            self.allowed_domains.add(urlsplit(url).hostname)
+        if not self._allowed(url):
+            return False
+        if self.seen.add(url):
+            return False
+        self.queue.append((url, depth))
+        return True
+
+    def add_links(self, links, parent_depth):
+        """将页面中的链接作为下一层加入队列，返回新入队的数量"""
+        return sum(1 for link in links if self.add(link, parent_depth + 1))
+
+    def pop(self):
+        """取出下一个待抓取的 (url, depth)，队列为空或达到页面上限时返回None"""
+        if not self.queue or self.exhausted():
+            return None
+        self.dispatched += 1
+        return self.queue.popleft()
+
+    def exhausted(self):
+        """是否已达到页面数上限"""
+        return self.max_pages is not None and self.dispatched >= self.max_pages
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于lxml文档树的HTML渲染工具
+一次lxml解析得到的文档树可同时用于生成Markdown、纯文本和提取链接，
+避免html2text/BeautifulSoup各自再解析一遍整个页面
+"""
+
+import re
+
+import lxml.html
+from lxml import etree
+
+
+# 渲染时整体跳过的元素
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'iframe', 'svg', 'button', 'form'}
+
+# 块级元素：前后各留一个空行
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'aside', 'nav',
+    'figure', 'figcaption', 'details', 'summary', 'dl', 'dt', 'dd', 'address', 'body', 'html',
+}
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+WHITESPACE = re.compile(r'\s+')
+EXTRA_BLANK_LINES = re.compile(r'\n\s*\n(\s*\n)+')
+CODE_LANGUAGE = re.compile(r'language-([\w+#-]+)')
+
+
+def parse_html(content):
+    """
+    解析HTML为lxml文档树，并移除脚本和样式元素
+    解析失败（如空文档）时返回None
+    """
+    if not content or not content.strip():
+        return None
+    try:
+        root = lxml.html.document_fromstring(content)
+    except ValueError:
+        # 带有XML编码声明的字符串需要以字节形式解析
+        root = lxml.html.document_fromstring(content.encode('utf-8'))
+    except etree.ParserError:
+        return None
+
+    for element in list(root.iter('script', 'style')):
+        element.drop_tree()
+    return root
+
+
+def to_text(root):
+    """提取纯文本，去掉每行首尾空白和空行"""
+    text = root.text_content()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def to_markdown(root):
+    """将文档树渲染为Markdown（ATX风格标题、围栏代码块）"""
+    body = root.find('body')
+    markdown = _MarkdownRenderer().render(body if body is not None else root)
+    markdown = EXTRA_BLANK_LINES.sub('\n\n', markdown)
+    return markdown.strip() + '\n'
+
+
+class _MarkdownRenderer:
+    """递归遍历lxml元素生成Markdown，保持与markdownify/html2text相近的输出风格"""
+
+    def render(self, element):
+        return self._children(element)
+
+    def _children(self, element, in_pre=False):
+        parts = []
+        if element.text:
+            parts.append(element.text if in_pre else WHITESPACE.sub(' ', element.text))
+        for child in element:
+            parts.append(self._element(child, in_pre))
+            if child.tail:
+                parts.append(child.tail if in_pre else WHITESPACE.sub(' ', child.tail))
+        return ''.join(parts)
+
+    def _element(self, element, in_pre=False):
+        tag = element.tag
+        if not isinstance(tag, str):
+            # 注释、处理指令等
+            return ''
+        tag = tag.lower()
+
+        if tag in SKIPPED_TAGS:
+            return ''
+        if in_pre:
+            return self._children(element, in_pre=True)
+
+        if tag in HEADING_TAGS:
+            text = self._inline(element)
+            return f"\n\n{'#' * HEADING_TAGS[tag]} {text}\n\n" if text else ''
+        if tag in BLOCK_TAGS:
+            return f"\n\n{self._children(element)}\n\n"
+        if tag == 'br':
+            return '  \n'
+        if tag == 'hr':
+            return '\n\n---\n\n'
+        if tag in ('strong', 'b'):
+            return self._wrap(element, '**')
+        if tag in ('em', 'i'):
+            return self._wrap(element, '*')
+        if tag in ('del', 's', 'strike'):
+            return self._wrap(element, '~~')
+        if tag == 'code':
+            text = element.text_content()
+            return f"`{text}`" if text else ''
+        if tag == 'a':
+            return self._link(element)
+        if tag == 'img':
+            src = element.get('src')
+            return f"![{element.get('alt', '')}]({src})" if src else ''
+        if tag == 'pre':
+            return self._pre(element)
+        if tag in ('ul', 'ol'):
+            return f"\n\n{self._list(element)}\n\n"
+        if tag == 'blockquote':
+            return self._blockquote(element)
+        if tag == 'table':
+            return self._table(element)
+        return self._children(element)
+
+    def _inline(self, element):
+        return WHITESPACE.sub(' ', self._children(element)).strip()
+
+    def _wrap(self, element, marker):
+        text = self._inline(element)
+        return f"{marker}{text}{marker}" if text else ''
+
+    def _link(self, element):
+        text = self._inline(element)
+        href = element.get('href')
+        if not href or not text:
+            return text
+        title = element.get('title')
+        return f'[{text}]({href} "{title}")' if title else f"[{text}]({href})"
+
+    def _pre(self, element):
+        code = element.find('code')
+        source = code if code is not None else element
+        language = ''
+        for candidate in (source, element, element.getparent()):
+            if candidate is None:
+                continue
+            match = CODE_LANGUAGE.search(candidate.get('class', ''))
+            if match:
+                language = match.group(1)
+                break
+        text = source.text_content().strip('\n')
+        return f"\n\n```{language}\n{text}\n```\n\n"
+
+    def _list(self, element, depth=0):
+        ordered = element.tag == 'ol'
+        start = int(element.get('start', '1')) if ordered and element.get('start', '1').isdigit() else 1
+        indent = '  ' * depth
+        lines = []
+        index = start
+        for item in element:
+            if not isinstance(item.tag, str) or item.tag.lower() != 'li':
+                continue
+            marker = f"{index}." if ordered else '-'
+            index += 1
+
+            # 嵌套列表单独渲染并增加缩进，其余内容作为列表项正文
+            text_parts, nested = [], []
+            if item.text:
+                text_parts.append(WHITESPACE.sub(' ', item.text))
+            for child in item:
+                if isinstance(child.tag, str) and child.tag.lower() in ('ul', 'ol'):
+                    nested.append(self._list(child, depth + 1))
+                else:
+                    text_parts.append(self._element(child))
+                if child.tail:
+                    text_parts.append(WHITESPACE.sub(' ', child.tail))
+            text = WHITESPACE.sub(' ', ''.join(text_parts)).strip()
+
+            lines.append(f"{indent}{marker} {text}")
+            lines.extend(nested)
+        return '\n'.join(lines)
+
+    def _blockquote(self, element):
+        text = EXTRA_BLANK_LINES.sub('\n\n', self._children(element)).strip()
+        if not text:
+            return ''
+        quoted = '\n'.join(f"> {line}" if line else '>' for line in text.split('\n'))
+        return f"\n\n{quoted}\n\n"
+
+    def _table(self, element):
+        rows = []
+        for row in element.iter('tr'):
+            cells = [
+                self._inline(cell).replace('|', '\\|')
+                for cell in row if isinstance(cell.tag, str) and cell.tag.lower() in ('td', 'th')
+            ]
+            if cells:
+                rows.append(cells)
+        if not rows:
+            return ''
+
+        width = max(len(row) for row in rows)
+        lines = []
+        for index, row in enumerate(rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if index == 0:
+                lines.append('| ' + ' | '.join(['---'] * width) + ' |')
+        return '\n\n' + '\n'.join(lines) + '\n\n'
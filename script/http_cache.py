@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于条件请求（Conditional GET）的持久化HTTP缓存
+缓存网页正文及其ETag/Last-Modified，再次请求时发送If-None-Match/If-Modified-Since，
+服务器返回304时直接使用本地缓存，并告知调用方页面未变化
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'knowledge', 'cache', 'http'
+)
+
+
+@dataclass
+class FetchResult:
+    """一次抓取的结果"""
+    url: str
+    text: str
+    status_code: int
+    not_modified: bool = False      # 服务器返回304，页面自上次抓取以来未变化
+    from_cache: bool = False        # 正文来自本地缓存
+    bytes_received: int = 0         # 本次实际下载的正文字节数
+    response: object = None         # 原始响应（requests.Response），写入WARC存档时使用
+
+
+class HttpCache:
+    """
+    磁盘HTTP缓存，每个URL对应一个元数据文件(.json)和一个正文文件(.body)
+    写入通过临时文件+重命名完成，多个线程同时抓取不同URL是安全的
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def load(self, url):
+        """读取缓存，返回 (元数据, 正文字节)，不存在时返回 (None, None)"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url, response):
+        """保存响应正文和校验头，没有ETag和Last-Modified的响应不缓存"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'encoding': response.encoding,
+            'stored_at': datetime.now().isoformat(),
+        }
+        # 先写正文再写元数据，保证元数据存在时正文一定完整
+        self._atomic_write(body_path, response.content)
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def _atomic_write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def fetch(self, session, url, timeout=30, **kwargs):
+        """
+        通过session发起条件请求
+        返回FetchResult；网络错误和非2xx/304状态码以requests异常的形式抛出
+        """
+        meta, body = self.load(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, timeout=timeout, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta:
+            encoding = meta.get('encoding') or 'utf-8'
+            return FetchResult(
+                url=url,
+                text=body.decode(encoding, errors='replace'),
+                status_code=304,
+                not_modified=True,
+                from_cache=True,
+                bytes_received=0,
+                response=response,
+            )
+
+        response.raise_for_status()
+        response.encoding = response.apparent_encoding or 'utf-8'
+        self.store(url, response)
+        return FetchResult(
+            url=url,
+            text=response.text,
+            status_code=response.status_code,
+            bytes_received=len(response.content),
+            response=response,
+        )
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于多模式匹配自动机（Aho-Corasick）的技术关键词提取
+词表（规范名称、权重、别名）从文件加载，一次扫描文本即可找出所有词条，
+耗时只与文本长度相关而与词表大小无关；结果按TF-IDF × 词条权重排序
+
+文档频率（DF）统计由 fit 命令从已清洗的知识块语料生成：
+    python script/keyword_extractor.py fit knowledge/cleaned/javaguide
+    python script/keyword_extractor.py extract "HashMap 和 ConcurrentHashMap 的区别"
+
+自带的词表（resources/tech_vocabulary.txt）是覆盖面试常见主题的起步词表，约五百个规范名称和五百个别名；
+suggest 命令列出语料中出现较多、但词表中还没有的英文技术名词（类名、驼峰/全大写标识符），
+人工确认后追加到词表，再重新 fit：
+    python script/keyword_extractor.py suggest knowledge/cleaned/javaguide --min-df 3 >> candidates.txt
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+from collections import Counter, deque
+from datetime import datetime
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VOCABULARY = os.path.join(SCRIPT_DIR, 'resources', 'tech_vocabulary.txt')
+DEFAULT_STATS_PATH = os.path.join(
+    os.path.dirname(SCRIPT_DIR), 'knowledge', 'cleaned', 'javaguide', '_meta', 'keyword_stats.json'
+)
+
+# 只转换ASCII大小写，保证转换前后文本长度一致，匹配位置可直接对应原文
+# 词表候选：驼峰标识符（HashMap、ThreadLocal、getBean）和2~6个大写字母的缩写（AQS、CAS、MVCC）
+CANDIDATE_PATTERN = re.compile(
+    r'(?<![A-Za-z0-9_])(?:[A-Za-z][a-z0-9]*(?:[A-Z][a-z0-9]+)+|[A-Z]{2,6})(?![A-Za-z0-9_])'
+)
+
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def _is_word_char(char):
+    """英文词边界判断：ASCII字母、数字和下划线视为单词的一部分"""
+    return char.isascii() and (char.isalnum() or char == '_')
+
+
+def load_vocabulary(path=DEFAULT_VOCABULARY):
+    """
+    加载词表文件，每行: 规范名称<TAB>权重<TAB>别名1|别名2
+    返回 [(规范名称, 权重, [别名, ...]), ...]
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            fields = line.split('\t')
+            term = fields[0].strip()
+            try:
+                weight = float(fields[1]) if len(fields) > 1 and fields[1].strip() else 1.0
+            except ValueError:
+                raise ValueError(f"{path}:{line_number} 权重不是数字: {fields[1]!r}")
+            aliases = [alias.strip() for alias in fields[2].split('|')] if len(fields) > 2 else []
+            entries.append((term, weight, [alias for alias in aliases if alias]))
+    return entries
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick多模式匹配自动机
+    节点以 goto 字典 + fail 指针 + 输出列表表示，构建完成后对文本做单次线性扫描
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        """添加模式串，命中时返回value"""
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            node = next_node
+        self.outputs[node].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """广度优先计算fail指针，并把fail链上的输出合并到每个节点"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(char, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """逐个返回 (起始位置, 结束位置, value)，包含相互重叠的匹配"""
+        if not self._built:
+            self.build()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in outputs[node]:
+                yield index - length + 1, index + 1, value
+
+
+class KeywordExtractor:
+    """
+    技术关键词提取器
+
+    - 别名命中时记为规范名称，英文词条不区分大小写并要求两侧是词边界（"IP"不会命中"IPv6"）
+    - 相互重叠的命中取最长者（"Spring Boot"不再额外计为"Spring"）
+    - 打分: (1 + log tf) × idf × 权重，没有DF统计时idf视为1
+    """
+
+    def __init__(self, vocabulary_path=None, stats_path=None):
+        self.vocabulary_path = vocabulary_path or DEFAULT_VOCABULARY
+        self.stats_path = stats_path
+        self.weights = {}
+        self.automaton = AhoCorasick()
+        self.document_count = 0
+        self.document_frequency = Counter()
+
+        for term, weight, aliases in load_vocabulary(self.vocabulary_path):
+            self.weights[term] = weight
+            # 仅大小写不同的别名只需加入一次
+            surfaces = {surface.translate(ASCII_LOWER): surface for surface in [term] + aliases}
+            for pattern, surface in surfaces.items():
+                self.automaton.add(pattern, (term, surface))
+        self.automaton.build()
+
+        if stats_path and os.path.exists(stats_path):
+            self.load_stats(stats_path)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def count_terms(self, text):
+        """统计文本中每个规范词条的出现次数"""
+        lowered = text.translate(ASCII_LOWER)
+        candidates = []
+        for start, end, (term, surface) in self.automaton.iter_matches(lowered):
+            if _is_word_char(surface[0]) and start > 0 and _is_word_char(lowered[start - 1]):
+                continue
+            if _is_word_char(surface[-1]) and end < len(lowered) and _is_word_char(lowered[end]):
+                continue
+            candidates.append((start, end, term))
+
+        # 重叠的命中按起始位置、长度从长到短贪心选取
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        counts = Counter()
+        covered_until = 0
+        for start, end, term in candidates:
+            if start < covered_until:
+                continue
+            counts[term] += 1
+            covered_until = end
+        return counts
+
+    def idf(self, term):
+        if not self.document_count:
+            return 1.0
+        return math.log((1 + self.document_count) / (1 + self.document_frequency.get(term, 0))) + 1.0
+
+    def rank(self, counts, top_k=10):
+        """按TF-IDF × 权重对词频统计排序，返回前top_k个规范词条"""
+        scored = [
+            (term, (1.0 + math.log(tf)) * self.idf(term) * self.weights.get(term, 1.0))
+            for term, tf in counts.items()
+        ]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return [term for term, _ in scored[:top_k]]
+
+    def extract(self, text, top_k=10):
+        """提取文本的关键词，按相关度从高到低排列"""
+        return self.rank(self.count_terms(text), top_k)
+
+    def add_document(self, text):
+        """把一篇文档计入DF统计"""
+        self.document_count += 1
+        self.document_frequency.update(self.count_terms(text).keys())
+
+    def load_stats(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        self.document_count = stats.get('document_count', 0)
+        self.document_frequency = Counter(stats.get('document_frequency', {}))
+
+    def save_stats(self, path=None):
+        """原子写入DF统计文件"""
+        path = path or self.stats_path
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        stats = {
+            'updated_at': datetime.now().isoformat(),
+            'vocabulary_size': len(self.weights),
+            'document_count': self.document_count,
+            'document_frequency': dict(self.document_frequency.most_common()),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+
+def fit_corpus(directory, vocabulary_path=None, stats_path=None):
+    """遍历目录下的知识块，以每个知识块的问题+回答为一篇文档统计DF"""
+    from chunk_io import iter_corpus
+
+    extractor = KeywordExtractor(vocabulary_path)
+    seen_ids = set()
+    for chunk in iter_corpus(directory):
+        # 增量清洗会让同一知识块出现在多个文件中，只统计一次
+        chunk_id = chunk.get('chunk_id')
+        if chunk_id in seen_ids:
+            continue
+        seen_ids.add(chunk_id)
+        extractor.add_document(f"{chunk.get('question', '')} {chunk.get('answer_markdown', '')}")
+    extractor.save_stats(stats_path or DEFAULT_STATS_PATH)
+    return extractor
+
+
+def suggest_terms(directory, vocabulary_path=None, min_df=3, limit=100):
+    """
+    统计语料中词表尚未收录的英文技术名词，返回按文档频率排序的 [(候选词, 文档频率), ...]
+    只作为扩充词表的参考，候选词需要人工确认（代码中的变量名等也会被列出）
+    """
+    from chunk_io import iter_corpus
+
+    known = set()
+    for term, _, aliases in load_vocabulary(vocabulary_path or DEFAULT_VOCABULARY):
+        known.update(name.translate(ASCII_LOWER) for name in [term, *aliases])
+
+    document_frequency = Counter()
+    seen_ids = set()
+    for chunk in iter_corpus(directory):
+        chunk_id = chunk.get('chunk_id')
+        if chunk_id in seen_ids:
+            continue
+        seen_ids.add(chunk_id)
+        text = f"{chunk.get('question', '')} {chunk.get('answer_markdown', '')}"
+        document_frequency.update({
+            candidate for candidate in CANDIDATE_PATTERN.findall(text)
+            if candidate.translate(ASCII_LOWER) not in known
+        })
+    return [(term, df) for term, df in document_frequency.most_common() if df >= min_df][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='技术关键词提取')
+    parser.add_argument('--vocabulary', default=DEFAULT_VOCABULARY, help='词表文件')
+    parser.add_argument('--stats', default=DEFAULT_STATS_PATH, help='DF统计文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = subparsers.add_parser('fit', help='从已清洗的知识块生成DF统计')
+    fit_parser.add_argument('directory', nargs='?', default=os.path.dirname(os.path.dirname(DEFAULT_STATS_PATH)))
+
+    suggest_parser = subparsers.add_parser('suggest', help='列出语料中词表尚未收录的候选词（词表格式，人工确认后追加）')
+    suggest_parser.add_argument('directory', nargs='?', default=os.path.dirname(os.path.dirname(DEFAULT_STATS_PATH)))
+    suggest_parser.add_argument('--min-df', type=int, default=3, help='候选词至少出现在多少个知识块中')
+    suggest_parser.add_argument('--limit', type=int, default=100, help='最多列出的候选词数量')
+
+    extract_parser = subparsers.add_parser('extract', help='提取一段文本的关键词')
+    extract_parser.add_argument('text')
+    extract_parser.add_argument('-k', '--top-k', type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        extractor = fit_corpus(args.directory, args.vocabulary, args.stats)
+        print(f"✅ 已统计 {extractor.document_count} 个知识块、{len(extractor.document_frequency)} 个词条的文档频率")
+        print(f"📁 保存到: {args.stats}")
+        return 0
+
+    if args.command == 'suggest':
+        # 输出为词表格式（默认权重），文档频率写在上一行的注释中，便于人工筛选后直接追加到词表
+        for term, df in suggest_terms(args.directory, args.vocabulary, args.min_df, args.limit):
+            print(f"# {term}: 出现在 {df} 个知识块中")
+            print(f"{term}\t1.0")
+        return 0
+
+    extractor = KeywordExtractor(args.vocabulary, args.stats)
+    counts = extractor.count_terms(args.text)
+    for term in extractor.rank(counts, args.top_k):
+        print(f"{term}\ttf={counts[term]}\tidf={extractor.idf(term):.3f}\tweight={extractor.weights[term]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
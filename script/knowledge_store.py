@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite知识库
+所有知识块保存在一个数据库文件中，按chunk_id插入或更新（upsert），不再每次清洗生成一份完整快照
+- 来源URL、category、sub_category和关键词建有索引，按条件查询只读取匹配的行
+- 回答正文（answer_markdown / answer_text / content_for_embedding）单独存放，只在需要时读取
+- iter_chunks以生成器逐个返回知识块，内存占用取决于查询结果而不是整个知识库的大小
+
+用法：
+    python script/knowledge_store.py import knowledge/cleaned/javaguide     # 导入已有的JSON/JSONL文件
+    python script/knowledge_store.py stats
+    python script/knowledge_store.py query --category "Java基础常见问题" --keyword JVM --text
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge', 'knowledge.sqlite3')
+
+# 单独存放、按需读取的大文本字段
+TEXT_FIELDS = ('answer_markdown', 'answer_text', 'content_for_embedding')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    source_name TEXT,
+    source_url TEXT,
+    category TEXT,
+    sub_category TEXT,
+    question TEXT,
+    token_count INTEGER,
+    duplicate_of TEXT,
+    parent_chunk_id TEXT,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL              -- 除正文外的完整知识块（JSON）
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_source_url ON chunks(source_url);
+CREATE INDEX IF NOT EXISTS idx_chunks_category ON chunks(category, sub_category);
+CREATE INDEX IF NOT EXISTS idx_chunks_sub_category ON chunks(sub_category);
+CREATE INDEX IF NOT EXISTS idx_chunks_parent ON chunks(parent_chunk_id);
+
+CREATE TABLE IF NOT EXISTS chunk_texts (
+    chunk_id TEXT PRIMARY KEY REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    answer_markdown TEXT,
+    answer_text TEXT,
+    content_for_embedding TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chunk_keywords (
+    keyword TEXT NOT NULL,
+    chunk_id TEXT NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    PRIMARY KEY (keyword, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chunk_keywords_chunk ON chunk_keywords(chunk_id);
+'''
+
+
+def _fingerprint(data):
+    """比较知识块是否变化时忽略每次清洗都会更新的created_at"""
+    source = dict(data.get('source_info') or {})
+    source.pop('created_at', None)
+    return json.dumps(dict(data, source_info=source), ensure_ascii=False, sort_keys=True)
+
+
+class KnowledgeStore:
+    """
+    知识库的读写接口
+    write / write_many / close 与chunk_io.ChunkWriter一致，可直接作为清洗结果的输出目标
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # 写入
+
+    def _upsert(self, chunk, now):
+        chunk_id = chunk['chunk_id']
+        row = self._db.execute('SELECT content_hash, data FROM chunks WHERE chunk_id = ?', (chunk_id,)).fetchone()
+        data = {key: value for key, value in chunk.items() if key not in TEXT_FIELDS}
+        data_json = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        if row and row[0] == chunk.get('content_hash') and _fingerprint(json.loads(row[1])) == _fingerprint(data):
+            self.stats['unchanged'] += 1
+            return
+        self.stats['updated' if row else 'inserted'] += 1
+
+        source = chunk.get('source_info') or {}
+        self._db.execute(
+            'INSERT INTO chunks(chunk_id, content_hash, source_name, source_url, category, sub_category, question, '
+            'token_count, duplicate_of, parent_chunk_id, updated_at, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(chunk_id) DO UPDATE SET content_hash = excluded.content_hash, '
+            'source_name = excluded.source_name, source_url = excluded.source_url, category = excluded.category, '
+            'sub_category = excluded.sub_category, question = excluded.question, '
+            'token_count = excluded.token_count, duplicate_of = excluded.duplicate_of, '
+            'parent_chunk_id = excluded.parent_chunk_id, updated_at = excluded.updated_at, data = excluded.data',
+            (chunk_id, chunk.get('content_hash'), source.get('name'), source.get('url'), chunk.get('category'),
+             chunk.get('sub_category'), chunk.get('question'), chunk.get('token_count'), chunk.get('duplicate_of'),
+             chunk.get('parent_chunk_id'), now, data_json)
+        )
+        self._db.execute(
+            'INSERT OR REPLACE INTO chunk_texts(chunk_id, answer_markdown, answer_text, content_for_embedding) '
+            'VALUES (?, ?, ?, ?)', (chunk_id, *(chunk.get(field) for field in TEXT_FIELDS))
+        )
+        self._db.execute('DELETE FROM chunk_keywords WHERE chunk_id = ?', (chunk_id,))
+        self._db.executemany(
+            'INSERT OR IGNORE INTO chunk_keywords(keyword, chunk_id) VALUES (?, ?)',
+            [(keyword, chunk_id) for keyword in chunk.get('keywords') or []]
+        )
+
+    def write_many(self, chunks):
+        """插入或更新多个知识块（一个事务），返回处理的数量；内容未变化的知识块不重写"""
+        now = time.time()
+        written = 0
+        with self._db:
+            for chunk in chunks:
+                self._upsert(chunk, now)
+                written += 1
+        return written
+
+    def write(self, chunk):
+        self.write_many([chunk])
+
+    def write_page(self, source_url, chunks):
+        """
+        写入一个页面（来源URL）当前产生的全部知识块，并在同一事务中删除该页面不再产生的知识块，返回删除的数量
+        切分、合并得到的知识块ID随规整参数和相邻知识块变化，只按chunk_id更新会留下过时或重复的行
+        """
+        now = time.time()
+        chunk_ids = set()
+        with self._db:
+            for chunk in chunks:
+                self._upsert(chunk, now)
+                chunk_ids.add(chunk['chunk_id'])
+            stale = [row[0] for row in self._db.execute('SELECT chunk_id FROM chunks WHERE source_url = ?',
+                                                        (source_url,))
+                     if row[0] not in chunk_ids]
+            for start in range(0, len(stale), 500):
+                batch = stale[start:start + 500]
+                self._db.execute(f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+        self.stats['removed'] += len(stale)
+        return len(stale)
+
+    def delete(self, chunk_ids):
+        """删除知识块以及由它切分出的子块，返回删除的数量"""
+        chunk_ids = list(chunk_ids)
+        deleted = 0
+        with self._db:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                marks = ','.join('?' * len(batch))
+                cursor = self._db.execute(
+                    f'DELETE FROM chunks WHERE chunk_id IN ({marks}) OR parent_chunk_id IN ({marks})', batch * 2
+                )
+                deleted += cursor.rowcount
+        return deleted
+
+    # 查询
+
+    def _where(self, url=None, category=None, sub_category=None, keyword=None, skip_duplicates=False):
+        clauses, params = [], []
+        if url:
+            clauses.append('c.source_url = ?')
+            params.append(url)
+        if category:
+            clauses.append('c.category = ?')
+            params.append(category)
+        if sub_category:
+            clauses.append('c.sub_category = ?')
+            params.append(sub_category)
+        if keyword:
+            clauses.append('c.chunk_id IN (SELECT chunk_id FROM chunk_keywords WHERE keyword = ?)')
+            params.append(keyword)
+        if skip_duplicates:
+            clauses.append('c.duplicate_of IS NULL')
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def iter_chunks(self, url=None, category=None, sub_category=None, keyword=None, include_text=False,
+                    skip_duplicates=False, limit=None, batch_size=500):
+        """
+        按条件逐个返回知识块（按chunk_id排序），条件之间为“且”的关系
+        include_text为False时不读取回答正文，返回的知识块不含TEXT_FIELDS中的字段
+        """
+        where, params = self._where(url, category, sub_category, keyword, skip_duplicates)
+        if include_text:
+            sql = ('SELECT c.data, t.answer_markdown, t.answer_text, t.content_for_embedding FROM chunks c '
+                   'LEFT JOIN chunk_texts t ON t.chunk_id = c.chunk_id')
+        else:
+            sql = 'SELECT c.data FROM chunks c'
+        sql += where + ' ORDER BY c.chunk_id'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        cursor = self._db.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    chunk = json.loads(row[0])
+                    for field, value in zip(TEXT_FIELDS, row[1:]):
+                        if value is not None:
+                            chunk[field] = value
+                    yield chunk
+        finally:
+            cursor.close()
+
+    def get(self, chunk_id, include_text=True):
+        """按ID读取一个知识块，不存在时返回None"""
+        cursor = self._db.execute('SELECT data FROM chunks WHERE chunk_id = ?', (chunk_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        chunk = json.loads(row[0])
+        if include_text:
+            texts = self._db.execute(
+                'SELECT answer_markdown, answer_text, content_for_embedding FROM chunk_texts WHERE chunk_id = ?',
+                (chunk_id,)
+            ).fetchone() or ()
+            chunk.update({field: value for field, value in zip(TEXT_FIELDS, texts) if value is not None})
+        return chunk
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self._db.execute(f'SELECT COUNT(*) FROM chunks c{where}', params).fetchone()[0]
+
+    def categories(self):
+        """各category下的知识块数量"""
+        return self._db.execute(
+            'SELECT category, COUNT(*) FROM chunks GROUP BY category ORDER BY COUNT(*) DESC'
+        ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite知识库')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help='数据库文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='导入已有的知识块文件（JSON/JSONL）')
+    import_parser.add_argument('source', help='知识块文件或目录（递归读取）')
+
+    subparsers.add_parser('stats', help='知识块数量统计')
+
+    query_parser = subparsers.add_parser('query', help='按条件查询知识块')
+    query_parser.add_argument('--url', help='来源URL')
+    query_parser.add_argument('--category')
+    query_parser.add_argument('--sub-category')
+    query_parser.add_argument('--keyword')
+    query_parser.add_argument('--text', action='store_true', help='输出回答正文')
+    query_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with KnowledgeStore(args.store) as store:
+        if args.command == 'import':
+            from chunk_io import iter_chunks, iter_corpus
+            chunks = iter_corpus(args.source) if os.path.isdir(args.source) else iter_chunks(args.source)
+            written = 0
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= 500:
+                    written += store.write_many(batch)
+                    batch = []
+            written += store.write_many(batch)
+            stats = store.stats
+            print(f"✅ 导入 {written} 个知识块：新增 {stats['inserted']}，更新 {stats['updated']}，"
+                  f"未变化 {stats['unchanged']}（{store.path}）")
+        elif args.command == 'stats':
+            print(f"📚 知识库: {store.path}")
+            print(f"   知识块: {store.count()}（去重后 {store.count(skip_duplicates=True)}）")
+            for category, count in store.categories():
+                print(f"   • {category or '(无分类)'}: {count}")
+        else:
+            for chunk in store.iter_chunks(args.url, args.category, args.sub_category, args.keyword,
+                                           include_text=args.text, limit=args.limit):
+                print(f"🔹 {chunk['chunk_id']} | {chunk.get('sub_category') or '-'} | {chunk.get('question')}")
+                if args.text:
+                    print(f"   {(chunk.get('answer_text') or '')[:200]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
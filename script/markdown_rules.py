@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown清洗规则引擎
+规则从JSON配置加载，每个进程只编译一次：所有规则合并为一个带命名分组的正则，
+对每段文本只扫描一遍；同时记录每条规则的命中次数，便于根据真实数据调整规则
+
+规则的作用范围（scope）：
+- inline: 只删除匹配到的文本本身
+- line:   从匹配处删除到行尾
+- block:  从匹配处删除到段落结束（下一个空行）
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'resources', 'javaguide_markdown_rules.json'
+)
+
+SCOPES = {
+    'inline': '',
+    'line': r'[^\n]*',
+    'block': r'[^\n]*(?:\n(?![ \t]*\n)[^\n]*)*',
+}
+
+# 规则配置中允许使用的正则标志（以内联标志的形式作用于单条规则）
+FLAGS = {'IGNORECASE': 'i', 'MULTILINE': 'm', 'DOTALL': 's'}
+
+EXTRA_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+
+
+class MarkdownRuleEngine:
+    """
+    配置文件格式：
+    {
+      "rules": [
+        {"name": "ad-block", "pattern": "这是一则或许对你有用的小广告", "scope": "block",
+         "flags": ["IGNORECASE"], "replacement": ""},
+        ...
+      ]
+    }
+    同一位置有多条规则可以匹配时，配置中靠前的规则优先
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        alternatives = []
+        for index, rule in enumerate(rules):
+            name = rule.get('name') or f"rule_{index}"
+            scope = rule.get('scope', 'inline')
+            if scope not in SCOPES:
+                raise ValueError(f"规则 {name} 的scope无效: {scope}")
+            pattern = rule['pattern']
+            # 规则自身的分组会打乱合并后的分组编号，只允许使用非捕获分组
+            if re.compile(pattern).groups:
+                raise ValueError(f"规则 {name} 不能包含捕获分组，请使用 (?:...)")
+
+            flags = ''.join(FLAGS[flag] for flag in rule.get('flags', ()))
+            expression = f"(?{flags}:{pattern})" if flags else f"(?:{pattern})"
+            alternatives.append(f"(?P<r{index}>{expression}{SCOPES[scope]})")
+            self.rules.append({'name': name, 'scope': scope, 'replacement': rule.get('replacement', '')})
+
+        self.pattern = re.compile('|'.join(alternatives)) if alternatives else None
+        self.hits = Counter()
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['rules'])
+
+    def _replace(self, match):
+        rule = self.rules[int(match.lastgroup[1:])]
+        self.hits[rule['name']] += 1
+        return rule['replacement']
+
+    def apply(self, text):
+        """对文本应用所有规则，并压缩多余的空行"""
+        if self.pattern is not None:
+            text = self.pattern.sub(self._replace, text)
+        return EXTRA_BLANK_LINES.sub('\n\n', text)
+
+    def stats(self):
+        """返回每条规则的命中次数（按配置顺序，包含未命中的规则）"""
+        return {rule['name']: self.hits.get(rule['name'], 0) for rule in self.rules}
+
+
+@lru_cache(maxsize=None)
+def load_rule_engine(path=DEFAULT_RULES_PATH):
+    """加载并编译规则配置，同一进程内同一配置文件只编译一次"""
+    return MarkdownRuleEngine.from_file(path)
+
+
+def format_rule_hits(hits):
+    """将命中统计格式化为一行文本"""
+    return '，'.join(f"{name} {count}" for name, count in sorted(hits.items(), key=lambda item: -item[1]))
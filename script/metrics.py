@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标与结构化日志
+爬虫和清洗器的各个阶段（抓取、解析、章节切分、Markdown转换、关键词/token补充、保存）通过stage()计时，
+按阶段汇总次数、总耗时、最大耗时，并按URL累计耗时，运行变慢时可以看出是哪个阶段、哪个URL；
+下载字节数、知识块数等通过count()计数
+
+日志通过debug/info/warning/error输出：
+    text格式（默认）   与原来的print一致，输出带emoji的可读文本
+    json格式           每行一个JSON对象（ts、level、event、msg及结构化字段），便于日志系统收集
+日志级别和格式取环境变量 LOG_LEVEL（debug/info/warning/error，默认info）和 LOG_FORMAT（text/json），
+命令行工具通过 add_arguments() 提供 -v/-q/--log-format/--metrics-summary/--prometheus-textfile
+
+运行结束时 finish_run() 输出各阶段耗时汇总，并可写入：
+    --metrics-summary PATH       本次运行的指标汇总（JSON，含每个阶段最慢的URL）
+    --prometheus-textfile PATH   Prometheus textfile（供node_exporter的textfile collector采集）
+
+多进程清洗时，工作进程用 snapshot(reset=True) 取出本页面的指标随结果返回，主进程 merge() 合并
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_FORMATS = ('text', 'json')
+
+# 汇总中每个阶段列出的最慢URL数
+DEFAULT_SLOWEST = 5
+
+PROMETHEUS_PREFIX = 'javaagent'
+
+
+def _write_atomic(path, content):
+    """写入临时文件后重命名，采集程序不会读到写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+class RunMetrics:
+    """
+    一次运行的阶段耗时、计数器和日志输出
+    抓取线程会并发调用stage/count/log，修改统计数据时持有锁
+    """
+
+    def __init__(self, level='info', log_format='text', stream=None, slowest=DEFAULT_SLOWEST):
+        self._lock = threading.Lock()
+        self.level = 'info'
+        self.log_format = 'text'
+        # 为None时使用当前的sys.stdout（与print一致，重定向后仍然有效）
+        self.stream = stream
+        self.slowest = slowest
+        self.configure(level, log_format)
+        self.reset()
+
+    def configure(self, level=None, log_format=None, stream=None):
+        """设置日志级别、格式和输出流，参数为None时保持不变"""
+        if level is not None:
+            if level not in LEVELS:
+                raise ValueError(f"未知的日志级别: {level}（可选: {', '.join(LEVELS)}）")
+            self.level = level
+        if log_format is not None:
+            if log_format not in LOG_FORMATS:
+                raise ValueError(f"未知的日志格式: {log_format}（可选: {', '.join(LOG_FORMATS)}）")
+            self.log_format = log_format
+        if stream is not None:
+            self.stream = stream
+        self._threshold = LEVELS[self.level]
+
+    def reset(self):
+        """清空统计数据，重新开始计时"""
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+            self._clear()
+
+    def _clear(self):
+        # 阶段名 -> [次数, 总耗时, 最大耗时]
+        self.stages = {}
+        # 阶段名 -> {URL: 累计耗时}
+        self.url_seconds = defaultdict(Counter)
+        self.counters = Counter()
+
+    # ---------- 日志 ----------
+
+    def enabled(self, level):
+        return LEVELS[level] >= self._threshold
+
+    def log(self, level, event, message=None, **fields):
+        """
+        输出一条日志
+        text格式输出message（没有message时输出事件名和字段），json格式输出包含全部字段的一行JSON
+        """
+        if LEVELS[level] < self._threshold:
+            return
+        if self.log_format == 'json':
+            record = {
+                'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'level': level,
+                'event': event,
+            }
+            if message is not None:
+                record['msg'] = message
+            record.update(fields)
+            line = json.dumps(record, ensure_ascii=False, default=str)
+        elif message is not None:
+            line = message
+        else:
+            line = ' '.join([event] + [f"{name}={value}" for name, value in fields.items()])
+        stream = self.stream or sys.stdout
+        # 多个线程、工作进程共用输出，每条日志一次写入并立即刷新，避免行与行交错
+        stream.write(line + '\n')
+        stream.flush()
+
+    def debug(self, event, message=None, **fields):
+        self.log('debug', event, message, **fields)
+
+    def info(self, event, message=None, **fields):
+        self.log('info', event, message, **fields)
+
+    def warning(self, event, message=None, **fields):
+        self.log('warning', event, message, **fields)
+
+    def error(self, event, message=None, **fields):
+        self.log('error', event, message, **fields)
+
+    def divider(self, char='-', width=50, level='info'):
+        """输出分隔线，只在text格式下输出"""
+        if self.log_format == 'text' and LEVELS[level] >= self._threshold:
+            (self.stream or sys.stdout).write(char * width + '\n')
+
+    # ---------- 指标 ----------
+
+    @contextmanager
+    def stage(self, name, url=None, emit=True, **fields):
+        """
+        对一个阶段计时，产出字段字典，阶段内可向其中补充字段（如字节数）
+        emit=True时在debug级别输出一条阶段日志；按知识块调用的阶段应传入emit=False，只计入统计
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.observe(name, time.perf_counter() - start, url, emit, **fields)
+
+    def observe(self, name, seconds, url=None, emit=True, **fields):
+        """记录一个已知耗时的阶段"""
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                self.stages[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+            if url:
+                self.url_seconds[name][url] += seconds
+        if emit and LEVELS['debug'] >= self._threshold:
+            self.log('debug', 'stage', f"⏱️ {name} {seconds * 1000:.1f}ms" + (f" {url}" if url else ""),
+                     stage=name, url=url, duration_ms=round(seconds * 1000, 3), **fields)
+
+    def count(self, name, value=1):
+        """累加计数器"""
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self, reset=False):
+        """导出统计数据（可序列化，可跨进程传递），reset=True时同时清空"""
+        with self._lock:
+            data = {
+                'stages': {name: list(stats) for name, stats in self.stages.items()},
+                'urls': {name: dict(urls) for name, urls in self.url_seconds.items()},
+                'counters': dict(self.counters),
+            }
+            if reset:
+                self._clear()
+        return data
+
+    def merge(self, data):
+        """合并snapshot()导出的统计数据"""
+        if not data:
+            return
+        with self._lock:
+            for name, (count, seconds, max_seconds) in data['stages'].items():
+                stats = self.stages.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += count
+                stats[1] += seconds
+                stats[2] = max(stats[2], max_seconds)
+            for name, urls in data['urls'].items():
+                self.url_seconds[name].update(urls)
+            self.counters.update(data['counters'])
+
+    def summary(self):
+        """本次运行的指标汇总，阶段按总耗时从高到低排列，每个阶段附累计耗时最多的URL"""
+        with self._lock:
+            stages = {}
+            for name, (count, seconds, max_seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+                stages[name] = {
+                    'count': count,
+                    'total_s': round(seconds, 6),
+                    'avg_ms': round(seconds / count * 1000, 3),
+                    'max_ms': round(max_seconds * 1000, 3),
+                    'slowest': [{'url': url, 'seconds': round(url_seconds, 6)}
+                                for url, url_seconds in self.url_seconds[name].most_common(self.slowest)],
+                }
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'duration_s': round(time.perf_counter() - self._started, 3),
+                'stages': stages,
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def report(self):
+        """输出各阶段耗时汇总（info级别）"""
+        summary = self.summary()
+        if not summary['stages'] and not summary['counters']:
+            return
+        if self.log_format == 'json':
+            self.info('run_summary', **summary)
+            return
+        self.info('run_summary', f"⏱️ 阶段耗时（共 {summary['duration_s']:.2f}秒，按总耗时排序）:")
+        for name, stats in summary['stages'].items():
+            slowest = stats['slowest'][0] if stats['slowest'] else None
+            self.info('run_summary', f"   {name:<18} {stats['count']:>6}次  合计 {stats['total_s']:>8.2f}s  "
+                                     f"平均 {stats['avg_ms']:>8.1f}ms  最大 {stats['max_ms']:>8.1f}ms"
+                                     + (f"  最慢: {slowest['url']} ({slowest['seconds']:.2f}s)" if slowest else ""))
+        if summary['counters']:
+            self.info('run_summary', "📈 计数: " + "，".join(
+                f"{name}={value}" for name, value in summary['counters'].items()))
+
+    def write_summary(self, path):
+        """写入JSON格式的指标汇总"""
+        _write_atomic(path, json.dumps(self.summary(), indent=2, ensure_ascii=False) + '\n')
+        return path
+
+    def prometheus_text(self, labels=None, prefix=PROMETHEUS_PREFIX):
+        """Prometheus文本格式：各阶段的耗时（summary，不含分位数）、最大耗时以及计数器"""
+        labels = dict(labels or {})
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds 各阶段耗时",
+            f"# TYPE {prefix}_stage_duration_seconds summary",
+        ]
+        for name, stats in summary['stages'].items():
+            stage_labels = _format_labels({**labels, 'stage': name})
+            lines.append(f"{prefix}_stage_duration_seconds_sum{stage_labels} {stats['total_s']}")
+            lines.append(f"{prefix}_stage_duration_seconds_count{stage_labels} {stats['count']}")
+        lines.append(f"# HELP {prefix}_stage_max_seconds 各阶段单次最大耗时")
+        lines.append(f"# TYPE {prefix}_stage_max_seconds gauge")
+        for name, stats in summary['stages'].items():
+            lines.append(f"{prefix}_stage_max_seconds{_format_labels({**labels, 'stage': name})} "
+                         f"{round(stats['max_ms'] / 1000, 6)}")
+        for name, value in summary['counters'].items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        lines.append(f"# TYPE {prefix}_run_duration_seconds gauge")
+        lines.append(f"{prefix}_run_duration_seconds{_format_labels(labels)} {summary['duration_s']}")
+        lines.append(f"# TYPE {prefix}_run_finished_timestamp_seconds gauge")
+        lines.append(f"{prefix}_run_finished_timestamp_seconds{_format_labels(labels)} {time.time():.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, labels=None):
+        """写入Prometheus textfile（node_exporter要求文件名以.prom结尾）"""
+        _write_atomic(path, self.prometheus_text(labels))
+        return path
+
+
+def _env_choice(name, choices, default):
+    """读取环境变量，取值无效时使用默认值"""
+    value = os.environ.get(name, '').strip().lower()
+    return value if value in choices else default
+
+
+# 进程内共用的实例，日志级别和格式取自环境变量
+metrics = RunMetrics(
+    level=_env_choice('LOG_LEVEL', LEVELS, 'info'),
+    log_format=_env_choice('LOG_FORMAT', LOG_FORMATS, 'text'),
+)
+
+
+def add_arguments(parser):
+    """为命令行工具添加日志和指标相关的参数"""
+    group = parser.add_argument_group('日志与指标')
+    verbosity = group.add_mutually_exclusive_group()
+    verbosity.add_argument('--verbose', '-v', action='store_true',
+                           help='输出每个页面、每个阶段的详细日志（debug级别）')
+    verbosity.add_argument('--quiet', '-q', action='store_true',
+                           help='只输出警告和错误')
+    group.add_argument('--log-format', choices=LOG_FORMATS,
+                       help='日志格式：text为可读文本，json为每行一个JSON对象（默认取环境变量LOG_FORMAT，否则text）')
+    group.add_argument('--metrics-summary', default=os.environ.get('METRICS_SUMMARY'),
+                       help='运行结束时将各阶段耗时、计数和最慢的URL写入此JSON文件（默认取环境变量METRICS_SUMMARY）')
+    group.add_argument('--prometheus-textfile', default=os.environ.get('METRICS_PROMETHEUS'),
+                       help='运行结束时写入Prometheus textfile，文件名以.prom结尾（默认取环境变量METRICS_PROMETHEUS）')
+    return group
+
+
+def configure_from_args(args):
+    """按命令行参数设置日志级别和格式；同时写入环境变量，使工作进程使用相同的设置"""
+    level = 'debug' if args.verbose else ('warning' if args.quiet else None)
+    metrics.configure(level=level, log_format=args.log_format)
+    os.environ['LOG_LEVEL'] = metrics.level
+    os.environ['LOG_FORMAT'] = metrics.log_format
+
+
+def finish_run(args, job):
+    """运行结束：输出阶段耗时汇总，并按参数写入指标汇总和Prometheus textfile"""
+    metrics.report()
+    if args.metrics_summary:
+        metrics.write_summary(args.metrics_summary)
+        metrics.info('metrics_saved', f"📊 指标汇总已保存: {args.metrics_summary}", path=args.metrics_summary)
+    if args.prometheus_textfile:
+        metrics.write_prometheus(args.prometheus_textfile, labels={'job': job})
+        metrics.info('metrics_saved', f"📊 Prometheus指标已保存: {args.prometheus_textfile}",
+                     path=args.prometheus_textfile)
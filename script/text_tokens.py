@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中英文混合技术文本的轻量分词
+中文按相邻两字切分（bigram），英文/数字按单词切分并转为小写，不依赖分词词典；
+索引（BM25、哈希向量）和查询使用同一套规则，保证两侧的词项一致
+"""
+
+import re
+import zlib
+from functools import lru_cache
+
+
+# 英文单词（保留 C++ / C# 这类后缀）或连续的中日韩汉字
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+[+#]*|[㐀-䶿一-鿿豈-﫿]+')
+
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def tokenize(text):
+    """
+    将文本切分为词项列表
+    'HashMap的底层实现' -> ['hashmap', '的底', '底层', '层实', '实现']
+    """
+    if not text:
+        return []
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.translate(ASCII_LOWER)):
+        token = match.group()
+        if token[0].isascii():
+            tokens.append(token)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
+
+
+@lru_cache(maxsize=1 << 16)
+def token_hash(token):
+    """稳定的32位词项哈希（不受PYTHONHASHSEED影响，可在不同进程间复用）"""
+    return zlib.crc32(token.encode('utf-8'))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本token数统计
+默认使用离线的近似估算（按Llama 3系列分词器的经验比例：汉字约1.2个token，英文单词约每4个字母1个token），
+不需要下载分词器；需要精确计数时可指定HuggingFace分词器（需安装tokenizers或transformers）
+
+分词器通过环境变量 TOKENIZER 或参数指定：
+    approx                                    近似估算（默认）
+    meta-llama/Llama-3.3-70B-Instruct         HuggingFace模型名称
+    /path/to/tokenizer.json                   本地分词器文件
+
+用法：
+    python script/token_counter.py "HashMap的底层实现是什么？"
+    python script/token_counter.py --tokenizer /models/llama3/tokenizer.json --file README.md
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+from functools import lru_cache
+
+
+# 近似估算时的分段：连续汉字（含日韩）、英文字母、数字、含换行的空白、其他空白、其余单个字符
+APPROX_PATTERN = re.compile(
+    r'(?P<cjk>[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+)'
+    r'|(?P<word>[A-Za-z]+)'
+    r'|(?P<digits>[0-9]+)'
+    r'|(?P<newline>\s*\n\s*)'
+    r'|(?P<space>\s+)'
+    r'|(?P<other>.)',
+    re.DOTALL,
+)
+
+# 聊天模板为每条消息增加的token（Llama 3: <|start_header_id|>role<|end_header_id|>\n\n ... <|eot_id|>）
+MESSAGE_OVERHEAD = 5
+# 回答开头的 <|start_header_id|>assistant<|end_header_id|>\n\n 以及 <|begin_of_text|>
+REPLY_OVERHEAD = 5
+
+
+class TokenCounter:
+    """分词器的公共接口：count(text) 返回token数，其余方法基于count实现"""
+
+    name = None
+    # 估算误差的余量比例，计算上下文预算时预留
+    margin = 0.0
+
+    def count(self, text):
+        raise NotImplementedError
+
+    def count_messages(self, messages):
+        """一组聊天消息（含聊天模板开销）的token数"""
+        return sum(self.count(message.get('content') or '') + MESSAGE_OVERHEAD for message in messages) + REPLY_OVERHEAD
+
+    def truncate(self, text, max_tokens):
+        """截断文本使其不超过max_tokens，二分查找保留的字符数"""
+        if max_tokens <= 0:
+            return ''
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+
+class ApproxTokenCounter(TokenCounter):
+    """
+    离线近似估算，对中文技术文本的误差通常在10%以内（略偏高），margin据此预留余量
+    """
+
+    name = 'approx'
+    margin = 0.1
+
+    CJK_TOKENS_PER_CHAR = 1.2
+    LETTERS_PER_TOKEN = 4
+    DIGITS_PER_TOKEN = 3        # Llama 3分词器把数字按最多3位一组切分
+
+    def count(self, text):
+        if not text:
+            return 0
+        total = 0.0
+        for match in APPROX_PATTERN.finditer(text):
+            kind = match.lastgroup
+            length = match.end() - match.start()
+            if kind == 'cjk':
+                total += length * self.CJK_TOKENS_PER_CHAR
+            elif kind == 'word':
+                total += math.ceil(length / self.LETTERS_PER_TOKEN)
+            elif kind == 'digits':
+                total += math.ceil(length / self.DIGITS_PER_TOKEN)
+            elif kind == 'newline' or kind == 'other':
+                total += 1
+            # 单词前的空格与单词合并为一个token，不单独计数
+        return math.ceil(total)
+
+
+class HFTokenCounter(TokenCounter):
+    """
+    HuggingFace分词器（精确计数），优先使用轻量的tokenizers库，其次transformers
+    """
+
+    def __init__(self, tokenizer):
+        self.name = f"hf:{tokenizer}"
+        self._encode = self._load(tokenizer)
+
+    @staticmethod
+    def _load(tokenizer):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            Tokenizer = None
+        if Tokenizer is not None:
+            if os.path.isfile(tokenizer):
+                loaded = Tokenizer.from_file(tokenizer)
+            else:
+                loaded = Tokenizer.from_pretrained(tokenizer)
+            return lambda text: loaded.encode(text, add_special_tokens=False).ids
+
+        try:
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ImportError("精确计数需要安装tokenizers或transformers: pip install tokenizers") from None
+        path = os.path.dirname(tokenizer) if os.path.isfile(tokenizer) else tokenizer
+        loaded = AutoTokenizer.from_pretrained(path)
+        return lambda text: loaded.encode(text, add_special_tokens=False)
+
+    def count(self, text):
+        return len(self._encode(text)) if text else 0
+
+
+@lru_cache(maxsize=None)
+def load_token_counter(tokenizer=None):
+    """按名称创建token计数器（每个进程只加载一次），tokenizer为None时读取环境变量TOKENIZER"""
+    tokenizer = tokenizer or os.getenv('TOKENIZER') or 'approx'
+    if tokenizer == ApproxTokenCounter.name:
+        return ApproxTokenCounter()
+    return HFTokenCounter(tokenizer[3:] if tokenizer.startswith('hf:') else tokenizer)
+
+
+def chunk_token_count(chunk, counter, field='answer_markdown'):
+    """
+    知识块某个字段的token数，知识块中预先计算的token_count由同一分词器生成时直接使用
+    """
+    if field == 'answer_markdown' and chunk.get('tokenizer') == counter.name and 'token_count' in chunk:
+        return chunk['token_count']
+    return counter.count(chunk.get(field) or '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统计文本的token数')
+    parser.add_argument('text', nargs='*', help='要统计的文本')
+    parser.add_argument('--file', help='从文件读取文本')
+    parser.add_argument('--tokenizer', help='分词器（默认读取TOKENIZER，未设置时为approx）')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            text = f.read()
+    elif args.text:
+        text = ' '.join(args.text)
+    else:
+        parser.error('请指定要统计的文本或 --file')
+
+    counter = load_token_counter(args.tokenizer)
+    print(f"🔢 {counter.count(text)} tokens（{counter.name}，{len(text)} 个字符）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于内存映射的知识块向量索引
+读取 knowledge/cleaned/ 下清洗得到的知识块，对 content_for_embedding 生成向量，
+以连续的float32（可选int8量化）矩阵写入文件，查询时通过np.memmap直接映射，启动无需解析JSON
+
+索引目录结构：
+    meta.json       维度、数量、存储类型、向量化方式、ANN参数
+    vectors.f32     float32矩阵（或 vectors.i8 + scales.npy）
+    ids.npy         与矩阵行一一对应的chunk_id
+    ivf_centroids.npy / ivf_offsets.npy   IVF模式的聚类中心和每个列表的行范围
+    hnsw.bin        HNSW模式的图索引（需要hnswlib）
+
+用法：
+    python script/vector_index.py build --dtype int8 --ann ivf
+    python script/vector_index.py query "HashMap的扩容机制" -k 5
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from chunk_io import load_unique_chunks
+from text_tokens import tokenize, token_hash
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOURCE_DIR = os.path.join(BASE_DIR, 'knowledge', 'cleaned')
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, 'knowledge', 'index', 'vector')
+
+EMBED_BATCH_SIZE = 256
+# 暴力检索时每次参与矩阵乘法的行数，限制单次查询的临时内存
+SCAN_BLOCK_ROWS = 65536
+
+INDEX_FILES = ('meta.json', 'vectors.f32', 'vectors.i8', 'scales.npy', 'ids.npy',
+               'ivf_centroids.npy', 'ivf_offsets.npy', 'hnsw.bin', 'staging.f32')
+
+
+def load_chunks(source_dir=DEFAULT_SOURCE_DIR):
+    """读取目录下所有带有content_for_embedding的知识块（按chunk_id去重，跳过近似重复的知识块）"""
+    return {
+        chunk_id: chunk for chunk_id, chunk in load_unique_chunks(source_dir, skip_duplicates=True).items()
+        if chunk.get('content_for_embedding')
+    }
+
+
+class HashingEmbedder:
+    """
+    特征哈希向量化：词项（中文bigram + 英文单词）经稳定哈希映射到固定维度，
+    带符号累加次线性词频后做L2归一化。无需模型，适合离线环境和词面相似度检索
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def config(self):
+        return {'type': self.name, 'dim': self.dim}
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            if not counts:
+                continue
+            hashes = np.fromiter((token_hash(token) for token in counts), dtype=np.uint32, count=len(counts))
+            weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs * weights)
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """
+    调用OpenAI兼容的 /embeddings 接口（如vLLM、text-embeddings-inference）生成向量
+    """
+
+    name = 'openai'
+
+    def __init__(self, endpoint, model, dim=None, api_key=None, batch_size=64, timeout=60):
+        self.endpoint = endpoint.rstrip('/')
+        self.model = model
+        self.dim = dim
+        self.api_key = api_key or os.environ.get('EMBEDDING_API_KEY')
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def config(self):
+        # 不保存api_key，查询时从环境变量读取
+        return {'type': self.name, 'endpoint': self.endpoint, 'model': self.model, 'dim': self.dim}
+
+    def embed(self, texts):
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.session.post(
+                f"{self.endpoint}/embeddings",
+                headers=headers,
+                json={'model': self.model, 'input': list(texts[start:start + self.batch_size])},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = sorted(response.json()['data'], key=lambda item: item['index'])
+            vectors.extend(item['embedding'] for item in data)
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+def create_embedder(config):
+    """根据meta.json中保存的配置重建向量化器"""
+    if config['type'] == HashingEmbedder.name:
+        return HashingEmbedder(config['dim'])
+    if config['type'] == OpenAIEmbedder.name:
+        return OpenAIEmbedder(config['endpoint'], config['model'], config.get('dim'))
+    raise ValueError(f"未知的向量化方式: {config['type']}")
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _quantize(vectors):
+    """按行对称量化为int8，返回 (int8矩阵, 每行缩放系数)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _top_k(scores, k):
+    """返回每行得分最高的k个位置（按得分降序）"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _train_ivf(matrix, nlist, iterations=10, sample_size=None, seed=0):
+    """在（采样的）向量上做球面k-means，返回归一化的聚类中心"""
+    rng = np.random.default_rng(seed)
+    count = matrix.shape[0]
+    sample_size = min(count, sample_size or max(nlist * 64, 10000))
+    sample = np.asarray(matrix[np.sort(rng.choice(count, sample_size, replace=False))], dtype=np.float32)
+
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        # 空簇用随机样本重新初始化
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def build_index(chunks, embedder, index_dir=DEFAULT_INDEX_DIR, dtype='float32', ann=None,
+                nlist=None, hnsw_m=16, hnsw_ef_construction=200):
+    """
+    为知识块构建向量索引并写入index_dir
+    chunks为 {chunk_id: 知识块}；向量分批生成后直接写入内存映射文件，不在内存中保留整个矩阵
+    """
+    if dtype not in ('float32', 'int8'):
+        raise ValueError(f"不支持的存储类型: {dtype}")
+    if ann not in (None, 'ivf', 'hnsw'):
+        raise ValueError(f"不支持的ANN模式: {ann}")
+
+    chunk_ids = list(chunks)
+    count = len(chunk_ids)
+    if not count:
+        raise ValueError("没有可用于建立索引的知识块")
+    os.makedirs(index_dir, exist_ok=True)
+    # meta.json最先删除：构建中途失败时目录不会被当作可用的索引
+    for name in INDEX_FILES:
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # 先以float32写入临时矩阵：IVF训练和HNSW建图都需要原始精度的向量
+    staging_path = os.path.join(index_dir, 'staging.f32')
+    staging = None
+    for start in range(0, count, EMBED_BATCH_SIZE):
+        batch_ids = chunk_ids[start:start + EMBED_BATCH_SIZE]
+        vectors = embedder.embed([chunks[chunk_id]['content_for_embedding'] for chunk_id in batch_ids])
+        if staging is None:
+            staging = np.memmap(staging_path, dtype=np.float32, mode='w+', shape=(count, vectors.shape[1]))
+        staging[start:start + len(batch_ids)] = vectors
+    dim = staging.shape[1]
+
+    meta = {
+        'created_at': datetime.now().isoformat(),
+        'count': count,
+        'dim': dim,
+        'dtype': dtype,
+        'embedder': embedder.config(),
+        'ann': ann,
+    }
+
+    # IVF：按所属聚类重排矩阵，使每个倒排列表在文件中是连续的一段
+    order = np.arange(count)
+    if ann == 'ivf':
+        nlist = min(count, nlist or max(1, int(4 * math.sqrt(count))))
+        centroids = _train_ivf(staging, nlist)
+        assignment = np.concatenate([
+            np.argmax(np.asarray(staging[start:start + SCAN_BLOCK_ROWS]) @ centroids.T, axis=1)
+            for start in range(0, count, SCAN_BLOCK_ROWS)
+        ])
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+        np.save(os.path.join(index_dir, 'ivf_centroids.npy'), centroids)
+        np.save(os.path.join(index_dir, 'ivf_offsets.npy'), offsets.astype(np.int64))
+        meta['nlist'] = nlist
+
+    if dtype == 'float32':
+        matrix = np.memmap(os.path.join(index_dir, 'vectors.f32'), dtype=np.float32, mode='w+', shape=(count, dim))
+    else:
+        matrix = np.memmap(os.path.join(index_dir, 'vectors.i8'), dtype=np.int8, mode='w+', shape=(count, dim))
+        scales = np.empty(count, dtype=np.float32)
+    for start in range(0, count, SCAN_BLOCK_ROWS):
+        rows = order[start:start + SCAN_BLOCK_ROWS]
+        vectors = np.asarray(staging[rows])
+        if dtype == 'float32':
+            matrix[start:start + len(rows)] = vectors
+        else:
+            matrix[start:start + len(rows)], scales[start:start + len(rows)] = _quantize(vectors)
+    matrix.flush()
+    if dtype == 'int8':
+        np.save(os.path.join(index_dir, 'scales.npy'), scales)
+
+    if ann == 'hnsw':
+        hnswlib = _import_hnswlib()
+        graph = hnswlib.Index(space='ip', dim=dim)
+        graph.init_index(max_elements=count, M=hnsw_m, ef_construction=hnsw_ef_construction)
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            graph.add_items(np.asarray(staging[start:start + SCAN_BLOCK_ROWS]),
+                            np.arange(start, min(start + SCAN_BLOCK_ROWS, count)))
+        graph.save_index(os.path.join(index_dir, 'hnsw.bin'))
+        meta['hnsw'] = {'M': hnsw_m, 'ef_construction': hnsw_ef_construction}
+
+    del staging
+    os.remove(staging_path)
+
+    ordered_ids = [chunk_ids[row] for row in order]
+    np.save(os.path.join(index_dir, 'ids.npy'), np.array([chunk_id.encode('utf-8') for chunk_id in ordered_ids]))
+    # meta.json最后写入，作为索引完整可用的标志
+    with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+        return hnswlib
+    except ImportError:
+        raise ImportError("HNSW模式需要安装hnswlib: pip install hnswlib")
+
+
+class VectorIndex:
+    """
+    只读的向量索引，矩阵和ID均以内存映射方式打开
+    search接收一批查询向量，返回每个查询的 [(chunk_id, 相似度), ...]
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        meta_path = os.path.join(index_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"向量索引不存在，请先运行 vector_index.py build: {index_dir}")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        count, dim = self.meta['count'], self.meta['dim']
+        if self.meta['dtype'] == 'int8':
+            self.matrix = np.memmap(os.path.join(index_dir, 'vectors.i8'), dtype=np.int8, mode='r', shape=(count, dim))
+            self.scales = np.load(os.path.join(index_dir, 'scales.npy'), mmap_mode='r')
+        else:
+            self.matrix = np.memmap(os.path.join(index_dir, 'vectors.f32'), dtype=np.float32, mode='r', shape=(count, dim))
+            self.scales = None
+        self.ids = np.load(os.path.join(index_dir, 'ids.npy'), mmap_mode='r')
+
+        self.ann = self.meta.get('ann')
+        if self.ann == 'ivf':
+            self.centroids = np.load(os.path.join(index_dir, 'ivf_centroids.npy'))
+            self.offsets = np.load(os.path.join(index_dir, 'ivf_offsets.npy'))
+        self._graph = None
+        self._embedder = None
+
+    def __len__(self):
+        return self.meta['count']
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = create_embedder(self.meta['embedder'])
+        return self._embedder
+
+    def _score_rows(self, queries, start, stop):
+        scores = queries @ np.asarray(self.matrix[start:stop], dtype=np.float32).T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def _search_exact(self, queries, k):
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self), SCAN_BLOCK_ROWS):
+            stop = min(start + SCAN_BLOCK_ROWS, len(self))
+            scores = np.concatenate([best_scores, self._score_rows(queries, start, stop)], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            top = _top_k(scores, k)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+            best_scores = np.take_along_axis(scores, top, axis=1)
+        return best_rows, best_scores
+
+    def _search_ivf(self, queries, k, nprobe):
+        probes = _top_k(queries @ self.centroids.T, nprobe)
+        results_rows, results_scores = [], []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if not len(rows):
+                results_rows.append(np.empty(0, dtype=np.int64))
+                results_scores.append(np.empty(0, dtype=np.float32))
+                continue
+            # 各列表在矩阵中是连续的，逐段读取后拼接
+            scores = np.concatenate([
+                self._score_rows(query[None, :], self.offsets[l], self.offsets[l + 1])[0] for l in lists
+            ])
+            top = _top_k(scores[None, :], k)[0]
+            results_rows.append(rows[top])
+            results_scores.append(scores[top])
+        return results_rows, results_scores
+
+    def _search_hnsw(self, queries, k, ef):
+        if self._graph is None:
+            hnswlib = _import_hnswlib()
+            self._graph = hnswlib.Index(space='ip', dim=self.meta['dim'])
+            self._graph.load_index(os.path.join(self.index_dir, 'hnsw.bin'), max_elements=len(self))
+        self._graph.set_ef(max(ef, k))
+        labels, distances = self._graph.knn_query(queries, k=min(k, len(self)))
+        # hnswlib的内积距离为 1 - 内积
+        return labels.astype(np.int64), 1.0 - distances
+
+    def search(self, queries, k=10, nprobe=8, ef=64, exact=False):
+        """
+        批量检索，queries为 (n, dim) 的查询向量
+        exact=True时忽略ANN结构做暴力检索（可用于评估ANN召回率）
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if exact or not self.ann:
+            rows, scores = self._search_exact(queries, k)
+        elif self.ann == 'ivf':
+            rows, scores = self._search_ivf(queries, k, nprobe)
+        else:
+            rows, scores = self._search_hnsw(queries, k, ef)
+        return [
+            [(self.ids[row].decode('utf-8'), float(score)) for row, score in zip(query_rows, query_scores)]
+            for query_rows, query_scores in zip(rows, scores)
+        ]
+
+    def query(self, texts, k=10, **kwargs):
+        """对一批查询文本检索最相似的知识块"""
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.search(self.embedder.embed(list(texts)), k=k, **kwargs)
+
+
+def create_embedder_from_args(args):
+    if args.embedder == 'openai':
+        if not args.embedding_endpoint or not args.embedding_model:
+            raise SystemExit("❌ --embedder openai 需要同时指定 --embedding-endpoint 和 --embedding-model")
+        return OpenAIEmbedder(args.embedding_endpoint, args.embedding_model)
+    return HashingEmbedder(args.dim)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='知识块向量索引')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='索引目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='从清洗后的知识块构建索引')
+    build_parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help='知识块目录（递归读取）')
+    build_parser.add_argument('--dtype', choices=['float32', 'int8'], default='float32', help='向量存储类型')
+    build_parser.add_argument('--ann', choices=['ivf', 'hnsw'], help='近似最近邻结构（默认暴力检索）')
+    build_parser.add_argument('--nlist', type=int, help='IVF聚类数（默认4*sqrt(N)）')
+    build_parser.add_argument('--embedder', choices=['hashing', 'openai'], default='hashing', help='向量化方式')
+    build_parser.add_argument('--dim', type=int, default=512, help='哈希向量维度')
+    build_parser.add_argument('--embedding-endpoint', help='OpenAI兼容接口地址，如 http://localhost:8000/v1')
+    build_parser.add_argument('--embedding-model', help='向量模型名称')
+
+    query_parser = subparsers.add_parser('query', help='检索与查询文本最相似的知识块')
+    query_parser.add_argument('text', nargs='+', help='查询文本（可以有多个，批量检索）')
+    query_parser.add_argument('-k', '--top-k', type=int, default=5)
+    query_parser.add_argument('--nprobe', type=int, default=8, help='IVF检索的列表数')
+    query_parser.add_argument('--ef', type=int, default=64, help='HNSW检索的候选集大小')
+    query_parser.add_argument('--exact', action='store_true', help='忽略ANN结构做精确检索')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        chunks = load_chunks(args.source)
+        print(f"📚 读取到 {len(chunks)} 个知识块")
+        meta = build_index(chunks, create_embedder_from_args(args), args.index_dir,
+                           dtype=args.dtype, ann=args.ann, nlist=args.nlist)
+        print(f"✅ 索引构建完成：{meta['count']} 条 × {meta['dim']} 维（{meta['dtype']}"
+              f"{', ' + meta['ann'] if meta['ann'] else ''}），耗时 {time.perf_counter() - start:.2f}秒")
+        print(f"📁 保存到: {args.index_dir}")
+        return 0
+
+    start = time.perf_counter()
+    index = VectorIndex(args.index_dir)
+    results = index.query(args.text, k=args.top_k, nprobe=args.nprobe, ef=args.ef, exact=args.exact)
+    elapsed = (time.perf_counter() - start) * 1000
+    for text, hits in zip(args.text, results):
+        print(f"🔍 {text}")
+        for rank, (chunk_id, score) in enumerate(hits, 1):
+            print(f"  {rank}. {score:.4f}  {chunk_id}")
+    print(f"⏱️  打开索引并检索耗时 {elapsed:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取结果的WARC存档
+爬虫把每次抓取的请求和响应（状态行、响应头、正文）以WARC 1.1记录追加写入滚动的 .warc.gz 文件，
+每条记录单独压缩为一个gzip成员，可以从记录的偏移量直接解压读取
+同时维护 index.jsonl（URL -> 文件、偏移量、长度），清洗规则修改后可直接从存档重新清洗，不需要重新抓取
+
+目录结构（默认 knowledge/raw/warc/）：
+    crawl-20260101120000-00000.warc.gz
+    crawl-20260101120000-00001.warc.gz
+    index.jsonl
+
+用法：
+    python script/web_crawler.py --site https://javaguide.cn/java/ --warc --formats ''
+    python script/data_processor.py --replay                          # 从存档重新清洗
+    python script/warc_archive.py stats
+    python script/warc_archive.py list --path-prefix /java/
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+
+DEFAULT_WARC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'knowledge', 'raw', 'warc')
+INDEX_FILENAME = 'index.jsonl'
+
+# 单个WARC文件超过此大小后滚动到新文件（压缩后字节数）
+DEFAULT_MAX_FILE_BYTES = 1024 ** 3
+
+# requests已解压正文并按分块重组，这些响应头与存档中的正文不再对应
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def _digest(data):
+    return 'sha1:' + base64.b32encode(hashlib.sha1(data).digest()).decode('ascii')
+
+
+def _warc_date():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _record(warc_type, block, url=None, content_type=None, extra_headers=()):
+    """组装一条WARC记录并压缩为一个独立的gzip成员，返回 (记录ID, 压缩后的字节)"""
+    record_id = f"<urn:uuid:{uuid.uuid4()}>"
+    headers = [
+        ('WARC-Type', warc_type),
+        ('WARC-Record-ID', record_id),
+        ('WARC-Date', _warc_date()),
+    ]
+    if url:
+        headers.append(('WARC-Target-URI', url))
+    headers.extend(extra_headers)
+    if content_type:
+        headers.append(('Content-Type', content_type))
+    headers.append(('WARC-Block-Digest', _digest(block)))
+    headers.append(('Content-Length', str(len(block))))
+    head = 'WARC/1.1\r\n' + ''.join(f"{name}: {value}\r\n" for name, value in headers) + '\r\n'
+    return record_id, gzip.compress(head.encode('utf-8') + block + b'\r\n\r\n', compresslevel=6)
+
+
+def _http_request_block(request):
+    """requests.PreparedRequest -> HTTP请求报文"""
+    lines = [f"{request.method} {request.path_url} HTTP/1.1"]
+    if 'Host' not in request.headers:
+        # Host头由urllib3在发送时添加，PreparedRequest中没有
+        lines.append(f"Host: {urlparse(request.url).netloc}")
+    lines.extend(f"{name}: {value}" for name, value in request.headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+
+def _http_response_block(response):
+    """requests.Response -> HTTP响应报文（正文为解压后的内容，Content-Length按实际长度重写）"""
+    body = response.content or b''
+    lines = [f"HTTP/1.1 {response.status_code} {response.reason or ''}".rstrip()]
+    lines.extend(f"{name}: {value}" for name, value in response.headers.items()
+                 if name.lower() not in DROPPED_HEADERS)
+    lines.append(f"Content-Length: {len(body)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace') + body, body
+
+
+class WarcWriter:
+    """
+    追加写入WARC记录，多个抓取线程可同时调用write_fetch
+    记录在调用线程中压缩，只有写文件和索引时持有锁
+    """
+
+    def __init__(self, directory=DEFAULT_WARC_DIR, prefix='crawl', max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+        self.directory = str(directory)
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._session = datetime.now().strftime('%Y%m%d%H%M%S')
+        self._serial = 0
+        self._file = None
+        self._filename = None
+        self._lock = threading.Lock()
+        self._index = open(os.path.join(self.directory, INDEX_FILENAME), 'a', encoding='utf-8')
+        # 已存档的URL：页面未变化(304)时之前的记录仍然有效，不再重复写入
+        self.archived = {entry['url'] for entry in read_index(self.directory)}
+        self.records = 0
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        while True:
+            self._filename = f"{self.prefix}-{self._session}-{self._serial:05d}.warc.gz"
+            self._serial += 1
+            path = os.path.join(self.directory, self._filename)
+            if not os.path.exists(path):
+                break
+        self._file = open(path, 'ab')
+        _, info = _record('warcinfo', (
+            "software: JavaAgent web_crawler\r\n"
+            "format: WARC File Format 1.1\r\n"
+            f"filename: {self._filename}\r\n"
+        ).encode('utf-8'), content_type='application/warc-fields')
+        self._file.write(info)
+
+    def _append(self, records, entry):
+        """按顺序写入一组记录，entry为最后一条记录（响应）的索引项"""
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_file_bytes:
+                self._open_next()
+            for data in records[:-1]:
+                self._file.write(data)
+            offset = self._file.tell()
+            self._file.write(records[-1])
+            self._file.flush()
+            entry.update({'file': self._filename, 'offset': offset, 'length': len(records[-1])})
+            self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._index.flush()
+            self.archived.add(entry['url'])
+            self.records += 1
+
+    def write_fetch(self, fetched):
+        """
+        存档一次抓取（http_cache.FetchResult），返回是否写入了新记录
+        页面未变化(304)且已有存档时跳过；尚无存档时把本地缓存的正文写为resource记录
+        """
+        url = fetched.url
+        timestamp = _warc_date()
+        if fetched.not_modified:
+            if url in self.archived:
+                return False
+            body = fetched.text.encode('utf-8')
+            _, record = _record('resource', body, url, 'text/html; charset=utf-8',
+                                [('WARC-Payload-Digest', _digest(body))])
+            self._append([record], {'url': url, 'type': 'resource', 'status': 200, 'timestamp': timestamp,
+                                    'encoding': 'utf-8', 'digest': _digest(body)})
+            return True
+
+        response = fetched.response
+        if response is None:
+            return False
+        block, body = _http_response_block(response)
+        response_id, response_record = _record('response', block, url, 'application/http; msgtype=response',
+                                               [('WARC-Payload-Digest', _digest(body))])
+        records = [response_record]
+        if response.request is not None:
+            _, request_record = _record('request', _http_request_block(response.request), url,
+                                        'application/http; msgtype=request',
+                                        [('WARC-Concurrent-To', response_id)])
+            records.insert(0, request_record)
+        self._append(records, {'url': url, 'type': 'response', 'status': response.status_code,
+                               'timestamp': timestamp, 'encoding': response.encoding, 'digest': _digest(body)})
+        return True
+
+
+def read_index(directory=DEFAULT_WARC_DIR):
+    """逐条读取索引，中断时写了一半的最后一行会被忽略"""
+    path = os.path.join(directory, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def latest_entries(directory=DEFAULT_WARC_DIR, path_prefixes=None):
+    """
+    每个URL最新的一条存档记录，按 (文件, 偏移量) 排序，重放时顺序读取磁盘
+    path_prefixes不为空时只返回路径以其中之一开头的URL（与全站爬取的 --path-prefix 一致）
+    """
+    latest = {}
+    for entry in read_index(directory):
+        if path_prefixes and not urlparse(entry['url']).path.startswith(tuple(path_prefixes)):
+            continue
+        entry['directory'] = str(directory)
+        latest[entry['url']] = entry
+    return sorted(latest.values(), key=lambda entry: (entry['file'], entry['offset']))
+
+
+def read_record(path, offset, length):
+    """读取并解压一条记录，返回 (WARC头字典, 内容块字节)"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))
+    head, _, block = data.partition(b'\r\n\r\n')
+    headers = {}
+    for line in head.decode('utf-8').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    return headers, block[:int(headers.get('Content-Length', len(block)))]
+
+
+def read_html(entry):
+    """读取索引项对应的网页正文（str）"""
+    headers, block = read_record(os.path.join(entry['directory'], entry['file']), entry['offset'], entry['length'])
+    encoding = entry.get('encoding')
+    if headers.get('WARC-Type') == 'response':
+        http_head, _, block = block.partition(b'\r\n\r\n')
+        if not encoding:
+            match = CHARSET_PATTERN.search(http_head.decode('latin-1'))
+            encoding = match.group(1) if match else None
+    return block.decode(encoding or 'utf-8', errors='replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WARC抓取存档')
+    parser.add_argument('--dir', default=DEFAULT_WARC_DIR, help='存档目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='存档统计')
+    list_parser = subparsers.add_parser('list', help='列出已存档的URL（每个URL最新的一条）')
+    list_parser.add_argument('--path-prefix', action='append', help='只列出路径以此开头的URL（可多次指定）')
+    show_parser = subparsers.add_parser('show', help='输出某个URL最新存档的正文')
+    show_parser.add_argument('url')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        records = list(read_index(args.dir))
+        files = sorted({entry['file'] for entry in records})
+        size = sum(os.path.getsize(os.path.join(args.dir, name)) for name in files
+                   if os.path.exists(os.path.join(args.dir, name)))
+        print(f"🗃️ WARC存档: {args.dir}")
+        print(f"   记录: {len(records)}，URL: {len({entry['url'] for entry in records})}，"
+              f"文件: {len(files)}，{size / 1024 / 1024:.1f}MB")
+    elif args.command == 'list':
+        for entry in latest_entries(args.dir, args.path_prefix):
+            print(f"{entry['timestamp']}  {entry['status']}  {entry['url']}")
+    else:
+        entries = [entry for entry in latest_entries(args.dir) if entry['url'] == args.url]
+        if not entries:
+            print(f"❌ 存档中没有: {args.url}")
+            return 1
+        print(read_html(entries[0]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,24 +7,61 @@
 """
 
 import os
-import sys
+import time
+import argparse
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
-import html2text
 import re
 from datetime import datetime
 
+from frontier import CrawlFrontier, extract_links, parse_sitemap
+from http_cache import HttpCache, FetchResult
+from html_render import parse_html, to_markdown, to_text
+from warc_archive import DEFAULT_WARC_DIR, WarcWriter
+from metrics import metrics, add_arguments as add_metrics_arguments, configure_from_args, finish_run
+
+
+# 支持的输出格式
+OUTPUT_FORMATS = ('html', 'markdown', 'text')
+
 
 class WebCrawler:
-    def __init__(self):
+    def __init__(self, concurrency=8, per_host_limit=4, use_cache=True, skip_unchanged=False,
+                 formats=OUTPUT_FORMATS, output_dir=None, warc_dir=None):
+        unknown = set(formats) - set(OUTPUT_FORMATS)
+        if unknown:
+            raise ValueError(f"不支持的输出格式: {', '.join(sorted(unknown))}")
+        # 只生成需要的格式，未请求的格式不做任何转换
+        self.formats = tuple(formats)
+        
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        # 条件请求缓存：页面未变化时服务器返回304，正文从本地读取
+        self.cache = HttpCache() if use_cache else None
+        # 页面未变化时跳过格式转换和文件写入
+        self.skip_unchanged = skip_unchanged
+        # WARC存档：保存原始请求和响应，之后可离线重新清洗（data_processor.py --replay）
+        self.archive = WarcWriter(warc_dir) if warc_dir else None
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # 连接池大小与并发数保持一致，避免并发抓取时反复建立连接
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 每个主机一个信号量，限制对同一站点的并发连接数
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
         
         # 创建输出目录
-        self.base_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge-pre')
+        self.base_dir = output_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'knowledge-pre')
         self.html_dir = os.path.join(self.base_dir, 'html')
         self.md_dir = os.path.join(self.base_dir, 'markdown')
         self.txt_dir = os.path.join(self.base_dir, 'text')
@@ -33,10 +70,11 @@ class WebCrawler:
     
     def _create_directories(self):
         """创建必要的目录"""
-        for directory in [self.html_dir, self.md_dir, self.txt_dir]:
+        format_dirs = {'html': self.html_dir, 'markdown': self.md_dir, 'text': self.txt_dir}
+        for directory in [format_dirs[fmt] for fmt in self.formats]:
             if not os.path.exists(directory):
                 os.makedirs(directory, exist_ok=True)
-                print(f"创建目录: {directory}")
+                metrics.debug('mkdir', f"创建目录: {directory}", path=directory)
     
     def _sanitize_filename(self, url):
         """生成安全的文件名"""
@@ -60,158 +98,458 @@ class WebCrawler:
         
         return filename
     
-    def _fetch_content(self, url):
-        """获取网页内容"""
+    def _normalize_url(self, url):
+        """补全URL协议头"""
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return url
+    
+    def _host_semaphore(self, url):
+        """获取URL所属主机的并发信号量"""
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+    
+    def _fetch(self, url):
+        """获取网页，返回FetchResult，失败时返回None"""
         try:
-            print(f"正在获取网页内容: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding or 'utf-8'
-            return response.text
+            metrics.debug('fetch_start', f"正在获取网页内容: {url}", url=url)
+            with metrics.stage('fetch', url) as span:
+                if self.cache:
+                    fetched = self.cache.fetch(self.session, url, timeout=30)
+                else:
+                    response = self.session.get(url, timeout=30)
+                    response.raise_for_status()
+                    response.encoding = response.apparent_encoding or 'utf-8'
+                    fetched = FetchResult(url=url, text=response.text, status_code=response.status_code,
+                                          bytes_received=len(response.content), response=response)
+                span.update(status=fetched.status_code, bytes=fetched.bytes_received)
+            metrics.count('pages_fetched')
+            metrics.count('bytes_fetched', fetched.bytes_received)
+            if fetched.not_modified:
+                metrics.count('pages_not_modified')
+                metrics.debug('not_modified', f"页面未变化(304)，使用本地缓存: {url}", url=url)
+            self._archive(fetched)
+            return fetched
         except requests.RequestException as e:
-            print(f"获取网页失败: {e}")
+            metrics.count('fetch_errors')
+            metrics.warning('fetch_failed', f"获取网页失败: {e}", url=url, error=str(e))
             return None
     
-    def _save_html(self, content, filename):
-        """保存HTML格式文件"""
-        html_path = os.path.join(self.html_dir, f"{filename}.html")
+    def _archive(self, fetched):
+        """写入WARC存档（未启用时忽略）"""
+        if self.archive and fetched.text:
+            with metrics.stage('archive', fetched.url):
+                self.archive.write_fetch(fetched)
+    
+    def close(self):
+        """关闭WARC存档文件"""
+        if self.archive:
+            self.archive.close()
+    
+    def _fetch_content(self, url):
+        """获取网页内容"""
+        fetched = self._fetch(url)
+        return fetched.text if fetched else None
+    
+    def _write_file(self, path, content, label, url=None):
+        """写入一个输出文件，返回文件路径，失败时返回None"""
         try:
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f"HTML文件已保存: {html_path}")
-            return html_path
+            with metrics.stage('save', url, path=path) as span:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                    span['bytes'] = f.tell()
+            metrics.count('files_written')
+            metrics.count('bytes_written', span['bytes'])
+            metrics.debug('file_saved', f"{label}文件已保存: {path}", url=url, path=path)
+            return path
         except Exception as e:
-            print(f"保存HTML文件失败: {e}")
+            metrics.error('save_failed', f"保存{label}文件失败: {e}", url=url, path=path, error=str(e))
             return None
     
-    def _convert_to_markdown(self, content):
-        """将HTML转换为Markdown格式"""
+    def _save_html(self, content, filename, url=None):
+        """保存HTML格式文件"""
+        return self._write_file(os.path.join(self.html_dir, f"{filename}.html"), content, 'HTML', url)
+    
+    def _parse(self, content, url=None):
+        """
+        使用lxml解析HTML，并移除脚本和样式元素
+        同一页面只解析一次，Markdown、纯文本和链接提取共用这棵文档树
+        """
+        with metrics.stage('parse', url):
+            return parse_html(content)
+    
+    def _convert_to_markdown(self, document, url=None):
+        """将已解析的文档转换为Markdown格式"""
+        if document is None:
+            return None
         try:
-            # 配置html2text
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            h.ignore_images = False
-            h.ignore_tables = False
-            h.body_width = 0  # 不限制行宽
-            h.unicode_snob = True
-            h.escape_snob = True
-            
-            markdown_content = h.handle(content)
-            return markdown_content
+            with metrics.stage('markdown', url):
+                return to_markdown(document)
         except Exception as e:
-            print(f"转换为Markdown失败: {e}")
+            metrics.warning('convert_failed', f"转换为Markdown失败: {e}", url=url, error=str(e))
             return None
     
-    def _save_markdown(self, content, filename):
+    def _save_markdown(self, document, filename, url=None):
         """保存Markdown格式文件"""
-        markdown_content = self._convert_to_markdown(content)
+        markdown_content = self._convert_to_markdown(document, url)
         if not markdown_content:
             return None
-            
-        md_path = os.path.join(self.md_dir, f"{filename}.md")
-        try:
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            print(f"Markdown文件已保存: {md_path}")
-            return md_path
-        except Exception as e:
-            print(f"保存Markdown文件失败: {e}")
-            return None
+        return self._write_file(os.path.join(self.md_dir, f"{filename}.md"), markdown_content, 'Markdown', url)
     
-    def _extract_text(self, content):
-        """提取纯文本内容"""
+    def _extract_text(self, document, url=None):
+        """从已解析的文档中提取纯文本内容"""
+        if document is None:
+            return None
         try:
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # 移除脚本和样式元素
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # 获取文本
-            text = soup.get_text()
-            
-            # 清理文本
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            return text
+            with metrics.stage('text', url):
+                return to_text(document)
         except Exception as e:
-            print(f"提取文本失败: {e}")
+            metrics.warning('convert_failed', f"提取文本失败: {e}", url=url, error=str(e))
             return None
     
-    def _save_text(self, content, filename):
+    def _save_text(self, document, filename, url=None):
         """保存纯文本文件"""
-        text_content = self._extract_text(content)
+        text_content = self._extract_text(document, url)
         if not text_content:
             return None
-            
-        txt_path = os.path.join(self.txt_dir, f"{filename}.txt")
-        try:
-            with open(txt_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
-            print(f"文本文件已保存: {txt_path}")
-            return txt_path
-        except Exception as e:
-            print(f"保存文本文件失败: {e}")
-            return None
+        return self._write_file(os.path.join(self.txt_dir, f"{filename}.txt"), text_content, '文本', url)
     
-    def crawl(self, url):
-        """爬取指定URL的内容"""
-        print(f"开始爬取: {url}")
-        print("-" * 50)
-        
-        # 验证URL格式
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        
-        # 获取网页内容
-        content = self._fetch_content(url)
-        if not content:
-            print("无法获取网页内容，爬取失败")
-            return False
-        
+    def _needs_document(self):
+        """请求的格式中是否有需要解析HTML的"""
+        return 'markdown' in self.formats or 'text' in self.formats
+    
+    def _save_outputs(self, url, content, document=None):
+        """
+        按self.formats保存文件，返回生成的文件路径列表
+        document为已解析的文档树，未提供且需要时在此解析
+        """
         # 生成文件名
         filename = self._sanitize_filename(url)
-        print(f"生成文件名: {filename}")
+        metrics.debug('filename', f"生成文件名: {filename}", url=url, filename=filename)
         
-        # 保存三种格式的文件
         results = []
         
         # 保存HTML
-        html_result = self._save_html(content, filename)
-        if html_result:
-            results.append(html_result)
+        if 'html' in self.formats:
+            html_result = self._save_html(content, filename, url)
+            if html_result:
+                results.append(html_result)
+        
+        if document is None and self._needs_document():
+            document = self._parse(content, url)
         
         # 保存Markdown
-        md_result = self._save_markdown(content, filename)
-        if md_result:
-            results.append(md_result)
+        if 'markdown' in self.formats:
+            md_result = self._save_markdown(document, filename, url)
+            if md_result:
+                results.append(md_result)
         
         # 保存纯文本
-        txt_result = self._save_text(content, filename)
-        if txt_result:
-            results.append(txt_result)
+        if 'text' in self.formats:
+            txt_result = self._save_text(document, filename, url)
+            if txt_result:
+                results.append(txt_result)
         
-        print("-" * 50)
+        return results
+    
+    def crawl(self, url):
+        """爬取指定URL的内容"""
+        metrics.info('crawl_start', f"开始爬取: {url}", url=url)
+        metrics.divider()
+        
+        # 验证URL格式
+        url = self._normalize_url(url)
+        
+        # 获取网页内容
+        fetched = self._fetch(url)
+        if not fetched or not fetched.text:
+            metrics.error('crawl_failed', "无法获取网页内容，爬取失败", url=url)
+            return False
+        content = fetched.text
+        
+        if fetched.not_modified and self.skip_unchanged:
+            metrics.info('crawl_unchanged', "页面自上次爬取以来未变化，跳过生成文件", url=url)
+            return True
+        
+        # 按请求的格式保存文件
+        results = self._save_outputs(url, content)
+        
+        metrics.divider()
         if results:
-            print(f"爬取完成！共生成 {len(results)} 个文件:")
-            for result in results:
-                print(f"  - {result}")
+            metrics.info('crawl_done', f"爬取完成！共生成 {len(results)} 个文件:\n"
+                         + "\n".join(f"  - {result}" for result in results), url=url, files=results)
+            return True
+        elif not self.formats and self.archive:
+            metrics.info('crawl_done', f"爬取完成！已写入WARC存档: {self.archive.directory}",
+                         url=url, archive=self.archive.directory)
             return True
         else:
-            print("爬取失败，未能生成任何文件")
+            metrics.error('crawl_failed', "爬取失败，未能生成任何文件", url=url)
             return False
+    
+    def _fetch_timed(self, url):
+        """在工作线程中获取网页内容，受主机并发数限制，并记录耗时"""
+        with self._host_semaphore(url):
+            start = time.perf_counter()
+            fetched = self._fetch(url)
+            fetch_time = time.perf_counter() - start
+        return fetched, fetch_time
+    
+    def _handle_fetched(self, url, future, submitted_at, save_outputs=True, on_page=None,
+                        want_document=False):
+        """
+        处理一个已完成的抓取任务：保存文件、回调on_page，并汇总耗时
+        want_document=True时返回解析好的文档树（供提取链接），与文件输出共用同一次解析
+        返回 (结果字典, 网页内容, 文档树或None)
+        """
+        result = {
+            'url': url,
+            'success': False,
+            'files': [],
+            'error': None,
+            'unchanged': False,
+            'bytes_received': 0,
+            'fetch_time': 0.0,
+            'process_time': 0.0,
+            'total_time': 0.0,
+        }
+        content = None
+        document = None
+        
+        try:
+            fetched, result['fetch_time'] = future.result()
+            content = fetched.text if fetched else None
+            if content:
+                result['unchanged'] = fetched.not_modified
+                result['bytes_received'] = fetched.bytes_received
+                process_start = time.perf_counter()
+                if want_document or (save_outputs and self._needs_document()):
+                    document = self._parse(content, url)
+                if fetched.not_modified and self.skip_unchanged:
+                    # 页面未变化：不再转换和回调，但仍返回内容供提取链接
+                    result['success'] = True
+                elif save_outputs:
+                    result['files'] = self._save_outputs(url, content, document)
+                    # 只写WARC存档（不生成任何格式的文件）时抓取成功即可
+                    result['success'] = bool(result['files']) or not self.formats
+                    if not result['success']:
+                        result['error'] = '未能生成任何文件'
+                else:
+                    result['success'] = True
+                if on_page and not (fetched.not_modified and self.skip_unchanged):
+                    on_page(url, content)
+                result['process_time'] = time.perf_counter() - process_start
+            else:
+                result['error'] = '无法获取网页内容'
+        except Exception as e:
+            result['success'] = False
+            result['error'] = str(e)
+        
+        result['total_time'] = time.perf_counter() - submitted_at
+        return result, content, document
+    
+    def _print_summary(self, results, elapsed):
+        """打印批量爬取的结果汇总"""
+        succeeded = sum(1 for result in results if result['success'])
+        unchanged = sum(1 for result in results if result['unchanged'])
+        downloaded = sum(result['bytes_received'] for result in results)
+        metrics.divider()
+        metrics.info('batch_done', f"批量爬取完成！成功 {succeeded}/{len(results)}，未变化 {unchanged}，"
+                     f"下载 {downloaded / 1024:.1f}KB，总耗时 {elapsed:.2f}秒",
+                     pages=len(results), succeeded=succeeded, unchanged=unchanged,
+                     bytes_received=downloaded, elapsed_s=round(elapsed, 3))
+        for result in results:
+            status = "♻️" if result['unchanged'] else ("✅" if result['success'] else "❌")
+            metrics.info('page_result', f"  {status} {result['url']} "
+                         f"(下载 {result['fetch_time']:.2f}s, 转换 {result['process_time']:.2f}s)"
+                         + (f" - {result['error']}" if result['error'] else ""),
+                         url=result['url'], success=result['success'], unchanged=result['unchanged'],
+                         fetch_s=round(result['fetch_time'], 3), process_s=round(result['process_time'], 3),
+                         error=result['error'])
+    
+    def crawl_many(self, urls, concurrency=None):
+        """
+        并发爬取多个URL
+        
+        网络请求在有界线程池中执行（同一主机的并发连接数受per_host_limit限制），
+        格式转换和文件写入在调用线程中按抓取完成的顺序进行，
+        因此转换当前页面时其余页面仍在下载。
+        
+        返回与输入顺序一致的结果列表，每项包含url、success、files、error
+        以及fetch_time/process_time/total_time（秒）。
+        """
+        concurrency = concurrency or self.concurrency
+        urls = [self._normalize_url(url) for url in urls]
+        results = [None] * len(urls)
+        
+        metrics.info('batch_start', f"开始批量爬取 {len(urls)} 个网址，并发数: {concurrency}",
+                     urls=len(urls), concurrency=concurrency)
+        metrics.divider()
+        batch_start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(self._fetch_timed, url): (index, url, time.perf_counter())
+                for index, url in enumerate(urls)
+            }
+            
+            for future in as_completed(futures):
+                index, url, submitted_at = futures[future]
+                results[index], _, _ = self._handle_fetched(url, future, submitted_at)
+        
+        self._print_summary(results, time.perf_counter() - batch_start)
+        return results
+    
+    def _fetch_sitemap_urls(self, sitemap_url, max_sitemaps=50):
+        """读取sitemap.xml（支持sitemapindex嵌套），返回其中的页面URL"""
+        pending, page_urls, visited = [sitemap_url], [], set()
+        
+        while pending and len(visited) < max_sitemaps:
+            current = pending.pop(0)
+            if current in visited:
+                continue
+            visited.add(current)
+            
+            try:
+                metrics.info('sitemap', f"正在读取sitemap: {current}", url=current)
+                response = self.session.get(current, timeout=30)
+                response.raise_for_status()
+                urls, children = parse_sitemap(response.content)
+            except (requests.RequestException, ET.ParseError) as e:
+                metrics.warning('sitemap_failed', f"读取sitemap失败: {e}", url=current, error=str(e))
+                continue
+            
+            page_urls.extend(urls)
+            pending.extend(children)
+        
+        return page_urls
+    
+    def crawl_site(self, seeds=(), sitemap=None, max_depth=3, max_pages=None,
+                   allowed_domains=None, path_prefixes=None, concurrency=None,
+                   save_outputs=True, on_page=None):
+        """
+        从种子URL或sitemap出发进行全站爬取
+        
+        页面中的链接经规范化（去掉#锚点、末尾斜杠、排序查询参数）后加入队列，
+        通过布隆过滤器去重，并受抓取深度、域名和路径前缀限制。
+        save_outputs=False时不写文件，只把 (url, 网页内容) 交给on_page回调处理。
+        
+        返回按抓取完成顺序排列的结果列表，格式同crawl_many，另含depth字段。
+        """
+        concurrency = concurrency or self.concurrency
+        seeds = [self._normalize_url(seed) for seed in seeds]
+        if sitemap:
+            seeds.extend(self._fetch_sitemap_urls(self._normalize_url(sitemap)))
+        
+        frontier = CrawlFrontier(
+            seeds, max_depth=max_depth, max_pages=max_pages,
+            allowed_domains=allowed_domains, path_prefixes=path_prefixes
+        )
+        results = []
+        
+        metrics.info('site_start', f"开始全站爬取，种子数: {len(seeds)}，最大深度: {max_depth}，并发数: {concurrency}",
+                     seeds=len(seeds), max_depth=max_depth, concurrency=concurrency)
+        metrics.divider()
+        batch_start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = {}
+            
+            while True:
+                # 保持线程池满载
+                while len(in_flight) < concurrency:
+                    item = frontier.pop()
+                    if item is None:
+                        break
+                    url, depth = item
+                    future = executor.submit(self._fetch_timed, url)
+                    in_flight[future] = (url, depth, time.perf_counter())
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth, submitted_at = in_flight.pop(future)
+                    result, content, document = self._handle_fetched(
+                        url, future, submitted_at, save_outputs=save_outputs, on_page=on_page,
+                        want_document=depth < max_depth
+                    )
+                    result['depth'] = depth
+                    results.append(result)
+                    
+                    if document is not None:
+                        added = frontier.add_links(extract_links(document, url), depth)
+                        if added:
+                            metrics.debug('links_found', f"从 {url} 发现 {added} 个新链接，待抓取: {len(frontier)}",
+                                          url=url, added=added, pending=len(frontier))
+        
+        self._print_summary(results, time.perf_counter() - batch_start)
+        metrics.info('site_done', f"已记录URL数: {len(frontier.seen)}", seen=len(frontier.seen))
+        return results
 
 
 def main():
     """主函数"""
-    crawler = WebCrawler()
+    parser = argparse.ArgumentParser(description='网页爬虫工具')
+    parser.add_argument('urls', nargs='*', help='要爬取的网址（可传入多个）')
+    parser.add_argument('--url-file', '-f',
+                       help='包含网址列表的文件（每行一个）')
+    parser.add_argument('--concurrency', '-c', type=int, default=8,
+                       help='批量爬取时的并发数（默认8）')
+    parser.add_argument('--per-host', type=int, default=4,
+                       help='同一主机的最大并发连接数（默认4）')
+    parser.add_argument('--formats', default=','.join(OUTPUT_FORMATS),
+                       help="输出格式，逗号分隔，可选 html,markdown,text（默认全部）；配合--warc可传入''只写存档")
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用条件请求缓存，总是完整下载页面')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                       help='页面未变化(304)时跳过生成文件')
+    parser.add_argument('--site', action='store_true',
+                       help='全站爬取模式：以输入网址为种子，沿页面链接继续抓取')
+    parser.add_argument('--sitemap',
+                       help='全站爬取时使用的sitemap.xml地址')
+    parser.add_argument('--max-depth', type=int, default=3,
+                       help='全站爬取的最大链接深度（默认3）')
+    parser.add_argument('--max-pages', type=int,
+                       help='全站爬取的最大页面数')
+    parser.add_argument('--domain', action='append',
+                       help='允许抓取的域名（可多次指定，默认为种子所在域名）')
+    parser.add_argument('--path-prefix', action='append',
+                       help='只抓取以此路径开头的页面（可多次指定）')
+    parser.add_argument('--warc', nargs='?', const=DEFAULT_WARC_DIR,
+                       help='将请求和响应写入WARC存档目录（不指定目录时为knowledge/raw/warc）')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
     
-    if len(sys.argv) > 1:
+    urls = list(args.urls)
+    if args.url_file:
+        with open(args.url_file, 'r', encoding='utf-8') as f:
+            urls.extend(line.strip() for line in f
+                        if line.strip() and not line.startswith('#'))
+    
+    crawler = WebCrawler(concurrency=args.concurrency, per_host_limit=args.per_host,
+                         use_cache=not args.no_cache, skip_unchanged=args.skip_unchanged,
+                         formats=[fmt.strip() for fmt in args.formats.split(',') if fmt.strip()],
+                         warc_dir=args.warc)
+    
+    if args.site or args.sitemap:
+        # 全站爬取模式
+        crawler.crawl_site(
+            urls, sitemap=args.sitemap, max_depth=args.max_depth, max_pages=args.max_pages,
+            allowed_domains=args.domain, path_prefixes=args.path_prefix,
+            concurrency=args.concurrency
+        )
+    elif len(urls) == 1:
         # 命令行参数模式
-        url = sys.argv[1]
-        crawler.crawl(url)
+        crawler.crawl(urls[0])
+    elif urls:
+        # 批量模式
+        crawler.crawl_many(urls, concurrency=args.concurrency)
     else:
         # 交互模式
         print("网页爬虫工具")
@@ -244,6 +582,10 @@ def main():
                 break
             except Exception as e:
                 print(f"\n发生错误: {e}")
+    
+    # 存档记录逐条刷新到磁盘，这里只需关闭文件
+    crawler.close()
+    finish_run(args, job='web_crawler')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""script/ 和 chartbot/ 下的模块以顶层模块互相导入，测试时同样加入sys.path"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('script', 'chartbot'):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
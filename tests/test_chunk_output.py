@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""ChunkOutput / ChunkWriter 的输出文件处理"""
+
+import pytest
+
+from chunk_io import ChunkWriter, iter_chunks
+from data_processor import ChunkOutput
+
+
+class _Cleaner:
+    """只提供open_chunk_writer的清洗器，输出路径即文件名"""
+
+    def open_chunk_writer(self, filename=None, output_format='jsonl'):
+        return ChunkWriter(filename)
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'jsonl.gz'])
+def test_empty_run_keeps_existing_output(tmp_path, suffix):
+    path = str(tmp_path / f'out.{suffix}')
+    first = ChunkOutput(_Cleaner(), suffix, path)
+    first.add([{'chunk_id': 'a'}, {'chunk_id': 'b'}])
+    assert first.close() == path
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    # 第二次（如增量清洗时没有页面变化）没有产生知识块：不能删除或改动已有文件
+    second = ChunkOutput(_Cleaner(), suffix, path)
+    second.add([])
+    assert second.close() is None
+    with open(path, 'rb') as f:
+        assert f.read() == original
+    assert [chunk['chunk_id'] for chunk in iter_chunks(path)] == ['a', 'b']
+
+
+def test_empty_run_removes_created_file(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    output = ChunkOutput(_Cleaner(), 'jsonl', str(path))
+    assert output.close() is None
+    assert not path.exists()
+
+
+def test_append_adds_to_existing_output(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    for chunk_id in ('a', 'b'):
+        output = ChunkOutput(_Cleaner(), 'jsonl', path)
+        output.add([{'chunk_id': chunk_id}])
+        output.close()
+    assert [chunk['chunk_id'] for chunk in iter_chunks(path)] == ['a', 'b']
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""ChunkSizer：切分后的大小上限、代码块完整性和过小知识块的合并"""
+
+from chunk_sizer import FENCE, ChunkSizer, split_blocks
+from token_counter import ApproxTokenCounter
+
+
+def _sizer(**kwargs):
+    return ChunkSizer(lambda markdown: markdown, counter=ApproxTokenCounter(), **kwargs)
+
+
+def _chunk(markdown, chunk_id='page-q1', sub_category='Java基础'):
+    return {'chunk_id': chunk_id, 'question': '问题', 'answer_markdown': markdown, 'sub_category': sub_category}
+
+
+def _fences_balanced(markdown):
+    return sum(1 for line in markdown.split('\n') if FENCE.match(line)) % 2 == 0
+
+
+def test_split_parts_fit_max_tokens_with_overlap():
+    # 每段32个token：4段的token数之和恰好等于max_tokens，加上段落之间的空行就会超出
+    paragraphs = [f"第{index}段：HashMap 在 JDK 1.8 中使用数组、链表和红黑树存储键值对" for index in range(10, 40)]
+    sizer = _sizer(max_tokens=128, overlap_tokens=32)
+    assert {sizer.counter.count(paragraph) for paragraph in paragraphs} == {32}
+    parts = sizer.process([_chunk('\n\n'.join(paragraphs))])
+
+    assert len(parts) > 1
+    assert all(sizer.counter.count(part['answer_markdown']) <= 128 for part in parts)
+    assert [part['part_index'] for part in parts] == list(range(1, len(parts) + 1))
+    assert {part['parent_chunk_id'] for part in parts} == {'page-q1'}
+    # 相邻两段有重叠：后一段以前一段末尾的内容开头
+    assert parts[1]['answer_markdown'].split('\n\n')[0] in parts[0]['answer_markdown']
+
+
+def test_split_keeps_fenced_code_balanced():
+    code = '\n'.join(f"    int value{index} = map.get(\"key{index}\");" for index in range(60))
+    markdown = f"示例代码如下：\n\n```java\n{code}\n```\n\n以上代码演示了get方法。"
+    sizer = _sizer(max_tokens=128, overlap_tokens=16)
+    parts = sizer.process([_chunk(markdown)])
+
+    assert len(parts) > 1
+    assert all(_fences_balanced(part['answer_markdown']) for part in parts)
+    assert all(sizer.counter.count(part['answer_markdown']) <= 128 for part in parts)
+
+
+def test_split_blocks_recognizes_quoted_fence():
+    markdown = "> 举个例子：\n>\n> ```\n> int a = 1;\n\n> int b = 2;\n> ```\n\n正文"
+    blocks = split_blocks(markdown)
+
+    assert blocks == ["> 举个例子：\n>\n> ```\n> int a = 1;\n\n> int b = 2;\n> ```", "正文"]
+
+
+def test_split_keeps_quoted_fence_balanced():
+    code = '\n'.join(f"> int value{index} = map.get(\"key{index}\");" for index in range(12))
+    quote = f"> 好的代码本身就是注释。\n>\n> 举个例子：\n>\n> ```java\n{code}\n> ```\n>\n> 应替换为更好的写法。"
+    markdown = "《Clean Code》这本书明确指出：\n\n" + quote
+    sizer = _sizer(max_tokens=64, overlap_tokens=16)
+    parts = sizer.process([_chunk(markdown)])
+
+    assert len(parts) > 1
+    assert all(_fences_balanced(part['answer_markdown']) for part in parts)
+    assert all(sizer.counter.count(part['answer_markdown']) <= 64 for part in parts)
+    assert any(part['answer_markdown'].startswith('> ```java\n') for part in parts)
+
+
+def test_small_chunks_in_same_sub_category_are_merged():
+    chunks = [_chunk('短回答一', 'page-q1'), _chunk('短回答二', 'page-q2'), _chunk('短回答三', 'page-q3', '集合')]
+    merged = _sizer(max_tokens=256, min_tokens=64, overlap_tokens=16).process(chunks)
+
+    assert [chunk['chunk_id'] for chunk in merged] == ['page-q1', 'page-q3']
+    assert merged[0]['merged_chunk_ids'] == ['page-q1', 'page-q2']
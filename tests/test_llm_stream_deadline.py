@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""LLMClient.stream_chat 的截止时间：服务器中途停止发送数据时也要按时结束"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import DeadlineExceeded, LLMClient, LLMConfig
+
+
+def _stalling_server(events, stall):
+    """发送events个流式片段后停止发送stall秒的服务器"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for _ in range(events):
+                event = {'choices': [{'index': 0, 'delta': {'content': 'Java'}}]}
+                data = f"data: {json.dumps(event)}\n\n".encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+            time.sleep(stall)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stalling_client():
+    server = _stalling_server(events=2, stall=10)
+    config = LLMConfig(endpoint=f'http://127.0.0.1:{server.server_port}/v1', model='mock', max_retries=0)
+    client = LLMClient(config=config, cache=False)
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_stalled_stream_raises_deadline_exceeded(stalling_client):
+    deltas = []
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        stalling_client.stream_chat([{'role': 'user', 'content': 'hi'}], on_delta=deltas.append, timeout=1)
+    elapsed = time.monotonic() - started
+    assert deltas == ['Java', 'Java']
+    assert elapsed < 1.5